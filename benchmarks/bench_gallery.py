@@ -0,0 +1,94 @@
+"""Đo độ trễ so khớp một encoding với gallery 1k, 10k và 100k nhân viên.
+
+Chạy: python benchmarks/bench_gallery.py [--sizes 1000 10000 100000] [--repeat 200]
+      python benchmarks/bench_gallery.py --ivf --nprobe 1 4 8 32   (đo thêm recall/độ trễ của chỉ mục IVF)
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gallery import FaceGallery, IVFIndex
+
+
+def random_encodings(count, rng):
+    """Encoding giả lập có chuẩn gần giống encoding dlib, gom thành các cụm như người thật"""
+    centers = rng.normal(0.0, 0.09, size=(max(count // 20, 1), 128))
+    return centers[rng.integers(0, len(centers), count)] + rng.normal(0.0, 0.03, size=(count, 128))
+
+
+def legacy_match(known_encodings, face_encoding):
+    """Cách cũ: face_recognition.face_distance trên list rồi sort toàn bộ"""
+    face_distances = np.linalg.norm(np.array(known_encodings) - face_encoding, axis=1)
+    best_match_idx = np.argmin(face_distances)
+    face_distances_sorted = np.sort(face_distances)
+    return best_match_idx, face_distances_sorted[0], face_distances_sorted[1]
+
+
+def measure(func, queries, repeat):
+    timings = []
+    for i in range(repeat):
+        query = queries[i % len(queries)]
+        start = time.perf_counter()
+        func(query)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings) * 1000
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--ivf', action='store_true', help='đo thêm chỉ mục IVF')
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 4, 8, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'N':>8} | {'cũ p50 (ms)':>12} {'cũ p95':>8} | {'gallery p50 (ms)':>16} {'gallery p95':>11} | tăng tốc")
+    for size in args.sizes:
+        encodings = random_encodings(size, rng)
+        names = [f"nv_{i}" for i in range(size)]
+        queries = encodings[rng.integers(0, size, 32)] + rng.normal(0.0, 0.01, size=(32, 128))
+
+        known_encodings = list(encodings)
+        gallery = FaceGallery()
+        gallery.add_many(names, encodings)
+
+        # Kiểm tra hai cách cho cùng kết quả
+        for query in queries[:5]:
+            idx, best, _ = gallery.top2(query)
+            legacy_idx, legacy_best, _ = legacy_match(known_encodings, query)
+            assert idx == legacy_idx and abs(best - legacy_best) < 1e-4
+
+        legacy_p50, legacy_p95 = measure(lambda q: legacy_match(known_encodings, q), queries, args.repeat)
+        new_p50, new_p95 = measure(gallery.top2, queries, args.repeat)
+        print(f"{size:>8} | {legacy_p50:>12.3f} {legacy_p95:>8.3f} | {new_p50:>16.3f} {new_p95:>11.3f} | "
+              f"x{legacy_p50 / new_p50:.1f}")
+
+        if args.ivf:
+            bench_ivf(gallery, names, encodings, queries, args)
+
+
+def bench_ivf(flat_gallery, names, encodings, queries, args):
+    """So sánh recall và độ trễ IVF với quét toàn bộ theo từng nprobe"""
+    ivf_gallery = FaceGallery(index=IVFIndex(min_train_size=0))
+    start = time.perf_counter()
+    ivf_gallery.add_many(names, encodings)
+    print(f"{'':>8}   IVF: {len(ivf_gallery.index.centroids)} cụm, huấn luyện "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms")
+
+    expected = [flat_gallery.top2(query)[0] for query in queries]
+    for nprobe in args.nprobe:
+        ivf_gallery.index.nprobe = nprobe
+        recall = np.mean([ivf_gallery.top2(q)[0] == e for q, e in zip(queries, expected)])
+        p50, p95 = measure(ivf_gallery.top2, queries, args.repeat)
+        print(f"{'':>8}   nprobe={nprobe:<3} recall@1={recall:.3f} p50={p50:.3f} ms p95={p95:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
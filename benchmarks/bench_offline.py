@@ -0,0 +1,83 @@
+"""Đo toàn bộ luồng chấm công không cần camera: frames/s và độ trễ mỗi lượt chấm công.
+
+Chạy: python benchmarks/bench_offline.py --source synthetic:datas/nv_a.jpg [--duration 60] [--realtime]
+      python benchmarks/bench_offline.py --source recordings/checkin.mp4 --set TRACKER_ENABLED=True
+      python benchmarks/bench_offline.py --source frames/ --size 1280 720 --max-checkins 5
+
+Database được copy sang thư mục tạm và ảnh log được ghi vào đó, dữ liệu thật không bị thay đổi.
+Độ trễ tính từ frame đầu tiên thấy khuôn mặt đến khi chấm công xong, gồm cả HOLD_FACE_TIME và
+liveness (nguồn giả lập không chớp mắt/quay đầu được, dùng video thật hoặc --set để đo liveness).
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from kiosk import KioskRunner, apply_overrides, parse_override
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default='synthetic',
+                        help="file video, thư mục ảnh hoặc 'synthetic[:ảnh khuôn mặt]'")
+    parser.add_argument('--size', type=int, nargs=2, default=[640, 480], metavar=('W', 'H'))
+    parser.add_argument('--realtime', action='store_true', help='phát theo fps của nguồn thay vì nhanh nhất có thể')
+    parser.add_argument('--fps', type=float, default=None, help='fps của nguồn')
+    parser.add_argument('--loop', action='store_true', help='phát lại nguồn khi hết')
+    parser.add_argument('--duration', type=float, default=30, help='dừng sau N giây, 0 = đến khi hết nguồn')
+    parser.add_argument('--max-checkins', type=int, default=0)
+    parser.add_argument('--set', dest='overrides', type=parse_override, action='append', default=[],
+                        metavar='KEY=VALUE', help='ghi đè một giá trị trong config.py')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_offline_')
+    try:
+        database = os.path.join(workdir, os.path.basename(config.DATABASE_PATH))
+        if os.path.exists(config.DATABASE_PATH):
+            shutil.copy(config.DATABASE_PATH, database)
+        # Đường dẫn ghi file đều nằm trong thư mục tạm, kể cả khi chưa có database thật
+        apply_overrides([
+            ('DATABASE_PATH', database),
+            ('LOG_DIR', workdir),
+            ('METRICS_FILE', os.path.join(workdir, 'metrics.prom')),
+            ('TRACE_FILE', os.path.join(workdir, 'checkin_traces.jsonl')),
+            ('PROFILE_DIR', os.path.join(workdir, 'profiles')),
+        ])
+        apply_overrides(args.overrides)
+
+        runner = KioskRunner(args.source, tuple(args.size), report_interval=0, cooldown=0,
+                             max_checkins=args.max_checkins, realtime=args.realtime, loop=args.loop,
+                             fps=args.fps, verbose=False)
+        started = time.time()
+        runner.run(args.duration)
+        elapsed = time.time() - started
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print(f"Nguồn: {args.source} ({'thời gian thực' if args.realtime else 'nhanh nhất có thể'})")
+    print(f"Frame đã xử lý: {runner.frames} trong {elapsed:.1f} s = {runner.frames / max(elapsed, 1e-9):.1f} frames/s")
+    report = runner.engine.stats.report()
+    for stage, values in sorted(report.items()):
+        print(f"  {stage:>10}: {values['count']:>6} lần, trung bình {values['mean_ms']:.1f} ms")
+
+    print(f"Lượt chấm công: {runner.checkins}")
+    if runner.latencies:
+        seconds = np.array([latency for latency, _ in runner.latencies]) * 1000
+        frames = np.array([count for _, count in runner.latencies])
+        print(f"{'':>10} | {'p50':>8} {'p95':>8} {'max':>8}")
+        print(f"{'trễ (ms)':>10} | {np.percentile(seconds, 50):>8.0f} {np.percentile(seconds, 95):>8.0f} "
+              f"{seconds.max():>8.0f}")
+        print(f"{'frame':>10} | {np.percentile(frames, 50):>8.0f} {np.percentile(frames, 95):>8.0f} "
+              f"{frames.max():>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
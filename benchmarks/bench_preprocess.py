@@ -0,0 +1,122 @@
+"""Đo thời gian từng bước tiền xử lý: cách cũ (tăng cường frame gốc rồi thu nhỏ) và FramePreprocessor.
+
+Chạy: python benchmarks/bench_preprocess.py [--size 640 480] [--repeat 200] [--profile normal]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PREPROCESS_PROFILES, RESIZE_SCALE
+from preprocessing import SHARPEN_KERNEL, FramePreprocessor
+
+
+def synthetic_frame(width, height, rng):
+    """Frame giả lập: nền gradient, nhiễu và một hình elip sáng như khuôn mặt"""
+    gradient = np.linspace(40, 200, width, dtype=np.float32)[None, :, None]
+    frame = np.clip(gradient + rng.normal(0, 12, size=(height, width, 3)), 0, 255).astype(np.uint8)
+    cv2.ellipse(frame, (width // 2, height // 2), (width // 8, height // 5), 0, 0, 360, (170, 190, 220), -1)
+    return frame
+
+
+def legacy_prepare(frame):
+    """preprocess_frame + thu nhỏ như trước đây"""
+    lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+    l, a, b = cv2.split(lab)
+    l = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(l)
+    enhanced = cv2.cvtColor(cv2.merge((l, a, b)), cv2.COLOR_LAB2BGR)
+    enhanced = cv2.filter2D(enhanced, -1, np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]]))
+    small = cv2.resize(enhanced, (0, 0), fx=RESIZE_SCALE, fy=RESIZE_SCALE)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+
+def legacy_stages(frame):
+    """Các bước của preprocess_frame + process_frame trước đây, tạo CLAHE/kernel mỗi frame"""
+    yield 'lab', lambda: cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+    lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
+    l, a, b = cv2.split(lab)
+    yield 'clahe', lambda: cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(l)
+    enhanced = cv2.cvtColor(cv2.merge((l, a, b)), cv2.COLOR_LAB2BGR)
+    yield 'lab2bgr', lambda: cv2.cvtColor(cv2.merge((l, a, b)), cv2.COLOR_LAB2BGR)
+    kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+    yield 'sharpen', lambda: cv2.filter2D(enhanced, -1, kernel)
+    yield 'resize', lambda: cv2.resize(enhanced, (0, 0), fx=RESIZE_SCALE, fy=RESIZE_SCALE)
+    small = cv2.resize(enhanced, (0, 0), fx=RESIZE_SCALE, fy=RESIZE_SCALE)
+    yield 'rgb', lambda: cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+
+def preprocessor_stages(preprocessor, frame):
+    """Các bước của FramePreprocessor.prepare trên buffer dùng lại"""
+    height, width = frame.shape[:2]
+    size = (int(round(width * RESIZE_SCALE)), int(round(height * RESIZE_SCALE)))
+    buffers = preprocessor._buffers_for(size[1], size[0])
+    yield 'resize', lambda: cv2.resize(frame, size, dst=buffers['small'])
+    yield 'rgb', lambda: cv2.cvtColor(buffers['small'], cv2.COLOR_BGR2RGB, dst=buffers['rgb'])
+    if preprocessor.clahe is not None:
+        yield 'lab', lambda: cv2.cvtColor(buffers['rgb'], cv2.COLOR_RGB2LAB, dst=buffers['lab'])
+        yield 'clahe', lambda: preprocessor.clahe.apply(
+            cv2.extractChannel(buffers['lab'], 0, dst=buffers['l']), dst=buffers['l'])
+        yield 'lab2rgb', lambda: cv2.cvtColor(buffers['lab'], cv2.COLOR_LAB2RGB, dst=buffers['enhanced'])
+    if preprocessor.sharpen:
+        source = buffers['enhanced'] if preprocessor.clahe is not None else buffers['rgb']
+        yield 'sharpen', lambda: cv2.filter2D(source, -1, SHARPEN_KERNEL, dst=buffers['sharpened'])
+
+
+def time_stages(stages, repeat):
+    """Chạy từng bước repeat lần, trả về {bước: p50 ms}"""
+    timings = defaultdict(list)
+    for name, func in stages:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings[name].append(time.perf_counter() - start)
+    return {name: np.percentile(values, 50) * 1000 for name, values in timings.items()}
+
+
+def time_total(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1000
+
+
+def print_stages(title, stages):
+    print(title)
+    for name, ms in stages.items():
+        print(f"  {name:<10} {ms:8.3f} ms")
+    print(f"  {'tổng':<10} {sum(stages.values()):8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, nargs=2, default=[640, 480], metavar=('W', 'H'))
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--profile', default='normal', choices=sorted(PREPROCESS_PROFILES))
+    args = parser.parse_args()
+
+    frame = synthetic_frame(args.size[0], args.size[1], np.random.default_rng(0))
+    preprocessor = FramePreprocessor.from_profile(RESIZE_SCALE, PREPROCESS_PROFILES[args.profile])
+
+    print(f"Frame {args.size[0]}x{args.size[1]}, RESIZE_SCALE={RESIZE_SCALE}, hồ sơ '{args.profile}'\n")
+    print_stages("Cách cũ (tăng cường frame gốc, tạo CLAHE mỗi frame):", time_stages(legacy_stages(frame), args.repeat))
+    print_stages("FramePreprocessor (thu nhỏ trước, dùng lại CLAHE và buffer):",
+                 time_stages(preprocessor_stages(preprocessor, frame), args.repeat))
+
+    legacy_total = time_total(lambda: legacy_prepare(frame), args.repeat)
+    new_total = time_total(lambda: preprocessor.prepare(frame), args.repeat)
+    face_only = FramePreprocessor.from_profile(RESIZE_SCALE, PREPROCESS_PROFILES[args.profile], 'face')
+    face_total = time_total(lambda: face_only.prepare(frame), args.repeat)
+    print(f"\nToàn bộ p50: cũ {legacy_total:.3f} ms | prepare() {new_total:.3f} ms (x{legacy_total / new_total:.1f})"
+          f" | enhance_region='face' {face_total:.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
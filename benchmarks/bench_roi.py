@@ -0,0 +1,125 @@
+"""Đo recall và thời gian phát hiện khuôn mặt nhỏ: quét toàn frame và quét vùng ROI quanh vị trí trước đó.
+
+Chạy: python benchmarks/bench_roi.py [--data datas] [--sizes 24 32 40 56 80] [--roi-upsamples 0 1]
+
+Mỗi ảnh trong thư mục dữ liệu (một khuôn mặt) được thu nhỏ để khuôn mặt cao đúng N pixel rồi
+đặt vào một vị trí ngẫu nhiên trên frame nhiễu. ROI được lấy quanh vị trí thật lệch vài pixel,
+như khi người dùng di chuyển giữa hai frame.
+"""
+import argparse
+import os
+import sys
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import face_recognition
+
+import face_utils
+from config import DATA_DIR, RESIZE_SCALE, ROI_SCALE
+from face_tracker import box_iou
+
+
+def face_crops(data_dir):
+    """(ảnh cắt quanh khuôn mặt, vị trí khuôn mặt trong ảnh cắt) cho các ảnh chỉ có một khuôn mặt"""
+    for path in face_utils.list_face_images(data_dir):
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        locations = face_recognition.face_locations(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), 1)
+        if len(locations) != 1:
+            continue
+
+        top, right, bottom, left = locations[0]
+        margin = bottom - top
+        y0, x0 = max(0, top - margin), max(0, left - margin)
+        y1, x1 = min(image.shape[0], bottom + margin), min(image.shape[1], right + margin)
+        yield image[y0:y1, x0:x1], (top - y0, right - x0, bottom - y0, left - x0)
+
+
+def place_face(crop, location, face_height, frame_size, rng):
+    """Frame nhiễu có khuôn mặt cao face_height pixel, trả về (frame, vị trí thật theo frame gốc)"""
+    width, height = frame_size
+    scale = face_height / (location[2] - location[0])
+    crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    crop = crop[:height, :width]
+    frame = np.clip(rng.normal(110, 20, (height, width, 3)), 0, 255).astype(np.uint8)
+    y = int(rng.integers(0, height - crop.shape[0] + 1))
+    x = int(rng.integers(0, width - crop.shape[1] + 1))
+    frame[y:y + crop.shape[0], x:x + crop.shape[1]] = crop
+    top, right, bottom, left = (int(round(v * scale)) for v in location)
+    return frame, (top + y, right + x, bottom + y, left + x)
+
+
+def to_full(location):
+    return tuple(v / RESIZE_SCALE for v in location)
+
+
+def is_hit(locations, truth, min_iou):
+    return any(box_iou(to_full(location), truth) >= min_iou for location in locations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default=DATA_DIR, help='thư mục ảnh khuôn mặt')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[24, 32, 40, 56, 80],
+                        help='chiều cao khuôn mặt trên frame gốc (pixel)')
+    parser.add_argument('--roi-upsamples', type=int, nargs='+', default=[0, 1])
+    parser.add_argument('--frame', type=int, nargs=2, default=[640, 480], metavar=('W', 'H'))
+    parser.add_argument('--trials', type=int, default=3, help='số vị trí ngẫu nhiên cho mỗi ảnh và kích thước')
+    parser.add_argument('--shift', type=int, default=4, help='độ lệch (pixel) của ROI so với vị trí thật')
+    parser.add_argument('--min-iou', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    crops = list(face_crops(args.data))
+    if not crops:
+        parser.error(f"Không có ảnh một khuôn mặt trong {args.data}")
+
+    rng = np.random.default_rng(args.seed)
+    recognizer = face_utils.FaceRecognizer()
+    hits = defaultdict(int)
+    timings = defaultdict(list)
+    totals = defaultdict(int)
+
+    for face_height in args.sizes:
+        for crop, location in crops:
+            for _ in range(args.trials):
+                frame, truth = place_face(crop, location, face_height, tuple(args.frame), rng)
+                totals[face_height] += 1
+
+                start = time.perf_counter()
+                rgb_small_frame = recognizer.preprocessor.prepare(frame, reuse=False)
+                found = recognizer.detect_faces(rgb_small_frame)
+                timings['full', face_height].append(time.perf_counter() - start)
+                hits['full', face_height] += is_hit(found, truth, args.min_iou)
+
+                dy, dx = rng.integers(-args.shift, args.shift + 1, size=2)
+                prior = tuple(int(round(v * RESIZE_SCALE)) for v in
+                              (truth[0] + dy, truth[1] + dx, truth[2] + dy, truth[3] + dx))
+                for upsamples in args.roi_upsamples:
+                    face_utils.ROI_UPSAMPLES = upsamples
+                    start = time.perf_counter()
+                    found = recognizer.detect_faces_in_roi(frame, prior)
+                    timings['roi', upsamples, face_height].append(time.perf_counter() - start)
+                    hits['roi', upsamples, face_height] += is_hit(found, truth, args.min_iou)
+
+    print(f"{len(crops)} ảnh, frame {args.frame[0]}x{args.frame[1]}, RESIZE_SCALE={RESIZE_SCALE}, "
+          f"FACE_DETECTION_UPSAMPLES={face_utils.FACE_DETECTION_UPSAMPLES}, ROI_SCALE={ROI_SCALE}")
+    columns = [('full', 'toàn frame')] + [(('roi', u), f"ROI upsample {u}") for u in args.roi_upsamples]
+    print(f"{'mặt (px)':>9} | " + " | ".join(f"{label:>22}" for _, label in columns))
+    for face_height in args.sizes:
+        cells = []
+        for key, _ in columns:
+            key = (key, face_height) if key == 'full' else key + (face_height,)
+            recall = hits[key] / totals[face_height]
+            cells.append(f"{recall:>8.0%} {np.percentile(timings[key], 50) * 1000:>8.1f} ms")
+        print(f"{face_height:>9} | " + " | ".join(f"{cell:>22}" for cell in cells))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+"""Đo các bước nhận diện theo kích thước gallery và độ phân giải frame, lưu kết quả JSON để so sánh giữa các commit.
+
+Chạy: python benchmarks/bench_suite.py [--source synthetic:datas/nv_a.jpg] [--resolutions 320x240 640x480 1280x720]
+                                      [--gallery-sizes 100 1000 10000 100000] [--repeat 50] [--set KEY=VALUE ...]
+      python benchmarks/bench_suite.py --output after.json --compare before.json [--threshold 0.1]
+
+Các bước: preprocess_frame, process_frame, verify_liveness (theo độ phân giải), recognize_face (theo
+kích thước gallery, encoding giả lập) và mark_attendance (database tạm). Frame lấy từ nguồn ghi sẵn
+hoặc giả lập (xem frame_sources.py). Khi có --compare, trả về mã lỗi 1 nếu p95 của bước nào chậm
+hơn lần trước quá --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from bench_gallery import random_encodings
+from kiosk import apply_overrides, parse_override
+
+BENCHES = ('preprocess_frame', 'process_frame', 'verify_liveness', 'recognize_face', 'mark_attendance')
+
+
+def parse_resolution(text):
+    try:
+        width, height = (int(value) for value in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Cần dạng RỘNGxCAO: {text}")
+    return width, height
+
+
+def summarize(timings):
+    """p50/p95/p99/trung bình (ms) và throughput (lần/giây) từ danh sách thời gian (giây)"""
+    timings = np.array(timings)
+    ms = timings * 1000
+    return {
+        'n': len(timings),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'per_sec': float(len(timings) / timings.sum()) if timings.sum() else 0.0,
+    }
+
+
+def measure(func, inputs, repeat, warmup=3):
+    for i in range(min(warmup, repeat)):
+        func(inputs[i % len(inputs)])
+    timings = []
+    for i in range(repeat):
+        item = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        func(item)
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+
+def default_source():
+    """Giả lập với ảnh nhân viên đầu tiên trong DATA_DIR (nếu có) để HOG tìm được khuôn mặt"""
+    if os.path.isdir(config.DATA_DIR):
+        for file in sorted(os.listdir(config.DATA_DIR)):
+            if file.lower().endswith(('.jpg', '.jpeg', '.png')):
+                return f"synthetic:{os.path.join(config.DATA_DIR, file)}"
+    return 'synthetic'
+
+
+def load_frames(source, width, height, count):
+    """Đọc trước count frame vào bộ nhớ để thời gian đọc file không tính vào kết quả"""
+    from frame_sources import open_frame_source
+
+    stream = open_frame_source(source, width, height, realtime=False, loop=True).start()
+    frames = []
+    last_seq = 0
+    try:
+        while len(frames) < count:
+            seq, frame = stream.wait_for_frame(last_seq, timeout=1)
+            if seq == last_seq:
+                break
+            last_seq = seq
+            frames.append(frame)
+    finally:
+        stream.release()
+    if not frames:
+        raise RuntimeError(f"Không đọc được frame từ {source}")
+    return frames
+
+
+def bench_frames(recognizer, frames, repeat, only):
+    """Các bước phụ thuộc độ phân giải"""
+    from config import RANDOM_ACTIONS, RESIZE_SCALE
+
+    results = {}
+    if 'preprocess_frame' in only:
+        results['preprocess_frame'] = measure(recognizer.preprocess_frame, frames, repeat)
+    if 'process_frame' in only:
+        results['process_frame'] = measure(recognizer.process_frame, frames, repeat)
+
+    if 'verify_liveness' in only:
+        face_location = None
+        for frame in frames:
+            face_locations = recognizer.locate_faces(frame, recognizer.prepare_frame(frame))
+            if face_locations:
+                face_location = face_locations[0]
+                break
+        if face_location is None:
+            # Không có khuôn mặt: đo trên vùng giữa frame (landmark vẫn được tính)
+            height, width = (int(v * RESIZE_SCALE) for v in frames[0].shape[:2])
+            face_location = (height // 4, width * 3 // 4, height * 3 // 4, width // 4)
+            print("  verify_liveness: không phát hiện được khuôn mặt, dùng vùng giữa frame")
+
+        recognizer.reset_liveness()
+        results['verify_liveness'] = measure(
+            lambda frame: recognizer.verify_liveness(frame, face_location, RANDOM_ACTIONS[0]), frames, repeat
+        )
+    return results
+
+
+def bench_gallery(recognizer, size, repeat, rng):
+    """recognize_face với gallery size người; truy vấn là encoding của người trong gallery cộng nhiễu"""
+    encodings = random_encodings(size, rng)
+    recognizer.gallery.clear()
+    recognizer.gallery.add_many([f"nv_{i}" for i in range(size)], encodings)
+    queries = encodings[rng.integers(0, size, 64)] + rng.normal(0.0, 0.01, size=(64, encodings.shape[1]))
+    return measure(recognizer.recognize_face, list(queries), repeat)
+
+
+def bench_attendance(repeat, employees=50):
+    """mark_attendance trên database tạm có employees nhân viên (chấm vào/ra luân phiên)"""
+    from models.employee_model import EmployeeModel
+
+    model = EmployeeModel.__new__(EmployeeModel)
+    model.conn = sqlite3.connect(config.DATABASE_PATH, check_same_thread=False)
+    model.cursor = model.conn.cursor()
+    model.lock = threading.RLock()
+    model.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS employees (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, image_path TEXT NOT NULL
+        )
+    ''')
+    model.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, employee_id INTEGER NOT NULL, date TEXT NOT NULL,
+            time_in TEXT, time_out TEXT, status TEXT
+        )
+    ''')
+    model.cursor.executemany(
+        "INSERT INTO employees (name, image_path) VALUES (?, ?)",
+        [(f"nv_{i}", f"nv_{i}.jpg") for i in range(employees)]
+    )
+    model.conn.commit()
+    try:
+        return measure(lambda i: model.mark_attendance(i % employees + 1, f"nv_{i % employees}"),
+                       list(range(repeat)), repeat)
+    finally:
+        model.close()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=config.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def config_snapshot():
+    """Các giá trị cấu hình dạng chữ hoa có thể ghi ra JSON, để biết kết quả đo với cấu hình nào"""
+    snapshot = {}
+    for key in dir(config):
+        if not key.isupper() or key.endswith(('_DIR', '_PATH')):
+            continue
+        value = getattr(config, key)
+        try:
+            # Qua JSON để tuple/list so sánh được với file kết quả cũ
+            snapshot[key] = json.loads(json.dumps(value))
+        except TypeError:
+            continue
+    return snapshot
+
+
+def result_key(result):
+    return result['bench'], json.dumps(result['params'], sort_keys=True)
+
+
+def compare(results, previous, threshold):
+    """In tỉ lệ so với lần đo trước, trả về số bước chậm hơn quá threshold (theo p95)"""
+    before = {result_key(result): result for result in previous['results']}
+    print()
+    print(f"So sánh với {previous['meta'].get('commit', '?')} ({previous['meta'].get('timestamp', '?')}):")
+    changed = {
+        key: (previous['meta']['config'].get(key), value)
+        for key, value in config_snapshot().items()
+        if key in previous['meta'].get('config', {}) and previous['meta']['config'][key] != value
+    }
+    for key, (old, new) in sorted(changed.items()):
+        print(f"  cấu hình {key}: {old!r} -> {new!r}")
+
+    regressions = 0
+    print(f"{'bước':>16} {'tham số':>24} | {'p50 trước':>9} {'p50':>8} | {'p95 trước':>9} {'p95':>8} | thay đổi")
+    for result in results:
+        old = before.get(result_key(result))
+        if old is None:
+            continue
+        ratio = result['p95_ms'] / old['p95_ms'] - 1 if old['p95_ms'] else 0.0
+        flag = ''
+        if ratio > threshold:
+            flag = '  CHẬM HƠN'
+            regressions += 1
+        params = ' '.join(f"{k}={v}" for k, v in result['params'].items())
+        print(f"{result['bench']:>16} {params:>24} | {old['p50_ms']:>9.2f} {result['p50_ms']:>8.2f} | "
+              f"{old['p95_ms']:>9.2f} {result['p95_ms']:>8.2f} | {ratio:+.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=None,
+                        help="file video, thư mục ảnh hoặc 'synthetic[:ảnh khuôn mặt]' (mặc định: ảnh đầu tiên trong DATA_DIR)")
+    parser.add_argument('--resolutions', type=parse_resolution, nargs='+',
+                        default=[(320, 240), (640, 480), (1280, 720)], metavar='WxH')
+    parser.add_argument('--gallery-sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=50, help='số lần đo mỗi bước')
+    parser.add_argument('--frames', type=int, default=30, help='số frame khác nhau dùng luân phiên')
+    parser.add_argument('--only', nargs='+', choices=BENCHES, default=list(BENCHES))
+    parser.add_argument('--set', dest='overrides', type=parse_override, action='append', default=[],
+                        metavar='KEY=VALUE', help='ghi đè một giá trị trong config.py')
+    parser.add_argument('--output', default=None, help='file JSON kết quả (mặc định LOG_DIR/bench/<commit>.json)')
+    parser.add_argument('--compare', default=None, help='file JSON của lần đo trước')
+    parser.add_argument('--threshold', type=float, default=0.1, help='tỉ lệ chậm hơn (p95) bị coi là regression')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_suite_')
+    config.DATABASE_PATH = os.path.join(workdir, 'attendance.db')
+    apply_overrides(args.overrides)
+    source = args.source or default_source()
+
+    from face_utils import FaceRecognizer
+
+    recognizer = FaceRecognizer()
+    recognizer.log_detection = lambda *args, **kwargs: None
+    results = []
+
+    def record(bench, params, summary):
+        results.append({'bench': bench, 'params': params, **summary})
+        label = ' '.join(f"{k}={v}" for k, v in params.items())
+        print(f"{bench:>16} {label:>24} | p50 {summary['p50_ms']:8.2f} ms  p95 {summary['p95_ms']:8.2f} ms  "
+              f"p99 {summary['p99_ms']:8.2f} ms | {summary['per_sec']:8.1f}/s")
+
+    try:
+        print(f"Nguồn frame: {source}")
+        if set(args.only) & {'preprocess_frame', 'process_frame', 'verify_liveness'}:
+            for width, height in args.resolutions:
+                frames = load_frames(source, width, height, args.frames)
+                for bench, summary in bench_frames(recognizer, frames, args.repeat, args.only).items():
+                    record(bench, {'resolution': f"{width}x{height}"}, summary)
+
+        if 'recognize_face' in args.only:
+            rng = np.random.default_rng(0)
+            for size in args.gallery_sizes:
+                record('recognize_face', {'gallery': size}, bench_gallery(recognizer, size, args.repeat, rng))
+
+        if 'mark_attendance' in args.only:
+            record('mark_attendance', {}, bench_attendance(args.repeat))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'source': source,
+            'repeat': args.repeat,
+            'config': config_snapshot(),
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(config.LOG_DIR, 'bench', f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Đã lưu kết quả: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        if compare(results, previous, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
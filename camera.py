@@ -0,0 +1,78 @@
+import threading
+import time
+
+import cv2
+
+
+class CameraStream:
+    """Đọc camera trong thread riêng và chỉ giữ frame mới nhất.
+
+    Dùng được như cv2.VideoCapture (read/isOpened/set/release); nhiều consumer
+    (hiển thị, phân tích) có thể đọc cùng lúc với tốc độ khác nhau mà không làm
+    dồn frame trong driver. Consumer không được sửa frame tại chỗ.
+    """
+
+    # Cùng giao diện với các nguồn ghi sẵn trong frame_sources
+    realtime = True
+    finished = False
+
+    def __init__(self, source=0, width=None, height=None):
+        self.cap = cv2.VideoCapture(source)
+        # Giảm hàng đợi trong driver, frame cũ không còn giá trị
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+        self._condition = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running or not self.cap.isOpened():
+            return self
+
+        self._running = True
+        self._thread = threading.Thread(target=self._reader, name="camera-reader", daemon=True)
+        self._thread.start()
+        return self
+
+    def _reader(self):
+        while self._running:
+            ret, frame = self.cap.read()
+            if not ret:
+                time.sleep(0.01)
+                continue
+
+            with self._condition:
+                self._frame = frame
+                self._seq += 1
+                self._condition.notify_all()
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def read(self):
+        """Frame mới nhất theo kiểu cv2.VideoCapture.read(), không chờ"""
+        with self._condition:
+            return self._frame is not None, self._frame
+
+    def wait_for_frame(self, last_seq, timeout=None):
+        """Chờ frame mới hơn last_seq, trả về (seq, frame)"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq != last_seq or not self._running, timeout)
+            return self._seq, self._frame
+
+    def release(self):
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self.cap.release()
@@ -0,0 +1,283 @@
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import cv2
+from config import *
+from frame_governor import FrameRateGovernor
+from metrics import metrics
+from multi_face import MultiFaceCheckIn
+from profiling import profiler
+from tracing import Tracer
+
+
+class StageStats:
+    """Tổng thời gian và số lần chạy của từng bước, để báo cáo throughput (đồng thời ghi vào metrics)"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.started_at = time.time()
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.totals[stage] += elapsed
+            self.counts[stage] += 1
+            metrics.observe(stage, elapsed)
+
+    def report(self):
+        """{bước: {count, mean_ms, per_sec}}, per_sec tính theo thời gian chạy thực"""
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        return {
+            stage: {
+                'count': count,
+                'mean_ms': self.totals[stage] / count * 1000 if count else 0.0,
+                'per_sec': count / elapsed,
+            }
+            for stage, count in self.counts.items()
+        }
+
+
+class CheckInEngine:
+    """Máy trạng thái check-in không phụ thuộc giao diện: giữ mặt -> nhận diện -> liveness -> chấm công.
+
+    Dùng chung cho EmployeeController (Tk) và kiosk.py (không giao diện). Thông báo cho
+    người dùng được gửi qua on_message(message, color), có thể được gọi từ thread phân tích.
+    """
+
+    def __init__(self, model, on_message=None):
+        self.model = model
+        self.face_recognizer = model.face_recognizer
+        self.on_message = on_message or (lambda message, color: None)
+        self.current_action = None
+        self.action_start_time = None
+        self.current_face_location = None
+        self.expected_name = None
+        self.stats = StageStats()
+        # Trace của lượt chấm công hiện tại (chế độ một người) và của từng session (chế độ nhiều người)
+        self.tracer = Tracer()
+        self.trace = None
+        self.session_traces = {}
+        self.governor = FrameRateGovernor(
+            IDLE_DETECTION_INTERVAL, ACTIVE_DETECTION_INTERVAL, IDLE_RESIZE_SCALE, NO_DETECTION_THRESHOLD
+        ) if ADAPTIVE_FRAME_RATE else None
+        if self.governor is not None:
+            self.face_recognizer.probe_scale = self.governor.probe_scale
+        self.multi_face = MultiFaceCheckIn(self.face_recognizer, MULTI_FACE_MAX) if MULTI_FACE_ENABLED else None
+
+    def show_message(self, message, color="blue"):
+        self.on_message(message, color)
+
+    @profiler.profiled('process_frame')
+    def process_frame(self, frame, analysis=None):
+        """Xử lý một frame camera, trả về (frame đã lật, (emp_id, name) nếu đã xác thực xong).
+
+        analysis: kết quả (face_locations, face_encodings) từ FramePipeline; khi có thì
+        frame đã được pipeline lật sẵn.
+        """
+        try:
+            if frame is None:
+                return None, None
+
+            if analysis is None:
+                frame = cv2.flip(frame, 1)
+
+            with self.stats.measure('analysis'):
+                if self.multi_face is not None:
+                    return self.process_multi_face_frame(frame)
+
+                if self.current_action:
+                    return self.handle_action_verification(frame)
+
+                return self.process_single_face_frame(frame, analysis)
+        except Exception as e:
+            print(f"Lỗi xử lý frame: {str(e)}")
+            return frame, None
+
+    def process_single_face_frame(self, frame, analysis=None):
+        started = time.time()
+        result = self.face_recognizer.process_frame_with_verification(frame, analysis)
+        if not self.face_recognizer.face_found:
+            self.finish_trace('abandoned')
+        elif self.trace is None:
+            self.trace = self.tracer.begin(started)
+
+        if result is None:
+            if self.face_recognizer.face_hold_start_time:
+                hold_time = time.time() - self.face_recognizer.face_hold_start_time
+                remaining = max(0, HOLD_FACE_TIME - hold_time)
+                self.show_message(f"Giữ mặt thêm {remaining:.1f} giây...", "blue")
+            return frame, None
+
+        face_location, face_encoding, verified = result
+        self.trace.event('hold_complete')
+        if verified and face_encoding is not None:
+            with self.trace.span('match'):
+                emp_id, name = self.model.recognize_employee(face_encoding)
+            if emp_id and name:
+                self.trace.name = name
+                self.start_action_verification(name, face_location)
+
+        return frame, None
+
+    def process_multi_face_frame(self, frame):
+        """Chế độ nhiều người: chấm công ngay cho từng người đã xác thực, camera tiếp tục chạy"""
+        messages = []
+        for kind, session in self.multi_face.process(frame):
+            trace = self.session_trace(session)
+            if kind == 'verified':
+                trace.event('liveness_pass')
+                emp_id, name = self.model.recognize_employee_by_name(session.name)
+                success, status = self.record_attendance(emp_id, name, frame.copy(), session.location, trace)
+                self.session_traces.pop(session.id, None)
+                if success:
+                    messages.append((0, f"Đã chấm công {status} thành công cho {name}!", "green"))
+                else:
+                    messages.append((1, f"Lỗi khi chấm công cho {session.name}!", "red"))
+            elif kind == 'timeout':
+                self.tracer.finish(self.session_traces.pop(session.id), 'timeout')
+                messages.append((1, f"{session.name}: hết thời gian xác thực!", "red"))
+            elif kind == 'unknown':
+                trace.event('hold_complete')
+                self.tracer.finish(self.session_traces.pop(session.id), 'unknown')
+            elif kind == 'action':
+                if not trace.has('liveness_prompt'):
+                    # Encode và so khớp chạy chung cho cả lô trong MultiFaceCheckIn._identify
+                    trace.event('hold_complete')
+                    trace.event('match')
+                    trace.event('liveness_prompt')
+                    trace.name = session.name
+                messages.append((2, f"{session.name}, {session.action}", "orange"))
+            elif kind == 'hold':
+                remaining = max(0, HOLD_FACE_TIME - (time.time() - session.hold_start))
+                messages.append((3, f"Giữ mặt thêm {remaining:.1f} giây...", "blue"))
+
+        # Session đã rời khỏi khung hình
+        for session_id in [sid for sid in self.session_traces if sid not in self.multi_face.sessions]:
+            self.tracer.finish(self.session_traces.pop(session_id), 'abandoned')
+
+        if messages:
+            messages.sort(key=lambda message: message[0])
+            self.show_message(" | ".join(text for _, text, _ in messages), messages[0][2])
+        return frame, None
+
+    def session_trace(self, session):
+        """Trace của một session nhiều người, bắt đầu từ lúc session thấy khuôn mặt"""
+        trace = self.session_traces.get(session.id)
+        if trace is None:
+            trace = self.session_traces[session.id] = self.tracer.begin(session.hold_start)
+        return trace
+
+    def finish_trace(self, outcome):
+        """Kết thúc trace của lượt hiện tại (chế độ một người)"""
+        if self.trace is not None:
+            self.tracer.finish(self.trace, outcome)
+            self.trace = None
+
+    def start_action_verification(self, name, face_location):
+        self.current_action = random.choice(RANDOM_ACTIONS)
+        self.action_start_time = time.time()
+        self.current_face_location = face_location
+        self.expected_name = name
+        self.face_recognizer.reset_liveness()
+        if self.trace is not None:
+            self.trace.event('liveness_prompt')
+        self.show_message(f"{name}, {self.current_action}", "orange")
+
+    def handle_action_verification(self, frame):
+        if time.time() - self.action_start_time > ACTION_TIMEOUT:
+            metrics.inc('timeouts')
+            self.finish_trace('timeout')
+            self.reset_verification()
+            self.show_message("Hết thời gian xác thực!", "red")
+            return frame, None
+
+        if self.face_recognizer.verify_liveness(frame, self.current_face_location, self.current_action):
+            if self.trace is not None:
+                self.trace.event('liveness_pass')
+            name = self.expected_name
+            emp_id, _ = self.model.recognize_employee_by_name(name)
+            self.face_recognizer.log_detection(frame, self.current_face_location, name, True)
+            self.reset_verification()
+            return frame, (emp_id, name)
+
+        self.show_message(f"{self.expected_name}, {self.current_action}", "orange")
+        return frame, None
+
+    def reset_verification(self):
+        self.current_action = None
+        self.action_start_time = None
+        self.current_face_location = None
+        self.expected_name = None
+        self.face_recognizer.reset_liveness()
+
+    def reset(self):
+        """Về trạng thái chờ người tiếp theo"""
+        self.reset_verification()
+        self.face_recognizer.reset_hold()
+        self.finish_trace('abandoned')
+        if self.multi_face is not None:
+            self.multi_face.reset()
+            for trace in self.session_traces.values():
+                self.tracer.finish(trace, 'abandoned')
+            self.session_traces = {}
+
+    def record_attendance(self, emp_id, name, frame=None, face_location=None, trace=None):
+        """Chấm công và ghi log ảnh với trạng thái IN/OUT, trả về (thành công, trạng thái).
+
+        trace: trace của lượt chấm công, mặc định là lượt hiện tại; được kết thúc tại đây.
+        """
+        single_face = trace is None
+        if single_face:
+            trace = self.trace if self.trace is not None else self.tracer.begin()
+
+        with self.stats.measure('attendance'), trace.span('db_commit'):
+            success, status = self.model.mark_attendance(emp_id, name)
+        if success:
+            metrics.inc('checkins')
+
+        if success and frame is not None:
+            with self.stats.measure('log'), trace.span('log_write'):
+                if face_location is None:
+                    # Lấy lại vị trí khuôn mặt trên frame dùng để log
+                    face_locations = self.face_recognizer.locate_faces(
+                        frame, self.face_recognizer.prepare_frame(frame)
+                    )
+                    face_location = face_locations[0] if face_locations else None
+                self.face_recognizer.log_detection(frame, face_location, name, True, status)
+
+        trace.name = trace.name or name
+        self.tracer.finish(trace, 'checkin' if success else 'failed')
+        if single_face:
+            self.trace = None
+        return success, status
+
+    def next_interval(self, default):
+        """Thời gian chờ tới lần phân tích sau (ms), theo bộ điều tốc nếu được bật"""
+        if self.governor is None:
+            return default
+
+        face_found = self.current_action is not None or self.face_recognizer.face_found
+        interval = self.governor.update(face_found)
+        self.face_recognizer.probe_scale = self.governor.probe_scale
+        self.face_recognizer.governor_active = self.governor.state == FrameRateGovernor.ACTIVE
+        return interval
+
+    def print_stats(self):
+        """In thống kê các bước đã bật"""
+        if self.face_recognizer.motion_gate is not None:
+            print(f"Thống kê cổng chuyển động: {self.face_recognizer.motion_gate.stats()}")
+        if self.multi_face is not None:
+            print(f"Thống kê check-in nhiều người: {self.multi_face.stats()}")
+        if ADAPTIVE_JITTER or LANDMARK_CASCADE:
+            print(f"Thống kê encode thích ứng: {self.face_recognizer.adaptive_jitter_stats()}")
+        print(f"Thống kê các bước: {self.stats.report()}")
@@ -9,10 +9,15 @@ DATABASE_PATH = os.path.join(BASE_DIR, 'database', 'attendance.db')
 DATA_DIR = os.path.join(BASE_DIR, 'datas')
 EXPORT_DIR = os.path.join(BASE_DIR, 'exports')
 LOG_DIR = os.path.join(BASE_DIR, 'logs')
+CACHE_DIR = os.path.join(BASE_DIR, 'cache')
 os.makedirs(LOG_DIR, exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(EXPORT_DIR, exist_ok=True)
 
+# Khởi động: hiện cửa sổ chính ngay, nạp thư viện nhận diện, mô hình và gallery trong thread nền
+STARTUP_WARMUP = True
+
 # Face Recognition
 FACE_DETECTION_METHOD = 'hog'
 FACE_DETECTION_THRESHOLD = 0.45
@@ -21,12 +26,130 @@ NUM_JITTERS = 3
 MODEL = 'large'
 FACE_DETECTION_UPSAMPLES = 1
 
+# Encode thích ứng: encode 1 jitter trước, chỉ encode lại với NUM_JITTERS khi so khớp mơ hồ
+# (khoảng cách tốt nhất cách ngưỡng dưới ADAPTIVE_JITTER_BAND hoặc chênh lệch top-2 dưới MATCH_MIN_MARGIN)
+ADAPTIVE_JITTER = True
+ADAPTIVE_JITTER_BAND = 0.05
+MATCH_MIN_MARGIN = 0.1
+
+# Cascade landmark: mô hình 5 điểm cho encode thông thường, mô hình 68 điểm (MODEL) chỉ cho liveness
+# và khi so khớp mơ hồ. Predictor dùng chung với face_recognition
+LANDMARK_CASCADE = True
+
+# Phát hiện trong vùng quanh vị trí khuôn mặt trước đó (ROI), cắt từ frame gốc nên rõ hơn.
+# Độ phân giải hiệu dụng ROI_SCALE * 2^ROI_UPSAMPLES phải lớn hơn của quét toàn frame
+# (RESIZE_SCALE * 2^FACE_DETECTION_UPSAMPLES), đo bằng benchmarks/bench_roi.py
+ROI_DETECTION_ENABLED = True
+ROI_EXPAND = 0.5  # mở rộng mỗi phía theo tỉ lệ kích thước khuôn mặt
+ROI_SCALE = 1.0  # tỉ lệ so với frame gốc (frame toàn cảnh dùng RESIZE_SCALE)
+ROI_UPSAMPLES = 1
+ROI_FULL_SCAN_INTERVAL = 10
+
+# Tiền xử lý (chạy sau khi thu nhỏ): 'frame' = tăng cường cả frame, 'face' = chỉ vùng mặt trước khi encode
+PREPROCESS_ENHANCE_REGION = 'frame'
+# Hồ sơ ánh sáng: bật/tắt từng bước tiền xử lý
+PREPROCESS_PROFILE = 'normal'
+PREPROCESS_PROFILES = {
+    'normal': {'clahe': True, 'sharpen': True, 'clip_limit': 2.0},
+    'dim': {'clahe': True, 'sharpen': True, 'clip_limit': 3.0},
+    'backlit': {'clahe': True, 'sharpen': False, 'clip_limit': 4.0},
+    'bright': {'clahe': False, 'sharpen': True},
+    'off': {'clahe': False, 'sharpen': False},
+}
+
+# Cache encoding (bị bỏ khi đổi phiên bản, MODEL hoặc NUM_JITTERS)
+ENCODING_CACHE_ENABLED = True
+ENCODING_CACHE_PATH = os.path.join(CACHE_DIR, 'encodings.npz')
+ENCODING_CACHE_VERSION = 1
+# Phiên bản embedding lưu trong database, đổi MODEL thì các embedding cũ phải tính lại
+EMBEDDING_MODEL_VERSION = f'dlib_face_recognition_resnet_model_v1/{MODEL}'
+
+# Encode song song khi nạp ảnh (1 = tuần tự, 0 = theo số lõi CPU)
+ENCODING_WORKERS = 0
+ENCODING_PARALLEL_MIN_IMAGES = 8
+ENCODING_MP_START_METHOD = 'spawn'
+
+# Chỉ mục gallery: 'flat' (quét toàn bộ) hoặc 'ivf' (xấp xỉ, cho gallery lớn)
+GALLERY_INDEX = 'flat'
+IVF_NLIST = 0  # 0 = tự chọn 4 * sqrt(N)
+IVF_NPROBE = 8
+IVF_MIN_TRAIN_SIZE = 5000
+
 # Camera
 DETECTION_INTERVAL = 1000
+# Nguồn frame: chỉ số camera, file video, thư mục ảnh JPEG hoặc 'synthetic[:ảnh khuôn mặt]'.
+# Nguồn ghi sẵn phát theo thời gian thực hoặc nhanh nhất có thể (FRAME_SOURCE_REALTIME = False)
+FRAME_SOURCE = 0
+FRAME_SOURCE_REALTIME = True
+FRAME_SOURCE_LOOP = False
+FRAME_SOURCE_FPS = None  # None = fps của video, 10 cho thư mục ảnh, 30 cho giả lập
+# Đọc camera trong thread riêng; hiển thị và phân tích chạy với tốc độ khác nhau (ms)
+CAPTURE_THREADED = True
+DISPLAY_INTERVAL = 30
+ANALYSIS_INTERVAL = 100
+
+# Pipeline nhiều process (cần CAPTURE_THREADED): phát hiện và encode chạy trong các process worker
+PIPELINE_ENABLED = False
+PIPELINE_DETECT_WORKERS = 2
+PIPELINE_ENCODE_WORKERS = 2
+PIPELINE_QUEUE_SIZE = 4
+PIPELINE_DROP_POLICY = 'drop_oldest'  # 'block', 'drop_oldest' hoặc 'drop_newest'
 NO_DETECTION_THRESHOLD = 10
-MIN_FACE_VISIBILITY = 0.7
+MIN_FACE_VISIBILITY = 0.7  # khuôn mặt có cạnh >= tỉ lệ này * MIN_FACE_SIZE mới tính là có người
 HOLD_FACE_TIME = 2
 
+# Điều tốc: chế độ chờ (thưa, độ phân giải thấp) khi không có ai, chế độ hoạt động khi thấy khuôn mặt.
+# Về chế độ chờ sau NO_DETECTION_THRESHOLD lần phân tích liên tiếp không thấy ai (ms)
+ADAPTIVE_FRAME_RATE = True
+IDLE_DETECTION_INTERVAL = 1000
+ACTIVE_DETECTION_INTERVAL = 100
+IDLE_RESIZE_SCALE = 0.25
+
+# Cổng chuyển động: chỉ chạy HOG khi cảnh thay đổi hoặc đang có khuôn mặt
+MOTION_GATE_ENABLED = True
+MOTION_GATE_SIZE = (80, 60)
+MOTION_PIXEL_THRESHOLD = 25
+MOTION_MIN_CHANGED_RATIO = 0.01
+MOTION_LEARNING_RATE = 0.05
+MOTION_MAX_SKIP_FRAMES = 50
+
+# Theo dõi khuôn mặt trong thời gian giữ mặt (không chạy lại HOG/encode mỗi frame)
+TRACKING_ENABLED = True
+TRACKER_TYPE = 'template'  # 'template' hoặc tracker OpenCV: 'kcf', 'csrt', 'mil', 'mosse'
+TRACKER_MIN_SCORE = 0.6
+TRACKER_REDETECT_FRAMES = 15
+TRACKER_MIN_IOU = 0.3
+
+# Chọn keyframe trong thời gian giữ mặt: giữ KEYFRAME_TOP_K khuôn mặt điểm cao nhất, chỉ encode khuôn mặt tốt nhất
+KEYFRAME_TOP_K = 3
+KEYFRAME_WEIGHTS = {'sharpness': 0.4, 'contrast': 0.2, 'size': 0.2, 'frontal': 0.2}
+KEYFRAME_SHARPNESS_REF = 100.0
+
+# Check-in nhiều người cùng lúc: mỗi khuôn mặt có trạng thái giữ mặt/liveness riêng (không dùng pipeline)
+MULTI_FACE_ENABLED = False
+MULTI_FACE_MAX = 5
+
+# Metrics: histogram thời gian từng bước và bộ đếm, xuất dạng text Prometheus ra file và/hoặc HTTP
+METRICS_ENABLED = False
+METRICS_FILE = os.path.join(LOG_DIR, 'metrics.prom')
+METRICS_FILE_INTERVAL = 15  # giây
+METRICS_HTTP_PORT = None  # ví dụ 9108; None = không mở cổng
+METRICS_HTTP_HOST = '127.0.0.1'
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Trace từng lượt chấm công (phân tích: python tracing.py); tắt mặc định, bật khi cần đo độ trễ
+TRACE_ENABLED = False
+TRACE_FILE = os.path.join(LOG_DIR, 'checkin_traces.jsonl')
+
+# Profile theo yêu cầu: bật khi mở camera (PROFILE_ON_START) hoặc gửi tín hiệu (kill -USR1 <pid>),
+# chạy PROFILE_DURATION giây rồi ghi .pstats/.txt (cProfile) và .folded (lấy mẫu, cho flamegraph)
+PROFILE_ON_START = False
+PROFILE_SIGNAL = 'SIGUSR1'
+PROFILE_DURATION = 30
+PROFILE_MODE = 'both'  # 'cprofile', 'sampling' hoặc 'both'
+PROFILE_SAMPLE_INTERVAL = 0.005  # giây
+PROFILE_DIR = os.path.join(LOG_DIR, 'profiles')
+
 # Image Quality
 MIN_FACE_CONTRAST = 30
 MIN_FACE_SIZE = 50
@@ -42,4 +165,21 @@ RANDOM_ACTIONS = [
 ACTION_TIMEOUT = 5
 LIVENESS_THRESHOLD = 0.7
 
+# Liveness theo chuỗi frame: landmark của LIVENESS_WINDOW frame gần nhất.
+# Ngưỡng quay/gật đầu tính theo tỉ lệ khoảng cách hai mắt
+LIVENESS_WINDOW = 30
+LIVENESS_MIN_FRAMES = 3
+# Tính landmark liveness trên vùng mặt cắt từ frame gốc (frame thu nhỏ theo RESIZE_SCALE kém chính xác)
+LIVENESS_FULL_RESOLUTION = True
+BLINK_EAR_THRESHOLD = 0.2
+BLINK_OPEN_EAR = 0.25
+HEAD_TURN_THRESHOLD = 0.15
+NOD_THRESHOLD = 0.1
+
 AUTO_DETECT_IN_OUT = True
+
+# Cấu hình ghi đè bởi kiosk.apply_overrides, truyền sang các process con (spawn) qua biến môi trường
+OVERRIDES_ENV = 'FACE_ATTENDANCE_CONFIG'
+if os.environ.get(OVERRIDES_ENV):
+    import ast
+    globals().update(ast.literal_eval(os.environ[OVERRIDES_ENV]))
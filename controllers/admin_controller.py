@@ -6,7 +6,11 @@ import tkinter as tk
 from tkinter import messagebox, END
 from datetime import datetime
 
+from config import FRAME_SOURCE, FRAME_SOURCE_FPS, FRAME_SOURCE_LOOP, FRAME_SOURCE_REALTIME
+from face_utils import encode_image_file
+from frame_sources import open_frame_source
 from models.admin_model import AdminModel
+from profiling import install_profiling, profiler
 from views.admin_view import AdminView
 
 
@@ -98,12 +102,14 @@ class AdminController:
             if hasattr(self, 'cap') and self.cap is not None:
                 self.cap.release()
 
-            self.cap = cv2.VideoCapture(0)
+            self.cap = open_frame_source(
+                FRAME_SOURCE, self.view.image_width, self.view.image_height,
+                FRAME_SOURCE_REALTIME, FRAME_SOURCE_LOOP, FRAME_SOURCE_FPS, threaded=False
+            )
             if not self.cap.isOpened():
                 raise Exception("Không thể mở camera")
 
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.view.image_width)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.view.image_height)
+            install_profiling()
 
             self.view.camera_running = True
             self.view.btn_toggle_cam.config(text="Tắt Camera", bg="#F44336")
@@ -119,6 +125,7 @@ class AdminController:
         face_locations = face_recognition.face_locations(rgb_frame)
         return len(face_locations) == 1
 
+    @profiler.profiled('update_camera')
     def update_camera(self):
         """Cập nhật hình ảnh từ camera"""
         if self.view.camera_running:
@@ -208,15 +215,14 @@ class AdminController:
 
             cv2.imwrite(filepath, self.captured_image)
 
-            img = face_recognition.load_image_file(filepath)
-            encodings = face_recognition.face_encodings(img)
+            encoding = encode_image_file(filepath)
 
-            if not encodings:
+            if encoding is None:
                 os.remove(filepath)
                 messagebox.showerror("Lỗi", "Không phát hiện khuôn mặt trong ảnh!")
                 return
 
-            if not self.model.register_employee(name, filepath):
+            if not self.model.register_employee(name, filepath, encoding):
                 messagebox.showerror("Lỗi", "Nhân viên đã tồn tại!")
                 return
 
@@ -252,7 +258,8 @@ class AdminController:
                 filename = f"{name.replace(' ', '_')}.jpg"
                 new_img_path = os.path.join(self.model.DATA_DIR, filename)
                 cv2.imwrite(new_img_path, self.captured_image)
-                self.model.update_employee(self.current_employee_id, name, new_img_path)
+                encoding = encode_image_file(new_img_path)
+                self.model.update_employee(self.current_employee_id, name, new_img_path, encoding)
             else:
                 self.model.update_employee(self.current_employee_id, name)
 
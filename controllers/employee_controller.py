@@ -1,8 +1,14 @@
 import cv2
+import queue
+import threading
 import time
-import random
 from tkinter import messagebox
+from checkin import CheckInEngine
 from config import *
+from frame_sources import open_frame_source
+from metrics import metrics, start_export
+from pipeline import FramePipeline
+from profiling import install_profiling, profiler
 from models.employee_model import EmployeeModel
 from views.employee_view import EmployeeView
 
@@ -13,75 +19,40 @@ class EmployeeController:
         self.model = EmployeeModel()
         self.face_recognizer = self.model.face_recognizer
         self.return_to_main = return_to_main_callback
-        self.current_action = None
-        self.action_start_time = None
+        self.ui_thread = threading.current_thread()
+        self.ui_queue = queue.Queue()
+        self.analysis_lock = threading.Lock()
+        self.analysis_thread = None
+        self.pipeline = None
+        self.result_pending = False
+        self.pipeline_interval = 0
+        self.running = False
+        # Máy trạng thái check-in dùng chung với chế độ không giao diện (kiosk.py)
+        self.engine = CheckInEngine(self.model, self.show_message)
         self.setup_events()
         self.start_camera()
 
     def setup_events(self):
         self.view.btn_manual.config(command=self.manual_attendance)
         self.view.btn_exit.config(command=self.return_to_main)
+        self.view.root.bind("<Destroy>", self.on_destroy, add="+")
 
-    def process_camera_frame(self, frame):
-        try:
-            if frame is None:
-                return None, None
-
-            frame = cv2.flip(frame, 1)
-
-            if self.current_action:
-                return self.handle_action_verification(frame)
-
-            result = self.face_recognizer.process_frame_with_verification(frame)
-            if result is None:
-                if hasattr(self.face_recognizer, 'face_hold_start_time') and self.face_recognizer.face_hold_start_time:
-                    current_time = time.time()
-                    hold_time = current_time - self.face_recognizer.face_hold_start_time
-                    remaining = max(0, HOLD_FACE_TIME - hold_time)
-                    self.view.display_message(f"Giữ mặt thêm {remaining:.1f} giây...", "blue")
-                return frame, None
-
-            face_location, face_encoding, verified = result
-            if verified and face_encoding is not None:
-                emp_id, name = self.model.recognize_employee(face_encoding)
-                if emp_id and name:
-                    self.start_action_verification(name, face_location)
-                    return frame, None
-
-            return frame, None
-        except Exception as e:
-            print(f"Lỗi xử lý frame: {str(e)}")
-            return frame, None
-
-    def start_action_verification(self, name, face_location):
-        self.current_action = random.choice(RANDOM_ACTIONS)
-        self.action_start_time = time.time()
-        self.current_face_location = face_location
-        self.expected_name = name
-        self.view.display_message(f"{name}, {self.current_action}", "orange")
-
-    def handle_action_verification(self, frame):
-        if time.time() - self.action_start_time > ACTION_TIMEOUT:
-            self.reset_verification()
-            self.view.display_message("Hết thời gian xác thực!", "red")
-            return frame, None
-
-        if self.face_recognizer.verify_liveness(frame, self.current_face_location, self.current_action):
-            name = self.expected_name
-            emp_id, _ = self.model.recognize_employee_by_name(name)
-            self.face_recognizer.log_detection(frame, self.current_face_location, name, True)
-            self.reset_verification()
-            return frame, (emp_id, name)
-
-        self.view.display_message(f"{self.expected_name}, {self.current_action}", "orange")
-        return frame, None
-
-    def reset_verification(self):
-        self.current_action = None
-        self.action_start_time = None
-        self.current_face_location = None
-        self.expected_name = None
+    def show_message(self, message, color="blue"):
+        """Hiển thị thông báo; gọi từ thread phân tích thì chuyển về thread giao diện"""
+        if threading.current_thread() is self.ui_thread:
+            self.view.display_message(message, color)
+        else:
+            self.ui_queue.put(("message", (message, color)))
+
+    @profiler.profiled('process_camera_frame')
+    def process_camera_frame(self, frame, analysis=None):
+        """Xử lý một frame camera bằng CheckInEngine (xem CheckInEngine.process_frame)"""
+        return self.engine.process_frame(frame, analysis)
+
+    def next_interval(self, default):
+        return self.engine.next_interval(default)
 
+    @profiler.profiled('check_face')
     def check_face(self):
         try:
             ret, frame = self.cap.read()
@@ -97,11 +68,95 @@ class EmployeeController:
                 self.process_attendance(emp_id, name)
                 return
 
-            self.view.root.after(DETECTION_INTERVAL, self.check_face)
+            self.view.root.after(self.next_interval(DETECTION_INTERVAL), self.check_face)
         except Exception as e:
             print(f"Lỗi kiểm tra khuôn mặt: {str(e)}")
             self.view.root.after(DETECTION_INTERVAL, self.check_face)
 
+    def update_display(self):
+        """Vòng hiển thị trên thread giao diện: luôn vẽ frame mới nhất, không chờ phân tích"""
+        if not self.running:
+            return
+
+        try:
+            ret, frame = self.cap.read()
+            if ret:
+                self.view.display_video_frame(cv2.flip(frame, 1))
+
+            while True:
+                try:
+                    kind, payload = self.ui_queue.get_nowait()
+                except queue.Empty:
+                    break
+
+                if kind == "message":
+                    self.view.display_message(*payload)
+                elif kind == "attendance":
+                    self.process_attendance(*payload)
+                    return
+        except Exception as e:
+            print(f"Lỗi hiển thị: {str(e)}")
+
+        if self.running:
+            self.view.root.after(DISPLAY_INTERVAL, self.update_display)
+
+    def analysis_loop(self):
+        """Thread phân tích: xử lý frame mới nhất, bỏ qua các frame đến trong lúc đang bận"""
+        last_seq = 0
+        while self.running:
+            seq, frame = self.cap.wait_for_frame(last_seq, timeout=0.5)
+            if frame is None or seq == last_seq:
+                continue
+            last_seq = seq
+
+            started = time.time()
+            try:
+                with self.analysis_lock:
+                    _, result = self.process_camera_frame(frame)
+            except Exception as e:
+                print(f"Lỗi kiểm tra khuôn mặt: {str(e)}")
+                result = None
+
+            if result:
+                self.ui_queue.put(("attendance", result))
+                return
+
+            remaining = self.next_interval(ANALYSIS_INTERVAL) / 1000 - (time.time() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def on_pipeline_result(self, frame, face_locations, face_encodings):
+        """Stage so khớp của FramePipeline, chạy trên thread thu kết quả"""
+        if not self.running or self.result_pending:
+            return
+
+        with self.analysis_lock:
+            _, result = self.process_camera_frame(frame, (face_locations, face_encodings))
+            # Bộ điều tốc cập nhật theo từng kết quả, thread capture đưa frame theo interval này
+            self.pipeline_interval = self.next_interval(0)
+        if result:
+            self.result_pending = True
+            self.ui_queue.put(("attendance", result))
+
+    def start_pipeline(self):
+        """Chạy phát hiện/encode trong các process worker thay cho thread phân tích"""
+        _, frame = self.cap.wait_for_frame(0, timeout=2)
+        if frame is None:
+            raise RuntimeError("Không đọc được frame từ camera")
+
+        self.pipeline = FramePipeline(
+            frame.shape,
+            self.on_pipeline_result,
+            RESIZE_SCALE,
+            detect_workers=PIPELINE_DETECT_WORKERS,
+            encode_workers=PIPELINE_ENCODE_WORKERS,
+            queue_size=PIPELINE_QUEUE_SIZE,
+            drop_policy=PIPELINE_DROP_POLICY
+        ).start()
+        if self.engine.governor is not None:
+            self.pipeline_interval = self.engine.governor.interval
+        self.pipeline.run_capture(self.cap, self.face_recognizer.should_analyse, lambda: self.pipeline_interval)
+
     def manual_attendance(self):
         try:
             ret, frame = self.cap.read()
@@ -109,7 +164,8 @@ class EmployeeController:
                 messagebox.showerror("Lỗi", "Không đọc được frame từ camera!")
                 return
 
-            processed_frame, result = self.process_camera_frame(frame)
+            with self.analysis_lock:
+                processed_frame, result = self.process_camera_frame(frame)
             self.view.display_video_frame(processed_frame)
 
             if result:
@@ -122,42 +178,67 @@ class EmployeeController:
 
     def start_camera(self):
         try:
-            self.cap = cv2.VideoCapture(0)
+            self.cap = open_frame_source(
+                FRAME_SOURCE, 640, 480, FRAME_SOURCE_REALTIME, FRAME_SOURCE_LOOP, FRAME_SOURCE_FPS,
+                threaded=CAPTURE_THREADED
+            )
             if not self.cap.isOpened():
                 raise RuntimeError("Không thể mở camera")
 
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            start_export()
+            install_profiling()
+            if not CAPTURE_THREADED:
+                self.check_face()
+                return
 
-            self.check_face()
+            self.cap.start()
+            self.running = True
+            if PIPELINE_ENABLED and self.engine.multi_face is None:
+                self.start_pipeline()
+            else:
+                self.analysis_thread = threading.Thread(target=self.analysis_loop, name="face-analysis", daemon=True)
+                self.analysis_thread.start()
+            self.update_display()
         except Exception as e:
             messagebox.showerror("Lỗi Camera", f"Không thể khởi động camera: {str(e)}")
             self.return_to_main()
 
     def process_attendance(self, emp_id, name):
         """Xử lý chấm công với trạng thái IN/OUT"""
-        success, status = self.model.mark_attendance(emp_id, name)
+        # Chụp lại frame để log với trạng thái chính xác
+        ret, frame = self.cap.read()
+        success, status = self.engine.record_attendance(emp_id, name, cv2.flip(frame, 1) if ret else None)
 
         if success:
-            # Chụp lại frame để log với trạng thái chính xác
-            ret, frame = self.cap.read()
-            if ret:
-                frame = cv2.flip(frame, 1)
-                # Lấy lại vị trí khuôn mặt
-                result = self.face_recognizer.process_frame_with_verification(frame)
-                if result:
-                    face_location, _, _ = result
-                    self.face_recognizer.log_detection(frame, face_location, name, True, status)
-
             message = f"Đã chấm công {status} thành công cho {name}!"
-            self.view.display_message(message, "green")
+            self.show_message(message, "green")
             time.sleep(2)
         else:
-            self.view.display_message("Lỗi khi chấm công!", "red")
+            self.show_message("Lỗi khi chấm công!", "red")
             time.sleep(2)
 
+        self.stop_camera()
         self.return_to_main()
 
+    def stop_camera(self):
+        """Dừng thread phân tích và giải phóng camera"""
+        self.running = False
+        if self.analysis_thread is not None and self.analysis_thread is not threading.current_thread():
+            self.analysis_thread.join(timeout=2)
+        self.analysis_thread = None
+        self.engine.print_stats()
+        metrics.stop()
+        if self.pipeline is not None:
+            print(f"Thống kê pipeline: {self.pipeline.stats()}")
+            self.pipeline.stop()
+            self.pipeline = None
+        if hasattr(self, 'cap') and self.cap.isOpened():
+            self.cap.release()
+
+    def on_destroy(self, event):
+        if event.widget is self.view.root:
+            self.stop_camera()
+
     def return_to_main(self):
         try:
             if hasattr(self, 'cap') and self.cap.isOpened():
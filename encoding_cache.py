@@ -0,0 +1,139 @@
+import hashlib
+import os
+
+import numpy as np
+
+from config import ENCODING_CACHE_VERSION
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """Tính SHA-1 nội dung file"""
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+class EncodingCache:
+    """Cache encoding khuôn mặt trên đĩa.
+
+    Mỗi ảnh được khoá theo đường dẫn, kích thước, mtime và hash nội dung;
+    toàn bộ cache bị bỏ nếu phiên bản, model hoặc số jitter thay đổi.
+    """
+
+    def __init__(self, cache_path, model, num_jitters):
+        self.cache_path = cache_path
+        self.model = model
+        self.num_jitters = num_jitters
+        # path -> (size, mtime_ns, digest, encoding hoặc None nếu ảnh không có mặt)
+        self.entries = {}
+        self.pending = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        """Đọc cache từ đĩa, tất cả encoding nằm trong một mảng NumPy"""
+        if not os.path.exists(self.cache_path):
+            return
+
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                if (int(data['version']) != ENCODING_CACHE_VERSION
+                        or str(data['model']) != self.model
+                        or int(data['num_jitters']) != self.num_jitters):
+                    self.dirty = True
+                    return
+
+                paths = data['paths']
+                sizes = data['sizes']
+                mtimes = data['mtimes']
+                digests = data['digests']
+                has_face = data['has_face']
+                encodings = data['encodings']
+        except Exception as e:
+            print(f"Không thể đọc cache encoding: {str(e)}")
+            self.dirty = True
+            return
+
+        for i, path in enumerate(paths):
+            encoding = encodings[i] if has_face[i] else None
+            self.entries[str(path)] = (int(sizes[i]), int(mtimes[i]), str(digests[i]), encoding)
+
+    def get(self, path):
+        """Trả về (found, encoding); encoding là None nếu ảnh không có khuôn mặt"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self.entries.get(path)
+
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            self.hits += 1
+            return True, entry[3]
+
+        digest = file_digest(path)
+        if entry and entry[2] == digest:
+            # File bị chạm vào nhưng nội dung không đổi
+            self.entries[path] = (stat.st_size, stat.st_mtime_ns, digest, entry[3])
+            self.dirty = True
+            self.hits += 1
+            return True, entry[3]
+
+        self.pending[path] = (stat.st_size, stat.st_mtime_ns, digest)
+        self.misses += 1
+        return False, None
+
+    def put(self, path, encoding):
+        """Lưu encoding mới tính cho ảnh (None nếu không có khuôn mặt)"""
+        path = os.path.abspath(path)
+        key = self.pending.pop(path, None)
+        if key is None:
+            stat = os.stat(path)
+            key = (stat.st_size, stat.st_mtime_ns, file_digest(path))
+        self.entries[path] = key + (encoding,)
+        self.dirty = True
+
+    def prune(self, data_dir, keep_paths):
+        """Bỏ các ảnh của data_dir không còn trong keep_paths; ảnh của thư mục khác được giữ nguyên"""
+        data_dir = os.path.abspath(data_dir)
+        keep = {os.path.abspath(p) for p in keep_paths}
+        for path in list(self.entries):
+            if os.path.dirname(path) == data_dir and path not in keep:
+                del self.entries[path]
+                self.dirty = True
+
+    def save(self):
+        """Ghi cache ra đĩa (ghi file tạm rồi thay thế)"""
+        if not self.dirty:
+            return
+
+        paths = list(self.entries)
+        encodings = np.zeros((len(paths), 128), dtype=np.float64)
+        has_face = np.zeros(len(paths), dtype=bool)
+        for i, path in enumerate(paths):
+            encoding = self.entries[path][3]
+            if encoding is not None:
+                encodings[i] = encoding
+                has_face[i] = True
+
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    version=np.int64(ENCODING_CACHE_VERSION),
+                    model=np.str_(self.model),
+                    num_jitters=np.int64(self.num_jitters),
+                    paths=np.array(paths, dtype=str),
+                    sizes=np.array([self.entries[p][0] for p in paths], dtype=np.int64),
+                    mtimes=np.array([self.entries[p][1] for p in paths], dtype=np.int64),
+                    digests=np.array([self.entries[p][2] for p in paths], dtype=str),
+                    has_face=has_face,
+                    encodings=encodings
+                )
+            os.replace(tmp_path, self.cache_path)
+            self.dirty = False
+        except Exception as e:
+            print(f"Không thể ghi cache encoding: {str(e)}")
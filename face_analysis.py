@@ -0,0 +1,177 @@
+import cv2
+import dlib
+import face_recognition
+import numpy as np
+from config import MODEL, NUM_JITTERS
+
+
+def face_landmark_shapes(image, face_locations, model=MODEL):
+    """Tính landmark bằng predictor của face_recognition ('small' = 5 điểm, còn lại 68 điểm).
+
+    Dùng chung một bản mô hình cho encode và liveness trong cả process.
+    """
+    if model == 'small':
+        predictor = face_recognition.api.pose_predictor_5_point
+    else:
+        predictor = face_recognition.api.pose_predictor_68_point
+    return [
+        predictor(image, dlib.rectangle(left, top, right, bottom))
+        for top, right, bottom, left in face_locations
+    ]
+
+
+def encode_face_shapes(rgb_image, shapes, num_jitters=NUM_JITTERS):
+    """Tính encoding 128 chiều từ landmark đã có sẵn; nhiều khuôn mặt được encode trong một lần gọi"""
+    encoder = face_recognition.api.face_encoder
+    if len(shapes) <= 1:
+        return [np.array(encoder.compute_face_descriptor(rgb_image, shape, num_jitters)) for shape in shapes]
+
+    batch = dlib.full_object_detections()
+    for shape in shapes:
+        batch.append(shape)
+    return [np.array(descriptor) for descriptor in encoder.compute_face_descriptor(rgb_image, batch, num_jitters)]
+
+
+def _model_key(model):
+    return 'small' if model == 'small' else 'large'
+
+
+def encode_analyses_batch(analyses, num_jitters=NUM_JITTERS, model=MODEL):
+    """Encode các FaceAnalysis trên cùng một image bằng một lần gọi, lưu kết quả vào từng FaceAnalysis"""
+    key = (_model_key(model), num_jitters)
+    pending = [analysis for analysis in analyses if key not in analysis._encodings]
+    if pending:
+        shapes = [analysis.shape(model) for analysis in pending]
+        for analysis, encoding in zip(pending, encode_face_shapes(pending[0].image, shapes, num_jitters)):
+            analysis._encodings[key] = encoding
+    return [analysis._encodings[key] for analysis in analyses]
+
+
+class FaceAnalysis:
+    """Kết quả phân tích một khuôn mặt trong một frame, dùng chung cho chất lượng, liveness và nhận diện.
+
+    Ảnh xám vùng mặt, chỉ số chất lượng, landmark và encoding chỉ được tính khi cần và tối đa
+    một lần. image là frame RGB (đã thu nhỏ theo scale) chứa khuôn mặt tại location; image
+    không được copy nên phải giữ nguyên trong lúc dùng, hoặc gọi crop().
+    frame (tuỳ chọn) là frame BGR gốc: landmark cho liveness được tính trên vùng mặt cắt từ frame
+    này thay vì trên image đã thu nhỏ.
+    """
+
+    def __init__(self, image, location, scale=1.0, preprocessor=None, frame=None):
+        self._image = image
+        self.frame = frame
+        self.location = tuple(int(v) for v in location)
+        self.scale = scale
+        self.preprocessor = preprocessor
+        # Chế độ tăng cường vùng mặt: chỉ tăng cường khi thật sự cần đến điểm ảnh
+        self._enhanced = preprocessor is None or preprocessor.enhance_region != 'face'
+        self._gray = None
+        self._quality = None
+        self._shapes = {}
+        self._landmarks = {}
+        self._encodings = {}
+
+    @property
+    def image(self):
+        if not self._enhanced:
+            self.preprocessor.enhance_faces(self._image, [self.location])
+            self._enhanced = True
+        return self._image
+
+    @property
+    def size(self):
+        """(cao, rộng) của khuôn mặt theo toạ độ image"""
+        top, right, bottom, left = self.location
+        return bottom - top, right - left
+
+    @property
+    def gray(self):
+        """Ảnh xám vùng mặt"""
+        if self._gray is None:
+            top, right, bottom, left = self.location
+            crop = self.image[max(0, top):bottom, max(0, left):right]
+            self._gray = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY) if crop.size else np.empty((0, 0), np.uint8)
+        return self._gray
+
+    @property
+    def quality(self):
+        """Kích thước, độ tương phản (độ lệch chuẩn) và độ nét (phương sai Laplacian) vùng mặt"""
+        if self._quality is None:
+            height, width = self.size
+            gray = self.gray
+            self._quality = {
+                'height': height,
+                'width': width,
+                'contrast': float(gray.std()) if gray.size else 0.0,
+                'sharpness': float(cv2.Laplacian(gray, cv2.CV_64F).var()) if gray.size else 0.0,
+            }
+        return self._quality
+
+    def is_good_quality(self, min_size, min_contrast):
+        quality = self.quality
+        return (quality['height'] >= min_size and quality['width'] >= min_size
+                and quality['contrast'] >= min_contrast)
+
+    def shape(self, model=MODEL):
+        """Landmark dlib ('small' = 5 điểm, còn lại 68 điểm)"""
+        key = _model_key(model)
+        if key not in self._shapes:
+            self._shapes[key] = face_landmark_shapes(self.image, [self.location], key)[0]
+        return self._shapes[key]
+
+    def landmarks(self, model='large'):
+        """Mảng (N, 2) toạ độ landmark theo frame gốc.
+
+        Có frame gốc thì tính trên vùng mặt cắt từ frame gốc, nếu không thì tính trên image
+        rồi chia cho scale.
+        """
+        key = _model_key(model)
+        if key not in self._landmarks:
+            if self.frame is not None and self.scale < 1.0:
+                self._landmarks[key] = self.full_resolution_landmarks(key)
+            else:
+                points = np.array([[p.x, p.y] for p in self.shape(key).parts()], dtype=np.float64)
+                self._landmarks[key] = points / self.scale
+        return self._landmarks[key]
+
+    def full_resolution_landmarks(self, model='large', margin=0.25):
+        """Landmark tính trên vùng mặt (mở rộng margin mỗi phía) cắt từ frame gốc, toạ độ frame gốc"""
+        top, right, bottom, left = (v / self.scale for v in self.location)
+        margin_y, margin_x = (bottom - top) * margin, (right - left) * margin
+        y0, x0 = max(0, int(top - margin_y)), max(0, int(left - margin_x))
+        y1 = min(self.frame.shape[0], int(np.ceil(bottom + margin_y)))
+        x1 = min(self.frame.shape[1], int(np.ceil(right + margin_x)))
+        crop = cv2.cvtColor(self.frame[y0:y1, x0:x1], cv2.COLOR_BGR2RGB)
+        location = tuple(int(round(v)) for v in (top - y0, right - x0, bottom - y0, left - x0))
+        shape = face_landmark_shapes(crop, [location], _model_key(model))[0]
+        points = np.array([[p.x, p.y] for p in shape.parts()], dtype=np.float64)
+        return points + (x0, y0)
+
+    def encoding(self, num_jitters=NUM_JITTERS, model=MODEL):
+        """Encoding 128 chiều, dùng lại landmark đã tính cho cùng mô hình"""
+        key = (_model_key(model), num_jitters)
+        if key not in self._encodings:
+            self._encodings[key] = encode_face_shapes(self.image, [self.shape(model)], num_jitters)[0]
+        return self._encodings[key]
+
+    def crop(self, margin=0.5):
+        """Bản sao chỉ giữ vùng mặt (mở rộng margin mỗi phía) của image, dùng khi image là buffer bị ghi đè.
+
+        location được đổi theo vùng cắt, scale giữ nguyên; giữ chất lượng và encoding đã tính,
+        bỏ landmark vì toạ độ không còn khớp với vùng cắt.
+        """
+        image = self.image
+        top, right, bottom, left = self.location
+        margin_y, margin_x = int((bottom - top) * margin), int((right - left) * margin)
+        y0, x0 = max(0, top - margin_y), max(0, left - margin_x)
+        y1, x1 = min(image.shape[0], bottom + margin_y), min(image.shape[1], right + margin_x)
+
+        copy = FaceAnalysis.__new__(FaceAnalysis)
+        copy.__dict__.update(self.__dict__)
+        copy._image = image[y0:y1, x0:x1].copy()
+        copy.location = (top - y0, right - x0, bottom - y0, left - x0)
+        copy.frame = None
+        copy._shapes = {}
+        copy._landmarks = {}
+        copy._encodings = dict(self._encodings)
+        return copy
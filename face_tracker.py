@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+
+
+def box_iou(a, b):
+    """IoU của hai vị trí (top, right, bottom, left)"""
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+CV2_TRACKERS = {
+    'kcf': 'TrackerKCF_create',
+    'csrt': 'TrackerCSRT_create',
+    'mil': 'TrackerMIL_create',
+    'mosse': 'TrackerMOSSE_create',
+}
+
+
+def _create_cv2_tracker(tracker_type):
+    """Tạo tracker OpenCV nếu bản OpenCV đang cài có hỗ trợ (KCF/CSRT/MOSSE cần opencv-contrib)"""
+    name = CV2_TRACKERS.get(tracker_type)
+    for module in (cv2, getattr(cv2, 'legacy', None)):
+        factory = getattr(module, name, None) if name and module is not None else None
+        if factory is not None:
+            return factory()
+    raise ValueError(f"OpenCV không hỗ trợ tracker '{tracker_type}'")
+
+
+class FaceTracker:
+    """Bám một khuôn mặt giữa các frame mà không cần chạy lại HOG.
+
+    Mặc định dùng template matching trong vùng lân cận vị trí cũ (chỉ cần OpenCV cơ bản);
+    có thể dùng tracker OpenCV qua tracker_type. Vị trí dùng định dạng (top, right, bottom, left)
+    như face_recognition.
+    """
+
+    def __init__(self, tracker_type='template', min_score=0.6, search_margin=0.5, redetect_frames=15):
+        self.tracker_type = tracker_type
+        self.min_score = min_score
+        self.search_margin = search_margin
+        self.redetect_frames = redetect_frames
+        self.reset()
+
+    def reset(self):
+        self.location = None
+        self.age = 0
+        self._template = None
+        self._cv2_tracker = None
+
+    @property
+    def active(self):
+        return self.location is not None
+
+    @property
+    def needs_redetect(self):
+        """Định kỳ chạy lại HOG để sửa sai lệch tích luỹ của tracker"""
+        return self.redetect_frames > 0 and self.age >= self.redetect_frames
+
+    def start(self, image, location):
+        """Bắt đầu bám từ vị trí vừa phát hiện"""
+        self.reset()
+        top, right, bottom, left = location
+        if self.tracker_type == 'template':
+            gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+            self._template = gray[top:bottom, left:right].copy()
+        else:
+            self._cv2_tracker = _create_cv2_tracker(self.tracker_type)
+            self._cv2_tracker.init(image, (left, top, right - left, bottom - top))
+        self.location = location
+
+    def update(self, image):
+        """Tìm lại khuôn mặt trong frame mới, trả về None (và dừng bám) nếu mất dấu"""
+        if not self.active:
+            return None
+
+        if self._cv2_tracker is not None:
+            ok, (x, y, w, h) = self._cv2_tracker.update(image)
+            location = (int(y), int(x + w), int(y + h), int(x)) if ok else None
+        else:
+            location = self._match_template(cv2.cvtColor(image, cv2.COLOR_RGB2GRAY))
+
+        if location is None:
+            self.reset()
+            return None
+
+        self.location = location
+        self.age += 1
+        return location
+
+    def _match_template(self, gray):
+        top, right, bottom, left = self.location
+        height, width = bottom - top, right - left
+        margin_y, margin_x = int(height * self.search_margin), int(width * self.search_margin)
+
+        y0, x0 = max(0, top - margin_y), max(0, left - margin_x)
+        y1, x1 = min(gray.shape[0], bottom + margin_y), min(gray.shape[1], right + margin_x)
+        window = gray[y0:y1, x0:x1]
+        if window.shape[0] < height or window.shape[1] < width or self._template.size == 0:
+            return None
+
+        scores = cv2.matchTemplate(window, self._template, cv2.TM_CCOEFF_NORMED)
+        _, max_score, _, (dx, dy) = cv2.minMaxLoc(scores)
+        if not np.isfinite(max_score) or max_score < self.min_score:
+            return None
+
+        new_top, new_left = y0 + dy, x0 + dx
+        self._template = gray[new_top:new_top + height, new_left:new_left + width].copy()
+        return new_top, new_left + width, new_top + height, new_left
@@ -1,222 +1,627 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 import cv2
-import dlib
 import face_recognition
-import numpy as np
 from config import *
+from encoding_cache import EncodingCache
+from face_analysis import FaceAnalysis, encode_analyses_batch, encode_face_shapes, face_landmark_shapes
+from face_tracker import FaceTracker, box_iou
+from frame_governor import is_face_visible
+from motion_gate import MotionGate
+from preprocessing import FramePreprocessor
+from gallery import FaceGallery, IVFIndex
+from keyframe import KeyframeSelector
+from liveness import TemporalLiveness
+from metrics import metrics
 import time
+import weakref
+
+VALID_IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# Các FaceRecognizer đang chạy, để cập nhật gallery khi quản trị viên đăng ký/xoá nhân viên
+_live_recognizers = weakref.WeakSet()
+
+
+def notify_face_enrolled(name, encoding):
+    """Thêm (hoặc thay) khuôn mặt trong gallery của mọi FaceRecognizer đang chạy"""
+    for recognizer in list(_live_recognizers):
+        recognizer.add_known_face(name, encoding)
+
+
+def notify_face_removed(name):
+    """Xoá khuôn mặt khỏi gallery của mọi FaceRecognizer đang chạy"""
+    for recognizer in list(_live_recognizers):
+        recognizer.remove_known_face(name)
+
+
+def gallery_key(image_path):
+    """Tên dùng trong gallery: tên file ảnh không có phần mở rộng"""
+    return os.path.splitext(os.path.basename(image_path))[0]
+
+
+def list_face_images(data_dir):
+    """Liệt kê ảnh khuôn mặt trong thư mục, sắp xếp theo tên"""
+    return [
+        os.path.join(data_dir, img_name)
+        for img_name in sorted(os.listdir(data_dir))
+        if not img_name.startswith('.') and os.path.splitext(img_name)[1].lower() in VALID_IMAGE_EXTENSIONS
+    ]
+
+
+def encode_image_file(img_path):
+    """Encode khuôn mặt đầu tiên trong ảnh, trả về None nếu không có mặt"""
+    img = face_recognition.load_image_file(img_path)
+    encodings = face_recognition.face_encodings(img, num_jitters=NUM_JITTERS, model=MODEL)
+    return encodings[0] if encodings else None
+
+
+def _encode_image_task(img_path):
+    """Tác vụ chạy trong process con: trả về (đường dẫn, encoding, lỗi)"""
+    try:
+        return img_path, encode_image_file(img_path), None
+    except Exception as e:
+        return img_path, None, str(e)
+
+
+def encode_image_files(image_paths, workers=None):
+    """Encode danh sách ảnh, song song bằng process pool nếu được cấu hình.
+
+    Kết quả được trả về theo đúng thứ tự của image_paths.
+    """
+    workers = ENCODING_WORKERS if workers is None else workers
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(image_paths))
+
+    if workers <= 1 or len(image_paths) < ENCODING_PARALLEL_MIN_IMAGES:
+        yield from map(_encode_image_task, image_paths)
+        return
+
+    mp_context = multiprocessing.get_context(ENCODING_MP_START_METHOD)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+        yield from executor.map(_encode_image_task, image_paths)
+
+
+def print_encoding_progress(done, total):
+    """In tiến độ encode ảnh"""
+    if done == total or done % 10 == 0:
+        print(f"Đã encode {done}/{total} ảnh")
+
+
+# Các bước xử lý frame không phụ thuộc trạng thái, dùng chung cho FaceRecognizer và process worker
+
+_default_preprocessor = None
+
+
+def create_preprocessor(profile=None):
+    """Tạo FramePreprocessor theo hồ sơ ánh sáng (mặc định PREPROCESS_PROFILE)"""
+    return FramePreprocessor.from_profile(
+        RESIZE_SCALE, PREPROCESS_PROFILES[profile or PREPROCESS_PROFILE], PREPROCESS_ENHANCE_REGION
+    )
+
+
+def get_preprocessor():
+    """FramePreprocessor dùng chung trong process (tạo ở lần gọi đầu)"""
+    global _default_preprocessor
+    if _default_preprocessor is None:
+        _default_preprocessor = create_preprocessor()
+    return _default_preprocessor
+
+
+def preprocess_image(frame):
+    """Tăng tương phản (CLAHE trên kênh L) và làm nét frame BGR, giữ nguyên kích thước"""
+    return get_preprocessor().enhance(frame)
+
+
+def prepare_image(frame):
+    """Thu nhỏ theo RESIZE_SCALE, chuyển sang RGB rồi tiền xử lý (mảng trả về được dùng lại ở lần gọi sau)"""
+    return get_preprocessor().prepare(frame)
+
+
+def detect_face_locations(rgb_small_frame):
+    """Phát hiện khuôn mặt bằng HOG"""
+    return face_recognition.face_locations(
+        rgb_small_frame,
+        model=FACE_DETECTION_METHOD,
+        number_of_times_to_upsample=FACE_DETECTION_UPSAMPLES
+    )
+
+
+def encode_face_locations(rgb_small_frame, face_locations, num_jitters=NUM_JITTERS, preprocessor=None, model=MODEL):
+    """Tính encoding 128 chiều cho các khuôn mặt"""
+    preprocessor = preprocessor or get_preprocessor()
+    if preprocessor.enhance_region == 'face':
+        preprocessor.enhance_faces(rgb_small_frame, face_locations)
+    shapes = face_landmark_shapes(rgb_small_frame, face_locations, model)
+    return encode_face_shapes(rgb_small_frame, shapes, num_jitters)
+
 
 class FaceRecognizer:
     def __init__(self):
-        self.known_encodings = []
-        self.known_names = []
+        index = IVFIndex(IVF_NLIST, IVF_NPROBE, IVF_MIN_TRAIN_SIZE) if GALLERY_INDEX == 'ivf' else None
+        self.gallery = FaceGallery(index=index)
         self.last_detection_time = None
         self.face_hold_start_time = None
-        self.predictor = dlib.shape_predictor("shape_predictor_68_face_landmarks.dat")
-        self.detector = dlib.get_frontal_face_detector()
-
-    def load_known_faces(self, custom_data_dir=None):
+        self.face_found = False
+        # Khác None khi đang ở chế độ chờ: chỉ dò khuôn mặt ở tỉ lệ thu nhỏ này
+        self.probe_scale = None
+        # Bộ điều tốc đang ở chế độ hoạt động (có người trước camera)
+        self.governor_active = False
+        self.roi_location = None
+        self.frames_since_full_scan = 0
+        # Top-k khuôn mặt tốt nhất trong thời gian giữ mặt, chỉ encode khuôn mặt tốt nhất
+        self.keyframes = KeyframeSelector(
+            KEYFRAME_TOP_K, KEYFRAME_WEIGHTS, KEYFRAME_SHARPNESS_REF, size_ref=2 * MIN_FACE_SIZE
+        )
+        self.track_encoding = None
+        # Các FaceAnalysis của lần encode nhanh gần nhất, để encode lại khi so khớp mơ hồ
+        self.fast_encode_source = None
+        self.jitter_stats = {'fast': 0, 'rejitter': 0}
+        self.tracker = FaceTracker(
+            TRACKER_TYPE, TRACKER_MIN_SCORE, redetect_frames=TRACKER_REDETECT_FRAMES
+        ) if TRACKING_ENABLED else None
+        self.motion_gate = MotionGate(
+            MOTION_GATE_SIZE, MOTION_PIXEL_THRESHOLD, MOTION_MIN_CHANGED_RATIO,
+            MOTION_LEARNING_RATE, MOTION_MAX_SKIP_FRAMES
+        ) if MOTION_GATE_ENABLED else None
+        self.preprocessor = create_preprocessor()
+        self.liveness = TemporalLiveness(
+            LIVENESS_WINDOW, LIVENESS_MIN_FRAMES, BLINK_EAR_THRESHOLD, BLINK_OPEN_EAR,
+            HEAD_TURN_THRESHOLD, NOD_THRESHOLD
+        )
+        # Dùng chung mô hình đã nạp trong face_recognition thay vì nạp thêm một bản
+        self.predictor = face_recognition.api.pose_predictor_68_point
+        self.detector = face_recognition.api.face_detector
+        _live_recognizers.add(self)
+
+    @property
+    def known_encodings(self):
+        return self.gallery.encodings
+
+    @property
+    def known_names(self):
+        return self.gallery.names
+
+    def load_known_faces(self, custom_data_dir=None, workers=None, progress_callback=None):
         data_dir = custom_data_dir or DATA_DIR
-        valid_extensions = ['.jpg', '.jpeg', '.png', '.bmp']
+        image_paths = list_face_images(data_dir)
+        cache = EncodingCache(ENCODING_CACHE_PATH, MODEL, NUM_JITTERS) if ENCODING_CACHE_ENABLED else None
 
-        for img_name in os.listdir(data_dir):
-            if img_name.startswith('.') or not os.path.splitext(img_name)[1].lower() in valid_extensions:
-                continue
-
-            img_path = os.path.join(data_dir, img_name)
+        encodings = {}
+        pending = []
+        for img_path in image_paths:
             try:
-                img = face_recognition.load_image_file(img_path)
-                encodings = face_recognition.face_encodings(img, num_jitters=NUM_JITTERS, model=MODEL)
-                if encodings:
-                    self.known_encodings.append(encodings[0])
-                    self.known_names.append(os.path.splitext(img_name)[0])
+                found, encoding = cache.get(img_path) if cache else (False, None)
             except Exception as e:
-                print(f"Không thể xử lý ảnh {img_name}: {str(e)}")
+                print(f"Không thể đọc cache cho ảnh {os.path.basename(img_path)}: {str(e)}")
+                found, encoding = False, None
+
+            if found:
+                encodings[img_path] = encoding
+            else:
+                pending.append(img_path)
+
+        progress_callback = progress_callback or print_encoding_progress
+        for done, (img_path, encoding, error) in enumerate(encode_image_files(pending, workers), 1):
+            progress_callback(done, len(pending))
+            if error:
+                print(f"Không thể xử lý ảnh {os.path.basename(img_path)}: {error}")
                 continue
 
+            encodings[img_path] = encoding
+            if cache:
+                cache.put(img_path, encoding)
+
+        # Giữ thứ tự theo tên file dù ảnh được encode ở process nào
+        names = []
+        loaded = []
+        for img_path in image_paths:
+            encoding = encodings.get(img_path)
+            if encoding is not None:
+                names.append(gallery_key(img_path))
+                loaded.append(encoding)
+        self.gallery.add_many(names, loaded)
+
+        if cache:
+            cache.prune(data_dir, image_paths)
+            cache.save()
+
+    def add_known_face(self, name, encoding):
+        """Thêm khuôn mặt vào gallery, thay encoding cũ nếu trùng tên"""
+        self.gallery.remove(name)
+        self.gallery.add(name, encoding)
+
+    def remove_known_face(self, name):
+        """Xoá khuôn mặt khỏi gallery"""
+        return self.gallery.remove(name) > 0
+
     def preprocess_frame(self, frame):
         if frame is None:
             return None
+        return self.preprocessor.enhance(frame)
 
-        lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        l = clahe.apply(l)
-        enhanced = cv2.merge((l, a, b))
-        enhanced = cv2.cvtColor(enhanced, cv2.COLOR_LAB2BGR)
-
-        kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
-        return cv2.filter2D(enhanced, -1, kernel)
+    def set_lighting_profile(self, profile):
+        """Đổi hồ sơ ánh sáng (các bước tiền xử lý) khi đang chạy"""
+        self.preprocessor = create_preprocessor(profile)
 
     def process_frame(self, frame):
         if frame is None:
             return None, None
 
         try:
-            processed = self.preprocess_frame(frame)
-            small_frame = cv2.resize(processed, (0, 0), fx=RESIZE_SCALE, fy=RESIZE_SCALE)
-            rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-
-            face_locations = face_recognition.face_locations(
-                rgb_small_frame,
-                model=FACE_DETECTION_METHOD,
-                number_of_times_to_upsample=FACE_DETECTION_UPSAMPLES
-            )
-
-            face_encodings = face_recognition.face_encodings(
-                rgb_small_frame,
-                face_locations,
-                num_jitters=NUM_JITTERS,
-                model=MODEL
-            )
-
+            rgb_small_frame = self.prepare_frame(frame)
+            face_locations = self.locate_faces(frame, rgb_small_frame)
+            face_encodings = self.encode_faces(rgb_small_frame, face_locations)
             return face_locations, face_encodings
         except Exception as e:
             print(f"Lỗi xử lý frame: {str(e)}")
             return None, None
 
+    @metrics.timed('preprocess')
+    def prepare_frame(self, frame):
+        """Thu nhỏ, chuyển frame sang RGB và tiền xử lý cho face_recognition"""
+        return self.preprocessor.prepare(frame)
+
+    def detect_faces(self, rgb_small_frame):
+        """Phát hiện khuôn mặt bằng HOG"""
+        return detect_face_locations(rgb_small_frame)
+
+    @metrics.timed('detect')
+    def locate_faces(self, frame, rgb_small_frame):
+        """Phát hiện khuôn mặt, ưu tiên vùng quanh vị trí trước đó (ROI).
+
+        Quét toàn frame khi chưa có vị trí, khi ROI không thấy mặt hoặc sau
+        ROI_FULL_SCAN_INTERVAL lần dùng ROI liên tiếp. Vị trí trả về theo toạ độ rgb_small_frame.
+        """
+        face_locations = None
+        if (ROI_DETECTION_ENABLED and self.roi_location is not None
+                and self.frames_since_full_scan < ROI_FULL_SCAN_INTERVAL):
+            face_locations = self.detect_faces_in_roi(frame, self.roi_location)
+            self.frames_since_full_scan += 1
+
+        if not face_locations:
+            face_locations = self.detect_faces(rgb_small_frame)
+            self.frames_since_full_scan = 0
+
+        self.roi_location = face_locations[0] if face_locations else None
+        metrics.inc('faces_found', len(face_locations))
+        return face_locations
+
+    def detect_faces_in_roi(self, frame, face_location):
+        """Chạy HOG trên vùng mở rộng quanh face_location, cắt từ frame gốc (độ phân giải cao hơn)"""
+        top, right, bottom, left = [v / RESIZE_SCALE for v in face_location]
+        margin_y, margin_x = (bottom - top) * ROI_EXPAND, (right - left) * ROI_EXPAND
+        y0, x0 = max(0, int(top - margin_y)), max(0, int(left - margin_x))
+        y1 = min(frame.shape[0], int(bottom + margin_y))
+        x1 = min(frame.shape[1], int(right + margin_x))
+        if y1 <= y0 or x1 <= x0:
+            return []
+
+        rgb_roi = self.preprocessor.prepare(frame[y0:y1, x0:x1], ROI_SCALE, reuse=False)
+        roi_locations = face_recognition.face_locations(
+            rgb_roi,
+            model=FACE_DETECTION_METHOD,
+            number_of_times_to_upsample=ROI_UPSAMPLES
+        )
+
+        # Đổi về toạ độ frame đã thu nhỏ theo RESIZE_SCALE như quét toàn frame
+        def to_small(value, offset):
+            return int(round((offset + value / ROI_SCALE) * RESIZE_SCALE))
+
+        return [
+            (to_small(t, y0), to_small(r, x0), to_small(b, y0), to_small(l, x0))
+            for t, r, b, l in roi_locations
+        ]
+
+    def encode_faces(self, rgb_small_frame, face_locations):
+        """Tính encoding 128 chiều cho các khuôn mặt.
+
+        Lần encode nhanh dùng 1 jitter (ADAPTIVE_JITTER) và landmark 5 điểm (LANDMARK_CASCADE);
+        khi so khớp mơ hồ recognize_face sẽ encode lại với NUM_JITTERS và MODEL.
+        """
+        if not (ADAPTIVE_JITTER or LANDMARK_CASCADE):
+            with metrics.time('encode'):
+                return encode_face_locations(rgb_small_frame, face_locations, preprocessor=self.preprocessor)
+
+        # Giữ bản sao vì có thể phải encode lại sau khi so khớp
+        image = rgb_small_frame.copy()
+        return self.encode_analyses([self.analyse_face(None, location, image) for location in face_locations])
+
+    @metrics.timed('encode')
+    def encode_analyses(self, analyses):
+        """Encode các FaceAnalysis, chế độ nhanh nếu bật ADAPTIVE_JITTER/LANDMARK_CASCADE"""
+        if not (ADAPTIVE_JITTER or LANDMARK_CASCADE):
+            return [analysis.encoding(NUM_JITTERS, MODEL) for analysis in analyses]
+
+        encodings = [
+            analysis.encoding(1 if ADAPTIVE_JITTER else NUM_JITTERS, 'small' if LANDMARK_CASCADE else MODEL)
+            for analysis in analyses
+        ]
+        self.fast_encode_source = list(zip(analyses, encodings))
+        self.jitter_stats['fast'] += len(encodings)
+        return encodings
+
+    @metrics.timed('encode')
+    def encode_batch(self, analyses):
+        """Encode nhanh nhiều khuôn mặt của cùng một frame trong một lần gọi dlib"""
+        if not (ADAPTIVE_JITTER or LANDMARK_CASCADE):
+            return encode_analyses_batch(analyses, NUM_JITTERS, MODEL)
+
+        encodings = encode_analyses_batch(
+            analyses, 1 if ADAPTIVE_JITTER else NUM_JITTERS, 'small' if LANDMARK_CASCADE else MODEL
+        )
+        self.jitter_stats['fast'] += len(encodings)
+        return encodings
+
+    @metrics.timed('rejitter')
+    def rejitter(self, face_encoding):
+        """Encode lại với NUM_JITTERS và MODEL khuôn mặt đã cho face_encoding ở lần encode nhanh gần nhất"""
+        if self.fast_encode_source is None:
+            return None
+
+        for analysis, encoding in self.fast_encode_source:
+            if encoding is face_encoding:
+                break
+        else:
+            return None
+
+        self.fast_encode_source = None
+        # Dùng lại landmark 68 điểm nếu liveness đã tính trên cùng khuôn mặt
+        refined = analysis.encoding(NUM_JITTERS, MODEL)
+        self.jitter_stats['rejitter'] += 1
+        if self.track_encoding is face_encoding:
+            self.track_encoding = refined
+        return refined
+
+    def is_ambiguous_match(self, best_distance, second_distance):
+        """Kết quả so khớp sát ngưỡng hoặc hai ứng viên đầu quá gần nhau"""
+        if best_distance >= FACE_DETECTION_THRESHOLD + ADAPTIVE_JITTER_BAND:
+            return False
+        if abs(best_distance - FACE_DETECTION_THRESHOLD) < ADAPTIVE_JITTER_BAND:
+            return True
+        return second_distance is not None and (second_distance - best_distance) <= MATCH_MIN_MARGIN
+
+    def adaptive_jitter_stats(self):
+        """Số lần encode nhanh, số lần phải encode lại và tỉ lệ encode lại"""
+        stats = dict(self.jitter_stats)
+        stats['rejitter_rate'] = stats['rejitter'] / stats['fast'] if stats['fast'] else 0.0
+        return stats
+
+    def accept_match(self, best_match_idx, best_distance, second_distance):
+        """Tên nhân viên nếu kết quả top2 đủ gần và tách biệt với ứng viên thứ hai"""
+        if best_match_idx is None or best_distance >= FACE_DETECTION_THRESHOLD:
+            return None
+        if second_distance is None or (second_distance - best_distance) > MATCH_MIN_MARGIN:
+            return self.known_names[best_match_idx]
+        return None
+
+    @metrics.timed('match')
     def recognize_face(self, face_encoding):
-        if not self.known_encodings or face_encoding is None:
+        if not len(self.gallery) or face_encoding is None:
             return None
 
         try:
-            face_distances = face_recognition.face_distance(self.known_encodings, face_encoding)
-            best_match_idx = np.argmin(face_distances)
-
-            if face_distances[best_match_idx] < FACE_DETECTION_THRESHOLD:
-                if len(face_distances) > 1:
-                    face_distances_sorted = np.sort(face_distances)
-                    if (face_distances_sorted[1] - face_distances_sorted[0]) > 0.1:
-                        return self.known_names[best_match_idx]
-                else:
-                    return self.known_names[best_match_idx]
+            from_keyframe = face_encoding is self.track_encoding
+            best_match_idx, best_distance, second_distance = self.gallery.top2(face_encoding)
+
+            if (ADAPTIVE_JITTER or LANDMARK_CASCADE) and self.is_ambiguous_match(best_distance, second_distance):
+                refined = self.rejitter(face_encoding)
+                if refined is not None:
+                    best_match_idx, best_distance, second_distance = self.gallery.top2(refined)
+
+            name = self.accept_match(best_match_idx, best_distance, second_distance)
+            if name is not None:
+                metrics.inc('matches')
+                return name
+
+            metrics.inc('rejections', reason='unknown')
+
+            if from_keyframe:
+                # Keyframe tốt nhất không nhận diện được: lần sau thử keyframe kế tiếp
+                self.keyframes.pop_best()
+                self.track_encoding = None
             return None
         except Exception as e:
             print(f"Lỗi nhận diện: {str(e)}")
             return None
 
-    def check_face_quality(self, frame, face_location):
-        if frame is None or not face_location:
+    def analyse_face(self, frame, face_location, rgb_small_frame=None):
+        """Tạo FaceAnalysis cho khuôn mặt (toạ độ theo frame đã thu nhỏ), dùng chung giữa các bước"""
+        if rgb_small_frame is None:
+            rgb_small_frame = self.preprocessor.prepare(frame, reuse=False)
+        return FaceAnalysis(rgb_small_frame, face_location, RESIZE_SCALE, self.preprocessor,
+                            frame if LIVENESS_FULL_RESOLUTION else None)
+
+    def check_face_quality(self, frame, face_location, analysis=None):
+        if analysis is None and (frame is None or not face_location):
             return False
 
         try:
-            top, right, bottom, left = face_location
-            if (bottom - top) < MIN_FACE_SIZE or (right - left) < MIN_FACE_SIZE:
-                return False
-
-            face_region = frame[top:bottom, left:right]
-            gray_face = cv2.cvtColor(face_region, cv2.COLOR_BGR2GRAY)
-            if gray_face.std() < MIN_FACE_CONTRAST:
-                return False
-
-            return True
+            analysis = analysis or self.analyse_face(frame, face_location)
+            if analysis.is_good_quality(MIN_FACE_SIZE, MIN_FACE_CONTRAST):
+                return True
+            metrics.inc('rejections', reason='quality')
+            return False
         except Exception as e:
             print(f"Lỗi kiểm tra chất lượng: {str(e)}")
             return False
 
-    def get_facial_landmarks(self, frame, face_location):
-        """Lấy facial landmarks sử dụng dlib"""
-        top, right, bottom, left = face_location
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        rect = dlib.rectangle(left, top, right, bottom)
-        shape = self.predictor(gray, rect)
-        return np.array([[p.x, p.y] for p in shape.parts()])
-
-    def verify_liveness(self, frame, face_location, action):
-        """Xác thực người thật bằng hành động"""
-        landmarks = self.get_facial_landmarks(frame, face_location)
-
+    def get_facial_landmarks(self, frame, face_location, analysis=None):
+        """Lấy facial landmarks 68 điểm (toạ độ frame gốc)"""
+        analysis = analysis or self.analyse_face(frame, face_location)
+        return analysis.landmarks('large')
+
+    @metrics.timed('liveness')
+    def verify_liveness(self, frame, face_location, action, analysis=None):
+        """Xác thực người thật bằng hành động, dựa trên chuỗi landmark từ lúc bắt đầu yêu cầu"""
+        landmarks = self.get_facial_landmarks(frame, face_location, analysis)
+        self.liveness.push(landmarks)
+        return self.liveness.check(self.liveness_action(action))
+
+    @staticmethod
+    def liveness_action(action):
+        """Đổi câu yêu cầu trong RANDOM_ACTIONS sang hành động của TemporalLiveness"""
         if "quay đầu" in action:
-            return self.check_head_pose(landmarks, action)
+            return 'left' if "trái" in action else 'right' if "phải" in action else None
         elif "nháy mắt" in action:
-            return self.check_eye_blink(landmarks)
+            return 'blink'
         elif "gật đầu" in action:
-            return self.check_nod(landmarks)
-        return False
-
-    def check_head_pose(self, landmarks, action):
-        """Kiểm tra hướng quay đầu"""
-        nose_bridge = landmarks[27:31]
-        left_eye = landmarks[36:42]
-        right_eye = landmarks[42:48]
-
-        left_eye_center = np.mean(left_eye, axis=0)
-        right_eye_center = np.mean(right_eye, axis=0)
-
-        eye_center = (left_eye_center + right_eye_center) / 2
-        nose_tip = landmarks[30]
-
-        if "trái" in action:
-            return nose_tip[0] < eye_center[0] - 10
-        elif "phải" in action:
-            return nose_tip[0] > eye_center[0] + 10
-        return False
-
-    def check_eye_blink(self, landmarks):
-        """Kiểm tra nháy mắt"""
-        left_eye = landmarks[36:42]
-        right_eye = landmarks[42:48]
-
-        def eye_aspect_ratio(eye):
-            # Tính tỉ lệ nháy mắt
-            A = np.linalg.norm(eye[1] - eye[5])
-            B = np.linalg.norm(eye[2] - eye[4])
-            C = np.linalg.norm(eye[0] - eye[3])
-            return (A + B) / (2.0 * C)
-
-        ear_left = eye_aspect_ratio(left_eye)
-        ear_right = eye_aspect_ratio(right_eye)
-        return (ear_left < 0.2) or (ear_right < 0.2)
-
-
-    def check_nod(self, landmarks):
-        """Kiểm tra gật đầu"""
-        # Đơn giản kiểm tra sự thay đổi vị trí landmarks theo thời gian
-        if not hasattr(self, 'prev_nose_tip'):
-            self.prev_nose_tip = landmarks[30]
-            return False
+            return 'nod'
+        return None
+
+    def reset_liveness(self):
+        """Xoá chuỗi landmark, gọi khi bắt đầu một yêu cầu hành động mới"""
+        self.liveness.reset()
+
+    def probe_faces(self, frame, scale):
+        """Dò nhanh xem frame có khuôn mặt đủ lớn không ở độ phân giải thấp"""
+        rgb_small_frame = self.preprocessor.prepare(frame, scale)
+        return any(is_face_visible(location, scale) for location in self.detect_faces(rgb_small_frame))
+
+    def should_analyse(self, frame):
+        """Cổng chuyển động trước HOG: bỏ qua cảnh tĩnh trừ khi đang có người trước camera.
+
+        Người đứng yên không tạo chuyển động, nên cổng luôn mở khi frame trước (hoặc lần dò ở
+        chế độ chờ) thấy khuôn mặt, khi bộ điều tốc đang hoạt động, khi đang giữ hoặc bám khuôn mặt.
+        """
+        if self.motion_gate is None:
+            return True
 
-        movement = np.linalg.norm(landmarks[30] - self.prev_nose_tip)
-        self.prev_nose_tip = landmarks[30]
-        return movement > 5
+        face_active = (self.face_found or self.governor_active or self.face_hold_start_time is not None
+                       or (self.tracker is not None and self.tracker.active))
+        return self.motion_gate.should_process(frame, force=face_active)
 
-    def process_frame_with_verification(self, frame):
-        """Xử lý frame với xác minh đầy đủ"""
+    def reset_hold(self):
+        """Huỷ trạng thái giữ mặt hiện tại"""
+        self.face_hold_start_time = None
+        self.keyframes.reset()
+        self.track_encoding = None
+
+    def reset_session(self):
+        """Xoá trạng thái của lần dùng trước khi FaceRecognizer được dùng lại cho lần mở camera mới"""
+        self.reset_hold()
+        self.reset_liveness()
+        self.face_found = False
+        self.probe_scale = None
+        self.governor_active = False
+        self.roi_location = None
+        self.frames_since_full_scan = 0
+        self.fast_encode_source = None
+        if self.tracker is not None:
+            self.tracker.reset()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+
+    def process_frame_with_verification(self, frame, analysis=None):
+        """Xử lý frame với xác minh đầy đủ.
+
+        analysis: (face_locations, face_encodings) đã tính sẵn, ví dụ bởi FramePipeline.
+        """
         try:
             if frame is None:
+                self.face_found = False
+                return None
+
+            # Cổng chuyển động dùng face_found của frame trước nên chỉ xoá sau khi qua cổng
+            gated = analysis is None and not self.should_analyse(frame)
+            self.face_found = False
+            if gated:
+                return None
+
+            if self.probe_scale is not None and analysis is None:
+                # Chế độ chờ: chỉ dò xem có ai không, frame sau mới xử lý đầy đủ
+                self.face_found = self.probe_faces(frame, self.probe_scale)
                 return None
 
-            # Xử lý frame với HOG
-            face_locations, face_encodings = self.process_frame(frame)
+            metrics.inc('frames_analysed')
+            if self.tracker is not None and analysis is None:
+                return self._process_frame_tracked(frame)
+
+            # Xử lý frame với HOG; encoding chỉ được tính khi đã giữ mặt đủ lâu
+            rgb_small_frame = None
+            if analysis is not None:
+                face_locations, face_encodings = analysis
+            else:
+                rgb_small_frame = self.prepare_frame(frame)
+                face_locations, face_encodings = self.locate_faces(frame, rgb_small_frame), None
             if not face_locations:
-                self.face_hold_start_time = None
+                self.reset_hold()
                 return None
 
+            self.face_found = any(is_face_visible(location) for location in face_locations)
             # Lấy khuôn mặt chính
             main_face_location = face_locations[0]
+            face = self.analyse_face(frame, main_face_location, rgb_small_frame)
 
             # Kiểm tra chất lượng
-            if not self.check_face_quality(frame, main_face_location):
-                self.face_hold_start_time = None
+            if not self.check_face_quality(frame, main_face_location, face):
+                self.reset_hold()
                 return None
 
-            # Xử lý thời gian giữ mặt
-            current_time = time.time()
-            if self.face_hold_start_time is None:
-                self.face_hold_start_time = current_time
-                return None
+            if face_encodings:
+                # Pipeline đã encode sẵn mọi frame
+                return self._hold_face(main_face_location, face_encodings[0])
+            self.keyframes.offer(face)
+            return self._hold_face(main_face_location)
+
+        except Exception as e:
+            print(f"Lỗi xử lý xác minh: {str(e)}")
+            self.reset_hold()
+            return None
+
+    def _process_frame_tracked(self, frame):
+        """Giữ mặt bằng tracker: chỉ chạy HOG khi mất dấu, chỉ encode keyframe tốt nhất"""
+        rgb_small_frame = self.prepare_frame(frame)
 
-            if current_time - self.face_hold_start_time < HOLD_FACE_TIME:
+        location = None
+        if self.tracker.active and not self.tracker.needs_redetect:
+            location = self.tracker.update(rgb_small_frame)
+
+        if location is None:
+            previous = self.tracker.location
+            face_locations = self.locate_faces(frame, rgb_small_frame)
+            if not face_locations:
+                self.tracker.reset()
+                self.reset_hold()
                 return None
 
-            return (main_face_location, face_encodings[0], True)
+            location = face_locations[0]
+            # Phát hiện lại định kỳ: vẫn là cùng người nếu trùng vị trí đang bám
+            if previous is None or box_iou(previous, location) < TRACKER_MIN_IOU:
+                self.reset_hold()
+            self.tracker.start(rgb_small_frame, location)
 
-        except Exception as e:
-            print(f"Lỗi xử lý xác minh: {str(e)}")
-            self.face_hold_start_time = None
+        self.face_found = is_face_visible(location)
+        face = self.analyse_face(frame, location, rgb_small_frame)
+        if not self.check_face_quality(frame, location, face):
+            self.reset_hold()
             return None
 
+        self.keyframes.offer(face)
+        return self._hold_face(location)
+
+    def _hold_face(self, location, face_encoding=None):
+        """Đếm thời gian giữ mặt; khi đủ HOLD_FACE_TIME trả về kết quả với encoding của keyframe tốt nhất"""
+        current_time = time.time()
+        if self.face_hold_start_time is None:
+            self.face_hold_start_time = current_time
+            return None
+
+        if current_time - self.face_hold_start_time < HOLD_FACE_TIME:
+            return None
+
+        if face_encoding is None:
+            face_encoding = self._keyframe_encoding()
+        return (location, face_encoding, True)
+
+    def _keyframe_encoding(self):
+        """Encoding của keyframe tốt nhất, chỉ tính một lần cho mỗi keyframe"""
+        if self.track_encoding is None:
+            self.track_encoding = self.encode_analyses([self.keyframes.best()])[0]
+        return self.track_encoding
+
     def log_detection(self, frame, face_location, name, success, status="in"):
         """Ghi log nhận diện theo ngày và trạng thái"""
         try:
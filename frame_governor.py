@@ -0,0 +1,54 @@
+from config import MIN_FACE_SIZE, MIN_FACE_VISIBILITY, RESIZE_SCALE
+
+
+def is_face_visible(face_location, scale=RESIZE_SCALE):
+    """Khuôn mặt đủ lớn để tính là có người trước camera; toạ độ theo frame thu nhỏ scale"""
+    top, right, bottom, left = face_location
+    return min(bottom - top, right - left) / scale >= MIN_FACE_VISIBILITY * MIN_FACE_SIZE
+
+
+class FrameRateGovernor:
+    """Điều tốc vòng nhận diện theo hai trạng thái.
+
+    - idle: không có ai trước camera, phân tích thưa và chỉ dò khuôn mặt ở độ phân giải thấp
+    - active: vừa thấy khuôn mặt, phân tích dày ở độ phân giải đầy đủ
+
+    Chuyển sang active ngay khi thấy khuôn mặt, về idle sau no_detection_threshold
+    lần phân tích liên tiếp không thấy ai.
+    """
+
+    IDLE = 'idle'
+    ACTIVE = 'active'
+
+    def __init__(self, idle_interval, active_interval, idle_scale, no_detection_threshold):
+        self.idle_interval = idle_interval
+        self.active_interval = active_interval
+        self.idle_scale = idle_scale
+        self.no_detection_threshold = no_detection_threshold
+        self.state = self.IDLE
+        self.misses = 0
+        self.transitions = 0
+
+    @property
+    def interval(self):
+        """Khoảng cách giữa hai lần phân tích (ms)"""
+        return self.active_interval if self.state == self.ACTIVE else self.idle_interval
+
+    @property
+    def probe_scale(self):
+        """Tỉ lệ thu nhỏ để dò khuôn mặt ở chế độ chờ, None khi đang hoạt động"""
+        return self.idle_scale if self.state == self.IDLE else None
+
+    def update(self, face_found):
+        """Cập nhật trạng thái theo kết quả phân tích gần nhất, trả về interval mới"""
+        if face_found:
+            self.misses = 0
+            if self.state == self.IDLE:
+                self.state = self.ACTIVE
+                self.transitions += 1
+        else:
+            self.misses += 1
+            if self.state == self.ACTIVE and self.misses >= self.no_detection_threshold:
+                self.state = self.IDLE
+                self.transitions += 1
+        return self.interval
@@ -0,0 +1,268 @@
+import glob
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from camera import CameraStream
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class ReplaySource:
+    """Nguồn frame ghi sẵn (video, thư mục ảnh, giả lập) có cùng giao diện với CameraStream.
+
+    realtime=True: phát theo fps như camera thật; sau start() một thread giữ frame mới nhất,
+    consumer chậm sẽ bị bỏ frame. realtime=False: phát nhanh nhất có thể, mỗi lần
+    wait_for_frame() lấy đúng frame kế tiếp nên không frame nào bị bỏ (dùng để đo hiệu năng).
+    Khi chưa start(), read() tự lấy frame kế tiếp như cv2.VideoCapture.read().
+    """
+
+    def __init__(self, fps=30.0, realtime=True, loop=False, size=None):
+        self.fps = fps or 30.0
+        self.realtime = realtime
+        self.loop = loop
+        self.size = size
+        self.finished = False
+        self.frames_read = 0
+
+        self._condition = threading.Condition()
+        self._lock = threading.Lock()
+        self._frame = None
+        self._seq = 0
+        self._started_at = None
+        self._running = False
+        self._closed = False
+        self._thread = None
+
+    # Các lớp con cài đặt
+    def _next_frame(self):
+        """Frame BGR kế tiếp, None khi hết"""
+        raise NotImplementedError
+
+    def _rewind(self):
+        """Quay về frame đầu, False nếu không hỗ trợ"""
+        return False
+
+    def _close(self):
+        pass
+
+    def _advance(self):
+        """Đọc frame kế tiếp vào slot, trả về False khi đã hết nguồn"""
+        frame = self._next_frame()
+        if frame is None and self.loop and self._rewind():
+            frame = self._next_frame()
+        if frame is None:
+            self.finished = True
+            return False
+
+        if self.size and (frame.shape[1], frame.shape[0]) != tuple(self.size):
+            frame = cv2.resize(frame, tuple(self.size))
+        self.frames_read += 1
+        with self._condition:
+            self._frame = frame
+            self._seq += 1
+            self._condition.notify_all()
+        return True
+
+    def _due_frames(self):
+        """Số frame phải có theo thời gian thực kể từ frame đầu"""
+        if self._started_at is None:
+            self._started_at = time.time()
+            return 1
+        return int((time.time() - self._started_at) * self.fps) + 1
+
+    def start(self):
+        if self._running or self._closed:
+            return self
+
+        self._running = True
+        if self.realtime:
+            self._thread = threading.Thread(target=self._reader, name="frame-source", daemon=True)
+            self._thread.start()
+        return self
+
+    def _reader(self):
+        self._started_at = time.time()
+        while self._running and self._advance():
+            delay = self._started_at + self.frames_read / self.fps - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+    def isOpened(self):
+        return not self._closed
+
+    def set(self, prop, value):
+        # Kích thước được chỉnh qua size, các thuộc tính camera không áp dụng
+        return False
+
+    def read(self):
+        """Như cv2.VideoCapture.read(); sau start() chỉ trả về frame hiện tại, không chờ"""
+        if not self._running and not self._closed and not self.finished:
+            with self._lock:
+                if not self.realtime:
+                    self._advance()
+                else:
+                    # Bỏ các frame đã trễ so với thời gian thực
+                    while self.frames_read < self._due_frames() and self._advance():
+                        pass
+        with self._condition:
+            return self._frame is not None, self._frame
+
+    def wait_for_frame(self, last_seq, timeout=None):
+        """Chờ frame mới hơn last_seq, trả về (seq, frame)"""
+        if self._thread is None and not self.finished:
+            with self._lock:
+                if self._seq == last_seq:
+                    self._advance()
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq != last_seq or self._closed, timeout)
+            return self._seq, self._frame
+
+    def release(self):
+        self._running = False
+        self._closed = True
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self._close()
+
+
+class VideoFileSource(ReplaySource):
+    """Phát lại một file video, fps lấy từ file nếu không chỉ định"""
+
+    def __init__(self, path, fps=None, **kwargs):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        super().__init__(fps or self.cap.get(cv2.CAP_PROP_FPS) or 30.0, **kwargs)
+        if not self.cap.isOpened():
+            self._closed = True
+
+    def _next_frame(self):
+        ret, frame = self.cap.read()
+        return frame if ret else None
+
+    def _rewind(self):
+        return self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _close(self):
+        self.cap.release()
+
+
+class ImageDirectorySource(ReplaySource):
+    """Phát lần lượt các ảnh trong thư mục theo thứ tự tên file"""
+
+    def __init__(self, path, fps=10.0, **kwargs):
+        super().__init__(fps or 10.0, **kwargs)
+        self.path = path
+        self.files = sorted(
+            file for file in glob.glob(os.path.join(path, '*'))
+            if file.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.index = 0
+        if not self.files:
+            self._closed = True
+
+    def _next_frame(self):
+        while self.index < len(self.files):
+            frame = cv2.imread(self.files[self.index])
+            self.index += 1
+            if frame is not None:
+                return frame
+            print(f"Bỏ qua ảnh không đọc được: {self.files[self.index - 1]}")
+        return None
+
+    def _rewind(self):
+        self.index = 0
+        return bool(self.files)
+
+
+class SyntheticSource(ReplaySource):
+    """Sinh frame giả lập: nền nhiễu, có thể dán ảnh khuôn mặt xuất hiện rồi biến mất theo chu kỳ.
+
+    Thời gian trong cảnh tính theo số frame/fps nên kết quả lặp lại được ở mọi tốc độ phát.
+    face_image: đường dẫn ảnh chân dung (ví dụ ảnh trong DATA_DIR), None = chỉ có nền.
+    """
+
+    def __init__(self, width=640, height=480, fps=30.0, face_image=None, present=4.0, absent=2.0,
+                 duration=None, seed=0, **kwargs):
+        super().__init__(fps or 30.0, **kwargs)
+        self.width = width
+        self.height = height
+        self.present = present
+        self.absent = absent
+        self.total_frames = int(duration * self.fps) if duration else None
+        self.index = 0
+        self.rng = np.random.default_rng(seed)
+        # Nền cố định + một ít nhiễu mỗi frame, giống cảm biến camera
+        self.background = cv2.GaussianBlur(
+            self.rng.integers(40, 200, (height, width, 3), dtype=np.uint8), (31, 31), 0
+        )
+        self.face = None
+        if face_image:
+            face = cv2.imread(face_image)
+            if face is None:
+                raise ValueError(f"Không đọc được ảnh khuôn mặt: {face_image}")
+            # Khuôn mặt chiếm khoảng một nửa chiều cao frame
+            scale = min(height * 0.6 / face.shape[0], width * 0.5 / face.shape[1])
+            self.face = cv2.resize(face, None, fx=scale, fy=scale)
+
+    def _next_frame(self):
+        if self.total_frames is not None and self.index >= self.total_frames:
+            return None
+
+        t = self.index / self.fps
+        self.index += 1
+        noise = self.rng.integers(-4, 5, self.background.shape, dtype=np.int16)
+        frame = np.clip(self.background.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+        period = self.present + self.absent
+        if self.face is not None and (t % period) < self.present:
+            fh, fw = self.face.shape[:2]
+            # Lắc nhẹ quanh tâm frame như người đứng trước camera
+            x = (self.width - fw) // 2 + int(6 * np.sin(t * 2.0))
+            y = (self.height - fh) // 2 + int(4 * np.cos(t * 1.5))
+            x = min(max(x, 0), self.width - fw)
+            y = min(max(y, 0), self.height - fh)
+            frame[y:y + fh, x:x + fw] = self.face
+        return frame
+
+    def _rewind(self):
+        self.index = 0
+        return True
+
+
+def open_frame_source(spec=0, width=640, height=480, realtime=True, loop=False, fps=None, threaded=True):
+    """Mở nguồn frame theo spec:
+
+    - số hoặc chuỗi số, URL (rtsp://, http://): camera trực tiếp
+    - 'synthetic' hoặc 'synthetic:<ảnh khuôn mặt>': frame giả lập
+    - thư mục: ảnh trong thư mục
+    - đường dẫn file: video
+
+    threaded=False với camera trả về cv2.VideoCapture như trước (vòng đọc không dùng thread).
+    Camera luôn chạy theo thời gian thực; realtime/loop/fps chỉ áp dụng cho nguồn ghi sẵn.
+    """
+    if isinstance(spec, str) and spec.isdigit():
+        spec = int(spec)
+
+    if isinstance(spec, int) or '://' in spec:
+        if threaded:
+            return CameraStream(spec, width, height)
+        cap = cv2.VideoCapture(spec)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        return cap
+
+    size = (width, height) if width and height else None
+    if spec == 'synthetic' or spec.startswith('synthetic:'):
+        face_image = spec.partition(':')[2] or None
+        return SyntheticSource(width or 640, height or 480, fps, face_image, realtime=realtime, loop=loop)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, fps, realtime=realtime, loop=loop, size=size)
+    if os.path.isfile(spec):
+        return VideoFileSource(spec, fps, realtime=realtime, loop=loop, size=size)
+    raise ValueError(f"Không tìm thấy nguồn frame: {spec}")
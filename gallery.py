@@ -0,0 +1,298 @@
+import numpy as np
+
+ENCODING_SIZE = 128
+
+
+class FaceGallery:
+    """Ma trận encoding float32 liên tục (N x 128) cấp phát trước, tăng kích thước tại chỗ.
+
+    Khoảng cách Euclid được tính qua |a|^2 + |b|^2 - 2a.b với chuẩn đã tính sẵn,
+    mọi phép tính ghi vào buffer có sẵn nên mỗi lần so khớp không cấp phát bộ nhớ.
+    """
+
+    def __init__(self, capacity=1024, dim=ENCODING_SIZE, index=None):
+        self.dim = dim
+        self.names = []
+        self.index = index
+        self._size = 0
+        self._allocate(max(capacity, 1))
+
+    def _allocate(self, capacity):
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        norms = np.zeros(capacity, dtype=np.float32)
+        if hasattr(self, '_matrix'):
+            matrix[:self._size] = self._matrix[:self._size]
+            norms[:self._size] = self._norms[:self._size]
+        self._matrix = matrix
+        self._norms = norms
+        self._scratch = np.empty(capacity, dtype=np.float32)
+        self._query = np.empty(self.dim, dtype=np.float32)
+
+    def _reserve(self, size):
+        capacity = len(self._matrix)
+        if size > capacity:
+            while capacity < size:
+                capacity *= 2
+            self._allocate(capacity)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return len(self._matrix)
+
+    @property
+    def encodings(self):
+        """View (không copy) của các encoding đang dùng"""
+        return self._matrix[:self._size]
+
+    def add(self, name, encoding):
+        """Thêm một encoding, trả về chỉ số hàng"""
+        self._reserve(self._size + 1)
+        idx = self._size
+        self._matrix[idx] = encoding
+        self._norms[idx] = np.dot(self._matrix[idx], self._matrix[idx])
+        self.names.append(name)
+        self._size += 1
+        if self.index is not None:
+            self.index.add(idx, self._matrix[idx:idx + 1], self.encodings)
+        return idx
+
+    def add_many(self, names, encodings):
+        """Thêm nhiều encoding cùng lúc"""
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        if len(names) != len(encodings):
+            raise ValueError("Số tên và số encoding không khớp")
+
+        start = self._size
+        self._reserve(start + len(encodings))
+        rows = self._matrix[start:start + len(encodings)]
+        rows[:] = encodings
+        np.einsum('ij,ij->i', rows, rows, out=self._norms[start:start + len(encodings)])
+        self.names.extend(names)
+        self._size += len(encodings)
+        if self.index is not None:
+            self.index.add(start, rows, self.encodings)
+
+    def remove(self, name):
+        """Xoá mọi encoding mang tên này (đổi chỗ với hàng cuối), trả về số hàng đã xoá"""
+        removed = 0
+        idx = 0
+        while idx < self._size:
+            if self.names[idx] != name:
+                idx += 1
+                continue
+
+            last = self._size - 1
+            if self.index is not None:
+                self.index.remove(idx, last)
+            if idx != last:
+                self._matrix[idx] = self._matrix[last]
+                self._norms[idx] = self._norms[last]
+                self.names[idx] = self.names[last]
+            self.names.pop()
+            self._size -= 1
+            removed += 1
+        return removed
+
+    def clear(self):
+        self.names = []
+        self._size = 0
+        if self.index is not None:
+            self.index.reset()
+
+    def distances(self, encoding):
+        """Khoảng cách bình phương tới mọi encoding, trả về view của buffer dùng chung"""
+        n = self._size
+        query = self._query
+        query[:] = encoding
+        out = self._scratch[:n]
+        np.dot(self._matrix[:n], query, out=out)
+        out *= -2.0
+        out += self._norms[:n]
+        out += np.dot(query, query)
+        return out
+
+    def top2(self, encoding):
+        """Tìm 2 encoding gần nhất, O(N) khi quét toàn bộ.
+
+        Nếu có chỉ mục đã huấn luyện thì chỉ xét các ứng viên của chỉ mục.
+        Trả về (chỉ số tốt nhất, khoảng cách tốt nhất, khoảng cách thứ hai hoặc None).
+        """
+        if self._size == 0:
+            return None, None, None
+
+        if self.index is not None and self.index.is_trained:
+            self._query[:] = encoding
+            rows = self.index.candidates(self._query)
+            if len(rows):
+                dist_sq = self._matrix[rows] @ self._query
+                dist_sq *= -2.0
+                dist_sq += self._norms[rows]
+                dist_sq += np.dot(self._query, self._query)
+                return self._top2(dist_sq, rows)
+
+        return self._top2(self.distances(encoding))
+
+    def top2_many(self, encodings):
+        """top2 cho nhiều encoding cùng lúc; khi quét toàn bộ chỉ cần một phép nhân ma trận (M x N)"""
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        if self._size == 0:
+            return [(None, None, None)] * len(queries)
+        if self.index is not None and self.index.is_trained:
+            return [self.top2(query) for query in queries]
+
+        n = self._size
+        dist_sq = queries @ self._matrix[:n].T
+        dist_sq *= -2.0
+        dist_sq += self._norms[:n]
+        dist_sq += np.einsum('ij,ij->i', queries, queries)[:, None]
+        return [self._top2(row) for row in dist_sq]
+
+    @staticmethod
+    def _top2(dist_sq, rows=None):
+        best_pos = int(np.argmin(dist_sq))
+        best = float(np.sqrt(max(float(dist_sq[best_pos]), 0.0)))
+        best_idx = int(rows[best_pos]) if rows is not None else best_pos
+        if len(dist_sq) == 1:
+            return best_idx, best, None
+
+        dist_sq[best_pos] = np.inf
+        second = float(dist_sq[int(np.argmin(dist_sq))])
+        return best_idx, best, float(np.sqrt(max(second, 0.0)))
+
+
+class IVFIndex:
+    """Chỉ mục xấp xỉ IVF thuần NumPy cho gallery lớn.
+
+    Encoding được chia vào nlist cụm bằng k-means; mỗi lần tìm chỉ tính khoảng cách
+    chính xác trên nprobe cụm gần nhất. Tăng nprobe để tăng recall, giảm để nhanh hơn.
+    Chưa đủ min_train_size encoding thì gallery vẫn quét toàn bộ.
+    """
+
+    def __init__(self, nlist=0, nprobe=8, min_train_size=5000, retrain_factor=2.0,
+                 train_iterations=10, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_factor = retrain_factor
+        self.train_iterations = train_iterations
+        self._rng = np.random.default_rng(seed)
+        self.reset()
+
+    def reset(self):
+        self.centroids = None
+        self._centroid_norms = None
+        self._lists = []
+        self._counts = np.zeros(0, dtype=np.int64)
+        self._assign = np.zeros(0, dtype=np.int64)
+        self._pos = np.zeros(0, dtype=np.int64)
+        self._trained_size = 0
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def _nearest_centroids(self, data, chunk_size=16384):
+        """Cụm gần nhất cho từng hàng, tính theo khối để giới hạn bộ nhớ"""
+        labels = np.empty(len(data), dtype=np.int64)
+        for start in range(0, len(data), chunk_size):
+            chunk = data[start:start + chunk_size]
+            scores = chunk @ self.centroids.T
+            scores *= -2.0
+            scores += self._centroid_norms
+            labels[start:start + chunk_size] = np.argmin(scores, axis=1)
+        return labels
+
+    def train(self, matrix):
+        """Chạy k-means trên (mẫu của) gallery rồi dựng lại các danh sách đảo"""
+        n = len(matrix)
+        nlist = min(self.nlist or max(1, int(4 * np.sqrt(n))), n)
+        sample_size = min(n, nlist * 64)
+        sample = matrix[np.sort(self._rng.choice(n, sample_size, replace=False))]
+
+        self.centroids = sample[self._rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            self._centroid_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+            labels = self._nearest_centroids(sample)
+            counts = np.bincount(labels, minlength=nlist)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, labels, sample)
+
+            empty = counts == 0
+            sums[~empty] /= counts[~empty, None]
+            # Cụm rỗng lấy lại một điểm ngẫu nhiên
+            sums[empty] = sample[self._rng.choice(sample_size, int(empty.sum()))]
+            self.centroids = sums
+        self._centroid_norms = np.einsum('ij,ij->i', self.centroids, self.centroids)
+
+        self._lists = [np.empty(16, dtype=np.int64) for _ in range(nlist)]
+        self._counts = np.zeros(nlist, dtype=np.int64)
+        self._assign = np.zeros(0, dtype=np.int64)
+        self._pos = np.zeros(0, dtype=np.int64)
+        self._insert(0, self._nearest_centroids(matrix))
+        self._trained_size = n
+
+    def _reserve_rows(self, size):
+        if size > len(self._assign):
+            capacity = max(size, 2 * len(self._assign), 1024)
+            self._assign = np.resize(self._assign, capacity)
+            self._pos = np.resize(self._pos, capacity)
+
+    def _insert(self, start, labels):
+        self._reserve_rows(start + len(labels))
+        for offset, label in enumerate(labels):
+            row = start + offset
+            bucket = self._lists[label]
+            count = self._counts[label]
+            if count == len(bucket):
+                bucket = self._lists[label] = np.resize(bucket, 2 * len(bucket))
+            bucket[count] = row
+            self._assign[row] = label
+            self._pos[row] = count
+            self._counts[label] = count + 1
+
+    def maybe_train(self, matrix):
+        """Huấn luyện lần đầu hoặc huấn luyện lại khi gallery đã lớn gấp retrain_factor"""
+        n = len(matrix)
+        if n < self.min_train_size:
+            return False
+        if self.is_trained and n < self._trained_size * self.retrain_factor:
+            return False
+        self.train(matrix)
+        return True
+
+    def add(self, start, rows, matrix):
+        """Thêm các hàng [start, start + len(rows)) vừa được ghi vào gallery"""
+        if self.maybe_train(matrix) or not self.is_trained:
+            return
+        self._insert(start, self._nearest_centroids(rows))
+
+    def remove(self, row, last):
+        """Xoá hàng row; hàng cuối (last) được gallery chuyển vào vị trí row"""
+        if not self.is_trained:
+            return
+
+        label = self._assign[row]
+        bucket = self._lists[label]
+        count = self._counts[label] - 1
+        moved = bucket[count]
+        bucket[self._pos[row]] = moved
+        self._pos[moved] = self._pos[row]
+        self._counts[label] = count
+
+        if row != last:
+            label = self._assign[last]
+            self._lists[label][self._pos[last]] = row
+            self._assign[row] = label
+            self._pos[row] = self._pos[last]
+
+    def candidates(self, query):
+        """Chỉ số các hàng thuộc nprobe cụm gần query nhất"""
+        scores = self.centroids @ query
+        scores *= -2.0
+        scores += self._centroid_norms
+        nprobe = min(self.nprobe, len(scores))
+        probes = np.argpartition(scores, nprobe - 1)[:nprobe] if nprobe < len(scores) else range(len(scores))
+        return np.concatenate([self._lists[c][:self._counts[c]] for c in probes])
@@ -0,0 +1,76 @@
+import heapq
+import itertools
+
+import cv2
+
+
+def frontal_symmetry(gray_face):
+    """Độ đối xứng trái/phải của vùng mặt (0..1), khuôn mặt nhìn thẳng cho giá trị cao"""
+    if gray_face.size == 0 or gray_face.shape[1] < 2:
+        return 0.0
+    half = gray_face.shape[1] // 2
+    left = gray_face[:, :half]
+    right = cv2.flip(gray_face[:, -half:], 1)
+    return 1.0 - float(cv2.absdiff(left, right).mean()) / 255.0
+
+
+class KeyframeSelector:
+    """Giữ top-k khuôn mặt tốt nhất trong thời gian giữ mặt để chỉ encode frame tốt nhất.
+
+    Điểm là tổng có trọng số của các chỉ số rẻ đã có trong FaceAnalysis: độ nét, độ tương phản,
+    kích thước và độ nhìn thẳng (đối xứng), mỗi chỉ số được chuẩn hoá về 0..1.
+    """
+
+    def __init__(self, k=3, weights=None, sharpness_ref=100.0, contrast_ref=64.0, size_ref=100):
+        self.k = k
+        self.weights = weights or {'sharpness': 0.4, 'contrast': 0.2, 'size': 0.2, 'frontal': 0.2}
+        self.sharpness_ref = sharpness_ref
+        self.contrast_ref = contrast_ref
+        self.size_ref = size_ref
+        self._heap = []
+        self._seq = itertools.count()
+        self.offered = 0
+
+    def reset(self):
+        self._heap = []
+        self.offered = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def score(self, face):
+        """Điểm chất lượng của một FaceAnalysis"""
+        quality = face.quality
+        metrics = {
+            'sharpness': quality['sharpness'] / (quality['sharpness'] + self.sharpness_ref),
+            'contrast': min(quality['contrast'] / self.contrast_ref, 1.0),
+            'size': min(min(quality['height'], quality['width']) / self.size_ref, 1.0),
+            'frontal': frontal_symmetry(face.gray),
+        }
+        return sum(self.weights.get(name, 0.0) * value for name, value in metrics.items())
+
+    def offer(self, face):
+        """Chấm điểm khuôn mặt, giữ lại (bản sao vùng mặt) nếu thuộc top-k; trả về điểm"""
+        self.offered += 1
+        score = self.score(face)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, (score, next(self._seq), face.crop()))
+        elif score > self._heap[0][0]:
+            heapq.heapreplace(self._heap, (score, next(self._seq), face.crop()))
+        return score
+
+    def best(self):
+        """FaceAnalysis điểm cao nhất, None nếu chưa có"""
+        if not self._heap:
+            return None
+        return max(self._heap)[2]
+
+    def pop_best(self):
+        """Bỏ khuôn mặt tốt nhất (ví dụ vì không nhận diện được) để lần sau dùng khuôn mặt kế tiếp"""
+        if self._heap:
+            self._heap.remove(max(self._heap))
+            heapq.heapify(self._heap)
+
+    def scores(self):
+        """Điểm của các khuôn mặt đang giữ, từ cao xuống thấp"""
+        return sorted((entry[0] for entry in self._heap), reverse=True)
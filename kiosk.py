@@ -0,0 +1,224 @@
+"""Chạy chấm công khuôn mặt không cần giao diện (máy kiosk không màn hình, đo hiệu năng).
+
+Chạy: python kiosk.py [--source 0] [--size 640 480] [--set KEY=VALUE ...] [--report-interval 30]
+      python kiosk.py --set MULTI_FACE_ENABLED=True --set HOLD_FACE_TIME=1
+      python kiosk.py --source video.mp4 --fast   (phát file nhanh nhất có thể, xem frame_sources.py)
+"""
+import argparse
+import ast
+import os
+import signal
+import threading
+import time
+
+import config
+
+
+def parse_override(text):
+    """'KEY=VALUE' -> (KEY, giá trị Python); giá trị không phải literal được giữ nguyên dạng chuỗi"""
+    key, sep, value = text.partition('=')
+    key = key.strip()
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"Cần dạng KEY=VALUE: {text}")
+    if not hasattr(config, key):
+        raise argparse.ArgumentTypeError(f"Không có cấu hình {key}")
+    try:
+        return key, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return key, value
+
+
+# Cấu hình tính từ cấu hình khác trong config.py: (cấu hình nguồn, cách tính), theo thứ tự phụ thuộc
+DERIVED = {
+    'DATABASE_PATH': (('BASE_DIR',), lambda c: os.path.join(c.BASE_DIR, 'database', 'attendance.db')),
+    'DATA_DIR': (('BASE_DIR',), lambda c: os.path.join(c.BASE_DIR, 'datas')),
+    'EXPORT_DIR': (('BASE_DIR',), lambda c: os.path.join(c.BASE_DIR, 'exports')),
+    'LOG_DIR': (('BASE_DIR',), lambda c: os.path.join(c.BASE_DIR, 'logs')),
+    'CACHE_DIR': (('BASE_DIR',), lambda c: os.path.join(c.BASE_DIR, 'cache')),
+    'ENCODING_CACHE_PATH': (('CACHE_DIR',), lambda c: os.path.join(c.CACHE_DIR, 'encodings.npz')),
+    'EMBEDDING_MODEL_VERSION': (('MODEL',), lambda c: f'dlib_face_recognition_resnet_model_v1/{c.MODEL}'),
+    'METRICS_FILE': (('LOG_DIR',), lambda c: os.path.join(c.LOG_DIR, 'metrics.prom')),
+    'TRACE_FILE': (('LOG_DIR',), lambda c: os.path.join(c.LOG_DIR, 'checkin_traces.jsonl')),
+    'PROFILE_DIR': (('LOG_DIR',), lambda c: os.path.join(c.LOG_DIR, 'profiles')),
+}
+
+
+def apply_overrides(overrides):
+    """Ghi đè config trước khi nạp các module dùng `from config import *`.
+
+    Cấu hình suy ra (DERIVED) được tính lại khi cấu hình nguồn đổi, trừ khi được ghi đè trực tiếp.
+    Mọi giá trị đã đổi được ghi vào biến môi trường config.OVERRIDES_ENV để các process con
+    (encode song song, FramePipeline) nạp config giống process chính.
+    """
+    changed = {}
+    for key, value in overrides:
+        setattr(config, key, value)
+        changed[key] = value
+        print(f"Cấu hình: {key} = {value!r}")
+
+    for key, (sources, derive) in DERIVED.items():
+        if key in changed or not any(source in changed for source in sources):
+            continue
+        value = derive(config)
+        if value != getattr(config, key):
+            setattr(config, key, value)
+            changed[key] = value
+            print(f"Cấu hình: {key} = {value!r} (tính lại)")
+
+    for key in ('LOG_DIR', 'CACHE_DIR', 'DATA_DIR', 'EXPORT_DIR'):
+        if key in changed:
+            os.makedirs(changed[key], exist_ok=True)
+
+    if changed:
+        inherited = ast.literal_eval(os.environ.get(config.OVERRIDES_ENV) or '{}')
+        inherited.update(changed)
+        os.environ[config.OVERRIDES_ENV] = repr(inherited)
+    return changed
+
+
+class KioskRunner:
+    """Nối camera, FaceRecognizer, chấm công và ghi log mà không cần Tkinter"""
+
+    def __init__(self, source=0, size=(640, 480), report_interval=30, cooldown=2, max_checkins=0,
+                 realtime=True, loop=False, fps=None, verbose=True):
+        from checkin import CheckInEngine
+        from frame_sources import open_frame_source
+        from metrics import metrics, start_export
+        from profiling import install_profiling, profiler
+        from models.employee_model import EmployeeModel
+
+        self.model = EmployeeModel()
+        self.engine = CheckInEngine(self.model, self.on_message)
+        self.cap = open_frame_source(source, *size, realtime=realtime, loop=loop, fps=fps)
+        self.metrics = metrics
+        self.profiler = profiler
+        start_export()
+        install_profiling()
+        self.verbose = verbose
+        self.report_interval = report_interval
+        self.cooldown = cooldown
+        self.max_checkins = max_checkins
+        self.checkins = 0
+        self.frames = 0
+        # Độ trễ mỗi lượt chấm công: từ frame đầu tiên thấy khuôn mặt đến khi chấm công xong
+        self.attempt_started = None
+        self.attempt_frames = 0
+        self.latencies = []
+        self.last_message = None
+        self.stop_event = threading.Event()
+
+    def on_message(self, message, color="blue"):
+        # Bỏ thông báo lặp lại mỗi frame (ví dụ đếm ngược giữ mặt)
+        if message != self.last_message and self.verbose:
+            print(f"[{time.strftime('%H:%M:%S')}] {message}")
+            self.last_message = message
+
+    def run(self, duration=0):
+        if not self.cap.isOpened():
+            raise RuntimeError("Không thể mở camera")
+
+        self.cap.start()
+        started = last_report = time.time()
+        last_seq = 0
+        try:
+            while not self.stop_event.is_set():
+                if duration and time.time() - started > duration:
+                    break
+
+                with self.engine.stats.measure('capture'):
+                    seq, frame = self.cap.wait_for_frame(last_seq, timeout=0.5)
+                if frame is None or seq == last_seq:
+                    if self.cap.finished:
+                        break
+                    continue
+                last_seq = seq
+                self.frames += 1
+
+                loop_started = time.time()
+                processed_frame, result = self.engine.process_frame(frame)
+                self.track_attempt(loop_started)
+                if result:
+                    self.finish_checkin(processed_frame, *result)
+                    if self.max_checkins and self.checkins >= self.max_checkins:
+                        break
+
+                if self.report_interval and time.time() - last_report >= self.report_interval:
+                    self.print_report()
+                    last_report = time.time()
+
+                interval = self.engine.next_interval(config.ANALYSIS_INTERVAL) / 1000
+                remaining = interval - (time.time() - loop_started)
+                # Nguồn phát nhanh nhất có thể: không chờ, frame kế tiếp đã sẵn
+                if remaining > 0 and self.cap.realtime:
+                    self.stop_event.wait(remaining)
+        finally:
+            self.cap.release()
+            self.print_report()
+            self.engine.print_stats()
+            self.metrics.stop()
+            self.profiler.stop()
+            self.model.close()
+
+    def track_attempt(self, frame_started):
+        """Đánh dấu frame đầu tiên thấy khuôn mặt của lượt chấm công hiện tại"""
+        if not (self.engine.face_recognizer.face_found or self.engine.current_action):
+            self.attempt_started = None
+        elif self.attempt_started is None:
+            self.attempt_started = frame_started
+            self.attempt_frames = 1
+        else:
+            self.attempt_frames += 1
+
+    def finish_checkin(self, frame, emp_id, name):
+        success, status = self.engine.record_attendance(emp_id, name, frame)
+        if success:
+            self.checkins += 1
+            if self.attempt_started is not None:
+                self.latencies.append((time.time() - self.attempt_started, self.attempt_frames))
+            self.on_message(f"Đã chấm công {status} thành công cho {name}!")
+        else:
+            self.on_message(f"Lỗi khi chấm công cho {name}!")
+        # Giống giao diện: dừng một lúc rồi chờ người tiếp theo
+        self.engine.reset()
+        self.attempt_started = None
+        if self.cooldown:
+            self.stop_event.wait(self.cooldown)
+
+    def print_report(self):
+        report = self.engine.stats.report()
+        parts = [
+            f"{stage}: {values['per_sec']:.1f}/s, {values['mean_ms']:.1f} ms"
+            for stage, values in sorted(report.items())
+        ]
+        print(f"Throughput ({self.checkins} lượt chấm công): " + " | ".join(parts))
+
+    def stop(self, *args):
+        self.stop_event.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--source', default=str(config.FRAME_SOURCE),
+                        help="chỉ số camera, file video, thư mục ảnh hoặc 'synthetic[:ảnh khuôn mặt]'")
+    parser.add_argument('--fast', action='store_true', help='phát nguồn ghi sẵn nhanh nhất có thể')
+    parser.add_argument('--loop', action='store_true', help='phát lại nguồn ghi sẵn khi hết')
+    parser.add_argument('--fps', type=float, default=None, help='fps của nguồn ghi sẵn')
+    parser.add_argument('--size', type=int, nargs=2, default=[640, 480], metavar=('W', 'H'))
+    parser.add_argument('--set', dest='overrides', type=parse_override, action='append', default=[],
+                        metavar='KEY=VALUE', help='ghi đè một giá trị trong config.py')
+    parser.add_argument('--report-interval', type=float, default=30, help='giây giữa hai lần báo cáo, 0 = tắt')
+    parser.add_argument('--cooldown', type=float, default=2, help='giây nghỉ sau mỗi lượt chấm công')
+    parser.add_argument('--max-checkins', type=int, default=0, help='dừng sau N lượt chấm công, 0 = không giới hạn')
+    parser.add_argument('--duration', type=float, default=0, help='dừng sau N giây, 0 = chạy đến khi Ctrl+C')
+    args = parser.parse_args()
+
+    apply_overrides(args.overrides)
+    runner = KioskRunner(args.source, tuple(args.size), args.report_interval, args.cooldown, args.max_checkins,
+                         realtime=not args.fast, loop=args.loop, fps=args.fps)
+    signal.signal(signal.SIGINT, runner.stop)
+    signal.signal(signal.SIGTERM, runner.stop)
+    runner.run(args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import numpy as np
+
+# Chỉ số landmark 68 điểm
+LEFT_EYE = np.arange(36, 42)
+RIGHT_EYE = np.arange(42, 48)
+NOSE_TIP = 30
+
+ACTIONS = ('left', 'right', 'blink', 'nod')
+
+
+def eye_aspect_ratio(eyes):
+    """EAR cho mảng (..., 6, 2) điểm mắt, tính cùng lúc cho mọi frame/mắt"""
+    a = np.linalg.norm(eyes[..., 1, :] - eyes[..., 5, :], axis=-1)
+    b = np.linalg.norm(eyes[..., 2, :] - eyes[..., 4, :], axis=-1)
+    c = np.linalg.norm(eyes[..., 0, :] - eyes[..., 3, :], axis=-1)
+    return (a + b) / (2.0 * np.maximum(c, 1e-6))
+
+
+class TemporalLiveness:
+    """Xác thực người thật theo chuỗi landmark của một khuôn mặt.
+
+    Landmark 68 điểm của window frame gần nhất nằm trong ring buffer NumPy; mỗi lần kiểm tra
+    tính EAR, yaw và pitch cho cả cửa sổ bằng một phép toán vector rồi quyết định ngay khi
+    tín hiệu vượt ngưỡng:
+    - blink: EAR xuống dưới ear_threshold sau khi đã mở mắt (trên open_ear)
+    - left/right: yaw lệch khỏi mức ban đầu quá turn_threshold
+    - nod: biên độ pitch vượt nod_threshold
+    yaw/pitch là độ lệch của đầu mũi so với trung điểm hai mắt, chia cho khoảng cách hai mắt,
+    nên không phụ thuộc kích thước khuôn mặt.
+    """
+
+    def __init__(self, window=30, min_frames=3, ear_threshold=0.2, open_ear=0.25, turn_threshold=0.15,
+                 nod_threshold=0.1):
+        self.window = window
+        self.min_frames = min_frames
+        self.ear_threshold = ear_threshold
+        self.open_ear = open_ear
+        self.turn_threshold = turn_threshold
+        self.nod_threshold = nod_threshold
+        self._points = np.zeros((window, 68, 2), dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        self._count = 0
+        self._next = 0
+        self.frames_to_decision = None
+
+    def __len__(self):
+        return min(self._count, self.window)
+
+    def push(self, landmarks):
+        """Thêm landmark (68, 2) của frame mới, ghi đè frame cũ nhất khi đầy"""
+        self._points[self._next] = landmarks
+        self._next = (self._next + 1) % self.window
+        self._count += 1
+
+    def history(self):
+        """Landmark trong cửa sổ theo thứ tự thời gian, mảng (N, 68, 2)"""
+        if self._count < self.window:
+            return self._points[:self._count]
+        return np.roll(self._points, -self._next, axis=0)
+
+    def signals(self):
+        """Tín hiệu EAR (mắt nhắm hơn), yaw và pitch cho từng frame trong cửa sổ"""
+        points = self.history()
+        eyes = points[:, np.stack((LEFT_EYE, RIGHT_EYE))]
+        ear = eye_aspect_ratio(eyes).min(axis=1)
+
+        eye_centers = eyes.mean(axis=2)
+        midpoint = eye_centers.mean(axis=1)
+        interocular = np.maximum(np.linalg.norm(eye_centers[:, 1] - eye_centers[:, 0], axis=-1), 1e-6)
+        offset = points[:, NOSE_TIP] - midpoint
+        return ear, offset[:, 0] / interocular, offset[:, 1] / interocular
+
+    def check(self, action):
+        """True nếu cửa sổ hiện tại đã thể hiện hành động ('left', 'right', 'blink', 'nod')"""
+        if action not in ACTIONS:
+            return False
+        if len(self) < self.min_frames:
+            return False
+
+        ear, yaw, pitch = self.signals()
+        if action == 'blink':
+            closed = np.flatnonzero(ear < self.ear_threshold)
+            opened = np.flatnonzero(ear > self.open_ear)
+            passed = closed.size > 0 and opened.size > 0 and opened[0] < closed[-1]
+        elif action == 'nod':
+            passed = np.ptp(pitch) > self.nod_threshold
+        else:
+            # So với mức ban đầu để không phụ thuộc tư thế đứng của từng người
+            delta = yaw - np.median(yaw[:self.min_frames])
+            passed = delta.min() < -self.turn_threshold if action == 'left' else delta.max() > self.turn_threshold
+
+        if passed:
+            self.frames_to_decision = self._count
+        return bool(passed)
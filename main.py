@@ -1,14 +1,29 @@
+import time
+
+# Mốc đo thời gian khởi động, trước mọi import khác
+STARTUP_TIME = time.perf_counter()
+
+import threading
 import tkinter as tk
 from tkinter import messagebox, simpledialog
-from controllers.admin_controller import AdminController
-from controllers.employee_controller import EmployeeController
-import bcrypt
+from config import STARTUP_WARMUP
+
+# Controller (face_recognition, dlib, OpenCV, pandas) và bcrypt chỉ được import khi cần
+# hoặc trong thread khởi động nền, để cửa sổ chính hiện ngay
 
 class MainApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Hệ thống chấm công khuôn mặt")
+        self.ready = not STARTUP_WARMUP
+        self.ready_time = None
+        self.warmup_error = None
+        self.first_window_time = None
         self.setup_auth_ui()
+        self.root.bind("<Map>", self.on_first_map, add="+")
+        if STARTUP_WARMUP:
+            threading.Thread(target=self.warmup, name="warmup", daemon=True).start()
+            self.root.after(100, self.check_warmup)
 
     def setup_auth_ui(self):
         for widget in self.root.winfo_children():
@@ -20,7 +35,7 @@ class MainApp:
         frame = tk.Frame(self.root)
         frame.pack(pady=10)
 
-        btn_employee = tk.Button(
+        self.btn_employee = btn_employee = tk.Button(
             frame,
             text="NHÂN VIÊN",
             command=self.open_employee_mode,
@@ -44,8 +59,52 @@ class MainApp:
         )
         btn_admin.grid(row=0, column=1, padx=10)
 
+        # Trạng thái nạp mô hình nhận diện
+        self.lbl_status = tk.Label(self.root, text="", font=("Arial", 9))
+        self.lbl_status.pack(pady=(0, 10))
+        if not self.ready:
+            btn_employee.config(state="disabled")
+            self.lbl_status.config(text="Đang tải mô hình nhận diện...", fg="orange")
+
+    def on_first_map(self, event):
+        if self.first_window_time is None:
+            self.first_window_time = time.perf_counter() - STARTUP_TIME
+            print(f"Thời gian đến cửa sổ đầu tiên: {self.first_window_time:.2f} s")
+
+    def warmup(self):
+        """Thread nền: import thư viện nhận diện, tạo FaceRecognizer dùng chung và nạp gallery"""
+        try:
+            import numpy as np
+            from controllers.employee_controller import EmployeeController  # noqa: F401
+            from models.employee_model import prepare_face_recognizer
+
+            face_recognizer = prepare_face_recognizer()
+            # Lần phát hiện đầu tiên chậm hơn các lần sau
+            face_recognizer.detect_faces(np.zeros((120, 160, 3), dtype=np.uint8))
+            from controllers.admin_controller import AdminController  # noqa: F401
+        except Exception as e:
+            self.warmup_error = e
+        self.ready_time = time.perf_counter() - STARTUP_TIME
+        self.ready = True
+
+    def check_warmup(self):
+        """Cập nhật chỉ báo sẵn sàng trên thread giao diện"""
+        if not self.ready:
+            self.root.after(100, self.check_warmup)
+            return
+
+        self.btn_employee.config(state="normal")
+        if self.warmup_error is not None:
+            print(f"Lỗi khởi động nền: {str(self.warmup_error)}")
+            self.lbl_status.config(text="Không tải được mô hình, sẽ thử lại khi mở chế độ nhân viên", fg="red")
+        else:
+            self.lbl_status.config(text=f"Sẵn sàng ({self.ready_time:.1f} s)", fg="green")
+        print(f"Thời gian đến khi sẵn sàng: {self.ready_time:.2f} s")
+
     def open_employee_mode(self):
         try:
+            from controllers.employee_controller import EmployeeController
+
             self.root.withdraw()
             employee_window = tk.Toplevel()
             employee_window.protocol("WM_DELETE_WINDOW", lambda: self.on_subwindow_close(employee_window))
@@ -55,11 +114,15 @@ class MainApp:
             self.root.deiconify()
 
     def authenticate_admin(self):
+        import bcrypt
+
         password = simpledialog.askstring("Xác thực", "Nhập mật khẩu quản trị:", show='*')
         stored_hash = b'$2a$12$BhtYu/sFAT9z1Sm0bxzyce9NghWmUocNGHHw7LKQQd3hqRjXXmdiq'  # Hash của "admin123"
 
         if password and bcrypt.checkpw(password.encode('utf-8'), stored_hash):
             try:
+                from controllers.admin_controller import AdminController
+
                 self.root.withdraw()
                 admin_window = tk.Toplevel()
                 admin_window.protocol("WM_DELETE_WINDOW", lambda: self.on_subwindow_close(admin_window))
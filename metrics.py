@@ -0,0 +1,224 @@
+import bisect
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import (METRICS_BUCKETS, METRICS_ENABLED, METRICS_FILE, METRICS_FILE_INTERVAL, METRICS_HTTP_HOST,
+                    METRICS_HTTP_PORT)
+
+PREFIX = 'face_attendance'
+
+COUNTER_HELP = {
+    'frames_analysed': 'Frame được chạy phát hiện khuôn mặt',
+    'motion_gate_frames': 'Frame qua cổng chuyển động theo kết quả (skips = bị bỏ qua)',
+    'faces_found': 'Khuôn mặt phát hiện được',
+    'matches': 'Lần nhận diện ra nhân viên',
+    'rejections': 'Khuôn mặt bị từ chối theo lý do',
+    'timeouts': 'Lần hết thời gian xác thực hành động',
+    'checkins': 'Lượt chấm công đã ghi vào database',
+}
+
+
+class _Timer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Histogram thời gian của từng bước (giây) và bộ đếm có nhãn, xuất theo định dạng text của Prometheus.
+
+    An toàn giữa các thread. Khi tắt mọi lời gọi trả về ngay, không lấy thời gian và không khoá.
+    """
+
+    def __init__(self, enabled=False, buckets=METRICS_BUCKETS, prefix=PREFIX):
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._writer = None
+        self._server = None
+        self._stop = threading.Event()
+
+    def time(self, stage):
+        """Context manager đo thời gian một bước"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def timed(self, stage):
+        """Decorator đo thời gian mỗi lần gọi hàm; kiểm tra enabled lúc gọi"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                # [số lần theo từng bucket..., tổng thời gian, tổng số lần]
+                histogram = self._histograms[stage] = [0] * len(self.buckets) + [0.0, 0]
+            index = bisect.bisect_left(self.buckets, seconds)
+            if index < len(self.buckets):
+                histogram[index] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._counters = {}
+
+    def render(self):
+        """Toàn bộ số liệu theo định dạng text của Prometheus"""
+        with self._lock:
+            histograms = {stage: list(values) for stage, values in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        name = f"{self.prefix}_stage_seconds"
+        if histograms:
+            lines.append(f"# HELP {name} Thời gian xử lý của từng bước")
+            lines.append(f"# TYPE {name} histogram")
+        for stage, values in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {values[-1]}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {values[-2]:.6f}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {values[-1]}')
+
+        described = set()
+        for (counter, labels), value in sorted(counters.items()):
+            name = f"{self.prefix}_{counter}_total"
+            if counter not in described:
+                described.add(counter)
+                lines.append(f"# HELP {name} {COUNTER_HELP.get(counter, counter)}")
+                lines.append(f"# TYPE {name} counter")
+            label_text = ','.join(f'{key}="{label}"' for key, label in labels)
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path=METRICS_FILE):
+        """Ghi ra file (thay thế nguyên tử, dùng được với node_exporter textfile collector)"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Lỗi ghi metrics: {str(e)}")
+
+    def start_file_writer(self, path=METRICS_FILE, interval=METRICS_FILE_INTERVAL):
+        if self._writer is not None:
+            return
+
+        def loop():
+            while not self._stop.wait(interval):
+                self.write(path)
+
+        self._stop.clear()
+        self._writer = threading.Thread(target=loop, name="metrics-writer", daemon=True)
+        self._writer.start()
+
+    def start_http_server(self, port=METRICS_HTTP_PORT, host=METRICS_HTTP_HOST):
+        """Phục vụ GET /metrics trên host:port trong thread nền"""
+        if self._server is not None:
+            return
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            print(f"Không thể mở cổng metrics {host}:{port}: {str(e)}")
+            return
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"Metrics: http://{host}:{port}/metrics")
+
+    def stop(self, path=METRICS_FILE):
+        """Dừng các thread xuất và ghi lần cuối"""
+        self._stop.set()
+        if self._writer is not None:
+            self._writer.join(timeout=1)
+            self._writer = None
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self.enabled and path:
+            self.write(path)
+
+
+metrics = Metrics(METRICS_ENABLED)
+
+
+def start_export():
+    """Bật ghi file và HTTP theo config (không làm gì khi metrics tắt)"""
+    if not metrics.enabled:
+        return
+    if METRICS_FILE:
+        metrics.start_file_writer(METRICS_FILE, METRICS_FILE_INTERVAL)
+    if METRICS_HTTP_PORT:
+        metrics.start_http_server(METRICS_HTTP_PORT, METRICS_HTTP_HOST)
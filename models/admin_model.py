@@ -1,10 +1,13 @@
 import os
 import sqlite3
-import face_recognition
 from datetime import datetime
 from tkinter import messagebox
+import numpy as np
 import pandas as pd
 
+from face_utils import encode_image_file, gallery_key, notify_face_enrolled, notify_face_removed
+from models.embedding_model import EmbeddingModel
+
 
 class AdminModel:
     def __init__(self):
@@ -19,6 +22,7 @@ class AdminModel:
         self.conn = sqlite3.connect(self.DB_PATH)
         self.cursor = self.conn.cursor()
         self.upgrade_database_structure()
+        self.embeddings = EmbeddingModel(self.conn)
         self.sync_employee_data()
         self.fix_wrong_attendance_data()
 
@@ -62,7 +66,16 @@ class AdminModel:
                 emp_id, name, image_path = emp
                 if not os.path.exists(image_path):
                     self.cursor.execute("DELETE FROM employees WHERE id=?", (emp_id,))
+                    self.embeddings.delete(emp_id, commit=False)
                     self.conn.commit()
+                elif not self.embeddings.is_current(emp_id, image_path):
+                    # Chưa có embedding, ảnh đã đổi hoặc model/số jitter đã đổi.
+                    # Ảnh không có khuôn mặt cũng được ghi lại để lần sau không encode lại
+                    try:
+                        encoding = encode_image_file(image_path)
+                        self.embeddings.save(emp_id, encoding, image_path)
+                    except Exception as e:
+                        print(f"Lỗi encode ảnh {os.path.basename(image_path)}: {str(e)}")
 
             for img_file in image_files:
                 img_path = os.path.join(self.DATA_DIR, img_file)
@@ -71,15 +84,16 @@ class AdminModel:
                 self.cursor.execute("SELECT id FROM employees WHERE image_path=?", (img_path,))
                 if not self.cursor.fetchone():
                     try:
-                        img = face_recognition.load_image_file(img_path)
-                        if face_recognition.face_encodings(img):
+                        encoding = encode_image_file(img_path)
+                        if encoding is not None:
                             self.cursor.execute(
                                 "INSERT INTO employees (name, image_path) VALUES (?, ?)",
                                 (name, img_path)
                             )
+                            self.embeddings.save(self.cursor.lastrowid, encoding, img_path, commit=False)
                             self.conn.commit()
-                    except Exception:
-                        pass
+                    except Exception as e:
+                        print(f"Lỗi encode ảnh {img_file}: {str(e)}")
 
         except Exception as e:
             messagebox.showerror("Lỗi", f"Không thể đồng bộ dữ liệu nhân viên: {str(e)}")
@@ -94,31 +108,27 @@ class AdminModel:
                 WHERE e.name = 'Bill Gates'
             ''')
             bill_gates_records = self.cursor.fetchall()
+            if not bill_gates_records:
+                return
 
             self.cursor.execute("SELECT id, name, image_path FROM employees")
             all_employees = {emp[1]: emp for emp in self.cursor.fetchall()}
 
+            # Dùng embedding đã lưu thay vì encode lại ảnh của từng nhân viên
+            emp_ids, _, encodings = self.embeddings.load_all()
+            stored = dict(zip(emp_ids, encodings))
+
             for record in bill_gates_records:
                 att_id, emp_id, name, image_path = record
-                if not os.path.exists(image_path):
-                    continue
-
-                img = face_recognition.load_image_file(image_path)
-                face_encodings = face_recognition.face_encodings(img)
-                if not face_encodings:
+                if emp_id not in stored:
                     continue
 
                 for emp_name, emp_data in all_employees.items():
-                    if emp_name == name:
+                    if emp_name == name or emp_data[0] not in stored:
                         continue
 
-                    other_img = face_recognition.load_image_file(emp_data[2])
-                    other_encodings = face_recognition.face_encodings(other_img)
-                    if not other_encodings:
-                        continue
-
-                    matches = face_recognition.compare_faces([face_encodings[0]], other_encodings[0])
-                    if matches[0]:
+                    # Cùng ngưỡng mặc định 0.6 của face_recognition.compare_faces
+                    if np.linalg.norm(stored[emp_data[0]] - stored[emp_id]) <= 0.6:
                         self.cursor.execute(
                             "UPDATE attendance SET employee_id=? WHERE id=?",
                             (emp_data[0], att_id))
@@ -144,37 +154,62 @@ class AdminModel:
         self.cursor.execute("SELECT name, image_path FROM employees WHERE id=?", (emp_id,))
         return self.cursor.fetchone()
 
-    def register_employee(self, name, image_path):
+    def register_employee(self, name, image_path, encoding=None):
         """Đăng ký nhân viên mới"""
         try:
             self.cursor.execute("INSERT INTO employees (name, image_path) VALUES (?, ?)", (name, image_path))
+            if encoding is not None:
+                self.embeddings.save(self.cursor.lastrowid, encoding, image_path, commit=False)
             self.conn.commit()
-            return True
         except sqlite3.IntegrityError:
+            self.conn.rollback()
             return False
 
-    def update_employee(self, emp_id, name, image_path=None):
+        if encoding is not None:
+            notify_face_enrolled(gallery_key(image_path), encoding)
+        return True
+
+    def update_employee(self, emp_id, name, image_path=None, encoding=None):
         """Cập nhật thông tin nhân viên"""
         try:
             if image_path:
+                self.cursor.execute("SELECT image_path FROM employees WHERE id=?", (emp_id,))
+                old = self.cursor.fetchone()
                 self.cursor.execute("UPDATE employees SET name=?, image_path=? WHERE id=?",
                                     (name, image_path, emp_id))
+                if encoding is not None:
+                    self.embeddings.save(emp_id, encoding, image_path, commit=False)
+                else:
+                    # Ảnh mới không có khuôn mặt: thay embedding của ảnh cũ bằng dấu không có khuôn mặt
+                    self.embeddings.save(emp_id, None, image_path, commit=False)
             else:
                 self.cursor.execute("UPDATE employees SET name=? WHERE id=?", (name, emp_id))
             self.conn.commit()
-            return True
         except Exception:
             return False
 
+        if image_path:
+            if old:
+                notify_face_removed(gallery_key(old[0]))
+            if encoding is not None:
+                notify_face_enrolled(gallery_key(image_path), encoding)
+        return True
+
     def delete_employee(self, emp_id):
         """Xóa nhân viên"""
         try:
+            self.cursor.execute("SELECT image_path FROM employees WHERE id=?", (emp_id,))
+            employee = self.cursor.fetchone()
             self.cursor.execute("DELETE FROM employees WHERE id=?", (emp_id,))
+            self.embeddings.delete(emp_id, commit=False)
             self.conn.commit()
-            return True
         except Exception:
             return False
 
+        if employee:
+            notify_face_removed(gallery_key(employee[0]))
+        return True
+
     def get_attendance_data(self):
         """Lấy dữ liệu chấm công"""
         self.cursor.execute('''
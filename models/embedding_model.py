@@ -0,0 +1,143 @@
+import os
+from datetime import datetime
+
+import numpy as np
+
+from config import EMBEDDING_MODEL_VERSION, NUM_JITTERS
+from encoding_cache import file_digest
+from face_utils import encode_image_files
+
+EMBEDDING_DTYPE = np.dtype('<f8')
+EMBEDDING_SIZE = 128
+
+
+class EmbeddingModel:
+    """Lưu encoding khuôn mặt của nhân viên dạng BLOB trong bảng face_embeddings.
+
+    Ảnh không có khuôn mặt được ghi với BLOB rỗng để không phải encode lại ở lần khởi động sau.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.create_table()
+
+    def create_table(self):
+        """Tạo bảng nếu chưa tồn tại"""
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS face_embeddings (
+                employee_id INTEGER PRIMARY KEY,
+                embedding BLOB NOT NULL,
+                model_version TEXT NOT NULL,
+                num_jitters INTEGER NOT NULL,
+                image_hash TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                image_size INTEGER,
+                image_mtime INTEGER,
+                FOREIGN KEY (employee_id) REFERENCES employees (id)
+            )
+        ''')
+        # Bảng tạo từ phiên bản trước chưa có kích thước/mtime của ảnh
+        columns = {row[1] for row in self.cursor.execute("PRAGMA table_info(face_embeddings)")}
+        for column in ('image_size', 'image_mtime'):
+            if column not in columns:
+                self.cursor.execute(f"ALTER TABLE face_embeddings ADD COLUMN {column} INTEGER")
+        self.conn.commit()
+
+    def save(self, emp_id, encoding, image_path, commit=True):
+        """Ghi (hoặc thay) embedding của nhân viên; encoding None = ảnh không có khuôn mặt"""
+        if encoding is None:
+            blob = b''
+        else:
+            blob = np.asarray(encoding, dtype=EMBEDDING_DTYPE).reshape(EMBEDDING_SIZE).tobytes()
+        stat = os.stat(image_path)
+        self.cursor.execute('''
+            INSERT OR REPLACE INTO face_embeddings
+                (employee_id, embedding, model_version, num_jitters, image_hash, updated_at, image_size, image_mtime)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (emp_id, blob, EMBEDDING_MODEL_VERSION, NUM_JITTERS, file_digest(image_path),
+              datetime.now().strftime('%Y-%m-%d %H:%M:%S'), stat.st_size, stat.st_mtime_ns))
+        if commit:
+            self.conn.commit()
+
+    def delete(self, emp_id, commit=True):
+        """Xoá embedding của nhân viên"""
+        self.cursor.execute("DELETE FROM face_embeddings WHERE employee_id=?", (emp_id,))
+        if commit:
+            self.conn.commit()
+
+    def is_current(self, emp_id, image_path):
+        """Embedding (hoặc dấu không có khuôn mặt) còn đúng với ảnh và model hiện tại.
+
+        So kích thước và mtime trước, chỉ tính hash khi chúng khác (giống EncodingCache).
+        """
+        self.cursor.execute('''
+            SELECT image_hash, image_size, image_mtime FROM face_embeddings
+            WHERE employee_id=? AND model_version=? AND num_jitters=?
+        ''', (emp_id, EMBEDDING_MODEL_VERSION, NUM_JITTERS))
+        row = self.cursor.fetchone()
+        if row is None:
+            return False
+
+        stat = os.stat(image_path)
+        if row[1] == stat.st_size and row[2] == stat.st_mtime_ns:
+            return True
+        if row[0] != file_digest(image_path):
+            return False
+
+        # File bị chạm vào nhưng nội dung không đổi
+        self.cursor.execute("UPDATE face_embeddings SET image_size=?, image_mtime=? WHERE employee_id=?",
+                            (stat.st_size, stat.st_mtime_ns, emp_id))
+        self.conn.commit()
+        return True
+
+    def get_missing(self):
+        """Nhân viên chưa có embedding cho model/số jitter hiện tại: [(id, image_path)]"""
+        self.cursor.execute('''
+            SELECT e.id, e.image_path FROM employees e
+            LEFT JOIN face_embeddings f
+                ON f.employee_id = e.id AND f.model_version = ? AND f.num_jitters = ?
+            WHERE f.employee_id IS NULL
+            ORDER BY e.id
+        ''', (EMBEDDING_MODEL_VERSION, NUM_JITTERS))
+        return self.cursor.fetchall()
+
+    def backfill(self, workers=None):
+        """Encode ảnh của các nhân viên chưa có embedding, trả về số embedding đã ghi"""
+        missing = [(emp_id, path) for emp_id, path in self.get_missing() if os.path.exists(path)]
+        if not missing:
+            return 0
+
+        emp_ids = {path: emp_id for emp_id, path in missing}
+        saved = 0
+        for img_path, encoding, error in encode_image_files([path for _, path in missing], workers):
+            if error:
+                print(f"Không thể xử lý ảnh {os.path.basename(img_path)}: {error}")
+                continue
+            self.save(emp_ids[img_path], encoding, img_path, commit=False)
+            if encoding is not None:
+                saved += 1
+        self.conn.commit()
+        return saved
+
+    def load_all(self):
+        """Đọc toàn bộ embedding hiện hành trong một truy vấn.
+
+        Trả về (danh sách id, danh sách image_path, ma trận N x 128); ma trận là view
+        của một buffer bytes duy nhất, không copy từng hàng.
+        """
+        self.cursor.execute('''
+            SELECT e.id, e.image_path, f.embedding FROM face_embeddings f
+            JOIN employees e ON e.id = f.employee_id
+            WHERE f.model_version = ? AND f.num_jitters = ?
+            ORDER BY e.image_path
+        ''', (EMBEDDING_MODEL_VERSION, NUM_JITTERS))
+        # Bỏ các dòng BLOB rỗng (ảnh không có khuôn mặt)
+        rows = [row for row in self.cursor.fetchall()
+                if len(row[2]) == EMBEDDING_SIZE * EMBEDDING_DTYPE.itemsize]
+
+        emp_ids = [row[0] for row in rows]
+        image_paths = [row[1] for row in rows]
+        buffer = b''.join(row[2] for row in rows)
+        encodings = np.frombuffer(buffer, dtype=EMBEDDING_DTYPE).reshape(-1, EMBEDDING_SIZE)
+        return emp_ids, image_paths, encodings
@@ -1,15 +1,56 @@
 import sqlite3
+import threading
 from datetime import datetime
-from face_utils import FaceRecognizer
+from face_utils import FaceRecognizer, gallery_key
 from config import DATABASE_PATH, DATA_DIR
+from models.embedding_model import EmbeddingModel
+
+# FaceRecognizer đã nạp gallery, dùng chung cho mọi lần mở chế độ nhân viên trong process
+_shared_recognizer = None
+_shared_lock = threading.Lock()
+
+
+def load_gallery(face_recognizer, embeddings):
+    """Nạp gallery từ bảng face_embeddings, chỉ encode ảnh của nhân viên chưa có embedding"""
+    try:
+        embeddings.backfill()
+        _, image_paths, encodings = embeddings.load_all()
+    except sqlite3.Error as e:
+        print(f"Không thể đọc embedding, nạp lại từ ảnh: {str(e)}")
+        face_recognizer.load_known_faces(DATA_DIR)
+        return
+
+    face_recognizer.gallery.add_many([gallery_key(path) for path in image_paths], encodings)
+
+
+def prepare_face_recognizer():
+    """FaceRecognizer dùng chung, được tạo và nạp gallery ở lần gọi đầu tiên (có thể từ thread nền).
+
+    Gallery được cập nhật khi quản trị viên đăng ký/xoá nhân viên nên không cần nạp lại.
+    """
+    global _shared_recognizer
+    with _shared_lock:
+        if _shared_recognizer is None:
+            conn = sqlite3.connect(DATABASE_PATH)
+            try:
+                recognizer = FaceRecognizer()
+                load_gallery(recognizer, EmbeddingModel(conn))
+            finally:
+                conn.close()
+            _shared_recognizer = recognizer
+        return _shared_recognizer
+
 
 class EmployeeModel:
     def __init__(self):
         self.DB_PATH = DATABASE_PATH
-        self.face_recognizer = FaceRecognizer()
-        self.face_recognizer.load_known_faces(DATA_DIR)
-        self.conn = sqlite3.connect(self.DB_PATH)
+        # Kết nối được dùng cả từ thread phân tích camera, truy cập qua self.lock
+        self.conn = sqlite3.connect(self.DB_PATH, check_same_thread=False)
         self.cursor = self.conn.cursor()
+        self.lock = threading.RLock()
+        self.embeddings = EmbeddingModel(self.conn)
+        self.face_recognizer = prepare_face_recognizer()
+        self.face_recognizer.reset_session()
 
     def recognize_employee(self, face_encoding):
         try:
@@ -17,8 +58,9 @@ class EmployeeModel:
             if not name:
                 return None, None
 
-            self.cursor.execute("SELECT id FROM employees WHERE name=?", (name,))
-            result = self.cursor.fetchone()
+            with self.lock:
+                self.cursor.execute("SELECT id FROM employees WHERE name=?", (name,))
+                result = self.cursor.fetchone()
             return (result[0], name) if result else (None, None)
         except sqlite3.Error as e:
             print(f"Lỗi truy vấn database: {str(e)}")
@@ -27,8 +69,9 @@ class EmployeeModel:
     def recognize_employee_by_name(self, name):
         """Nhận diện nhân viên bằng tên (đã xác thực)"""
         try:
-            self.cursor.execute("SELECT id FROM employees WHERE name=?", (name,))
-            result = self.cursor.fetchone()
+            with self.lock:
+                self.cursor.execute("SELECT id FROM employees WHERE name=?", (name,))
+                result = self.cursor.fetchone()
             return (result[0], name) if result else (None, None)
         except sqlite3.Error as e:
             print(f"Lỗi truy vấn database: {str(e)}")
@@ -39,37 +82,38 @@ class EmployeeModel:
         if not emp_id or not name:
             return False, None
 
-        try:
-            today = datetime.now().strftime('%Y-%m-%d')
-            now = datetime.now().strftime('%H:%M:%S')
-
-            # Kiểm tra lần chấm công gần nhất
-            self.cursor.execute('''
-                SELECT id, time_out FROM attendance 
-                WHERE employee_id=? AND date=?
-                ORDER BY time_in DESC LIMIT 1
-            ''', (emp_id, today))
-            record = self.cursor.fetchone()
-
-            current_status = None
-            if record and not record[1]:  # Đã chấm vào nhưng chưa chấm ra
-                self.cursor.execute('''
-                    UPDATE attendance SET time_out=?, status='OUT' WHERE id=?
-                ''', (now, record[0]))
-                current_status = 'OUT'
-            else:  # Chấm công vào
+        with self.lock:
+            try:
+                today = datetime.now().strftime('%Y-%m-%d')
+                now = datetime.now().strftime('%H:%M:%S')
+
+                # Kiểm tra lần chấm công gần nhất
                 self.cursor.execute('''
-                    INSERT INTO attendance (employee_id, date, time_in, status)
-                    VALUES (?, ?, ?, 'IN')
-                ''', (emp_id, today, now))
-                current_status = 'IN'
+                    SELECT id, time_out FROM attendance 
+                    WHERE employee_id=? AND date=?
+                    ORDER BY time_in DESC LIMIT 1
+                ''', (emp_id, today))
+                record = self.cursor.fetchone()
 
-            self.conn.commit()
-            return True, current_status
-        except sqlite3.Error as e:
-            print(f"Lỗi chấm công: {str(e)}")
-            self.conn.rollback()
-            return False, None
+                current_status = None
+                if record and not record[1]:  # Đã chấm vào nhưng chưa chấm ra
+                    self.cursor.execute('''
+                        UPDATE attendance SET time_out=?, status='OUT' WHERE id=?
+                    ''', (now, record[0]))
+                    current_status = 'OUT'
+                else:  # Chấm công vào
+                    self.cursor.execute('''
+                        INSERT INTO attendance (employee_id, date, time_in, status)
+                        VALUES (?, ?, ?, 'IN')
+                    ''', (emp_id, today, now))
+                    current_status = 'IN'
+
+                self.conn.commit()
+                return True, current_status
+            except sqlite3.Error as e:
+                print(f"Lỗi chấm công: {str(e)}")
+                self.conn.rollback()
+                return False, None
 
     def close(self):
         try:
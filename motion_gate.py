@@ -0,0 +1,77 @@
+import cv2
+import numpy as np
+
+from metrics import metrics
+
+
+class MotionGate:
+    """Cổng chuyển động: chỉ cho chạy HOG khi cảnh thay đổi.
+
+    Frame được thu nhỏ, chuyển xám và so với nền trung bình trượt; nếu tỉ lệ điểm ảnh
+    thay đổi nhỏ hơn min_changed_ratio thì coi là cảnh tĩnh. Sau max_skip_frames frame
+    bị bỏ liên tiếp vẫn cho chạy một lần để không bỏ sót người đứng yên.
+    """
+
+    def __init__(self, size=(80, 60), pixel_threshold=25, min_changed_ratio=0.01, learning_rate=0.05,
+                 max_skip_frames=50):
+        self.size = tuple(size)
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.learning_rate = learning_rate
+        self.max_skip_frames = max_skip_frames
+
+        width, height = self.size
+        self._small = np.empty((height, width, 3), dtype=np.uint8)
+        self._gray = np.empty((height, width), dtype=np.uint8)
+        self._background = None
+        self._consecutive_skips = 0
+        self.counters = {'hits': 0, 'skips': 0, 'forced': 0, 'keepalive': 0}
+
+    def reset(self):
+        self._background = None
+        self._consecutive_skips = 0
+
+    def has_motion(self, frame):
+        """So frame với nền và cập nhật nền, trả về True nếu cảnh thay đổi"""
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        gray = cv2.GaussianBlur(self._gray, (5, 5), 0)
+
+        if self._background is None:
+            self._background = gray.astype(np.float32)
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        changed = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+        cv2.accumulateWeighted(gray, self._background, self.learning_rate)
+        return changed >= self.min_changed_ratio
+
+    def should_process(self, frame, force=False):
+        """Quyết định có chạy phát hiện khuôn mặt cho frame này không.
+
+        force=True khi đang giữ/bám một khuôn mặt: luôn chạy nhưng vẫn cập nhật nền.
+        """
+        motion = self.has_motion(frame)
+        if force:
+            outcome = 'forced'
+        elif motion:
+            outcome = 'hits'
+        elif self._consecutive_skips >= self.max_skip_frames:
+            outcome = 'keepalive'
+        else:
+            outcome = 'skips'
+        self.counters[outcome] += 1
+        metrics.inc('motion_gate_frames', outcome=outcome)
+
+        if outcome == 'skips':
+            self._consecutive_skips += 1
+            return False
+        self._consecutive_skips = 0
+        return True
+
+    def stats(self):
+        """Bộ đếm và tỉ lệ frame bị bỏ qua"""
+        stats = dict(self.counters)
+        total = sum(self.counters.values())
+        stats['skip_rate'] = self.counters['skips'] / total if total else 0.0
+        return stats
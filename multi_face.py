@@ -0,0 +1,195 @@
+import itertools
+import random
+import time
+
+from config import (ACTION_TIMEOUT, BLINK_EAR_THRESHOLD, BLINK_OPEN_EAR, HEAD_TURN_THRESHOLD, HOLD_FACE_TIME,
+                    LIVENESS_MIN_FRAMES, LIVENESS_WINDOW, MIN_FACE_CONTRAST, MIN_FACE_SIZE, NOD_THRESHOLD,
+                    NUM_JITTERS, MODEL, RANDOM_ACTIONS, TRACKER_MIN_IOU)
+from face_tracker import box_iou
+from frame_governor import is_face_visible
+from liveness import TemporalLiveness
+from metrics import metrics
+
+
+class FaceSession:
+    """Trạng thái check-in của một người trước camera: giữ mặt -> liveness -> xong (hoặc bị từ chối)"""
+
+    HOLDING = 'holding'
+    LIVENESS = 'liveness'
+    DONE = 'done'
+    REJECTED = 'rejected'
+
+    def __init__(self, session_id, location, now):
+        self.id = session_id
+        self.location = location
+        self.state = self.HOLDING
+        self.state_since = now
+        self.hold_start = now
+        self.missed = 0
+        self.analysis = None
+        self.name = None
+        self.action = None
+        self.liveness = TemporalLiveness(
+            LIVENESS_WINDOW, LIVENESS_MIN_FRAMES, BLINK_EAR_THRESHOLD, BLINK_OPEN_EAR,
+            HEAD_TURN_THRESHOLD, NOD_THRESHOLD
+        )
+
+    def set_state(self, state, now):
+        self.state = state
+        self.state_since = now
+
+
+class MultiFaceCheckIn:
+    """Check-in đồng thời cho mọi khuôn mặt trong frame.
+
+    Mỗi khuôn mặt được gắn với một FaceSession theo IoU giữa các frame và có máy trạng thái
+    giữ mặt/liveness riêng. Các khuôn mặt giữ đủ lâu trong cùng frame được encode chung một lần
+    gọi dlib và so khớp với gallery bằng một phép tính ma trận khoảng cách.
+
+    process(frame) trả về danh sách sự kiện (loại, FaceSession), loại là một trong:
+    'hold', 'action', 'verified', 'unknown', 'timeout'.
+    """
+
+    def __init__(self, recognizer, max_faces=5, hold_time=HOLD_FACE_TIME, action_timeout=ACTION_TIMEOUT,
+                 actions=RANDOM_ACTIONS, min_iou=TRACKER_MIN_IOU, max_missed=5, retry_after=3):
+        self.recognizer = recognizer
+        self.max_faces = max_faces
+        self.hold_time = hold_time
+        self.action_timeout = action_timeout
+        self.actions = actions
+        self.min_iou = min_iou
+        self.max_missed = max_missed
+        self.retry_after = retry_after
+        self.sessions = {}
+        self._ids = itertools.count(1)
+        self.counters = {'frames': 0, 'faces': 0, 'batches': 0, 'encoded': 0, 'verified': 0, 'rejected': 0}
+
+    def reset(self):
+        self.sessions = {}
+
+    def process(self, frame):
+        recognizer = self.recognizer
+        # Như FaceRecognizer.should_analyse: người đứng yên không tạo chuyển động
+        face_active = bool(self.sessions) or recognizer.face_found or recognizer.governor_active
+        recognizer.face_found = bool(self.sessions)
+        if recognizer.motion_gate is not None and not recognizer.motion_gate.should_process(
+                frame, force=face_active):
+            return []
+        if recognizer.probe_scale is not None and not self.sessions:
+            recognizer.face_found = recognizer.probe_faces(frame, recognizer.probe_scale)
+            return []
+
+        now = time.time()
+        rgb_small_frame = recognizer.prepare_frame(frame)
+        face_locations = recognizer.detect_faces(rgb_small_frame)[:self.max_faces]
+        self._associate(face_locations, now)
+        recognizer.face_found = any(is_face_visible(location) for location in face_locations)
+        self.counters['frames'] += 1
+        self.counters['faces'] += len(face_locations)
+        metrics.inc('frames_analysed')
+
+        events = []
+        ready = []
+        for session in self.sessions.values():
+            if session.missed:
+                continue
+
+            face = recognizer.analyse_face(frame, session.location, rgb_small_frame)
+            session.analysis = face
+            if session.state == FaceSession.HOLDING:
+                if not face.is_good_quality(MIN_FACE_SIZE, MIN_FACE_CONTRAST):
+                    session.hold_start = now
+                elif now - session.hold_start >= self.hold_time:
+                    ready.append(session)
+                else:
+                    events.append(('hold', session))
+            elif session.state == FaceSession.LIVENESS:
+                events.extend(self._check_liveness(session, face, now))
+            elif session.state == FaceSession.REJECTED and now - session.state_since > self.retry_after:
+                session.set_state(FaceSession.HOLDING, now)
+                session.hold_start = now
+
+        if ready:
+            events.extend(self._identify(ready, now))
+        return events
+
+    def _associate(self, face_locations, now):
+        """Gắn khuôn mặt vào session theo IoU lớn nhất, tạo session cho khuôn mặt mới"""
+        for session in self.sessions.values():
+            session.missed += 1
+
+        pairs = sorted(
+            ((box_iou(session.location, location), session.id, i)
+             for session in self.sessions.values() for i, location in enumerate(face_locations)),
+            reverse=True
+        )
+        matched_sessions, matched_faces = set(), set()
+        for iou, session_id, i in pairs:
+            if iou < self.min_iou:
+                break
+            if session_id in matched_sessions or i in matched_faces:
+                continue
+            session = self.sessions[session_id]
+            session.location = face_locations[i]
+            session.missed = 0
+            matched_sessions.add(session_id)
+            matched_faces.add(i)
+
+        for session_id in [sid for sid, session in self.sessions.items() if session.missed > self.max_missed]:
+            del self.sessions[session_id]
+
+        for i, location in enumerate(face_locations):
+            if i not in matched_faces and len(self.sessions) < self.max_faces:
+                session = FaceSession(next(self._ids), location, now)
+                self.sessions[session.id] = session
+
+    def _identify(self, sessions, now):
+        """Encode cùng lúc các khuôn mặt đã giữ đủ lâu và so khớp bằng một phép tính ma trận"""
+        recognizer = self.recognizer
+        encodings = recognizer.encode_batch([session.analysis for session in sessions])
+        matches = recognizer.gallery.top2_many(encodings)
+        self.counters['batches'] += 1
+        self.counters['encoded'] += len(sessions)
+
+        events = []
+        for session, match in zip(sessions, matches):
+            if match[0] is not None and recognizer.is_ambiguous_match(match[1], match[2]):
+                refined = session.analysis.encoding(NUM_JITTERS, MODEL)
+                recognizer.jitter_stats['rejitter'] += 1
+                match = recognizer.gallery.top2(refined)
+
+            name = recognizer.accept_match(*match)
+            if name is None:
+                session.set_state(FaceSession.REJECTED, now)
+                self.counters['rejected'] += 1
+                metrics.inc('rejections', reason='unknown')
+                events.append(('unknown', session))
+                continue
+
+            metrics.inc('matches')
+            session.name = name
+            session.action = random.choice(self.actions)
+            session.liveness.reset()
+            session.set_state(FaceSession.LIVENESS, now)
+            events.append(('action', session))
+        return events
+
+    def _check_liveness(self, session, face, now):
+        if now - session.state_since > self.action_timeout:
+            session.set_state(FaceSession.REJECTED, now)
+            self.counters['rejected'] += 1
+            metrics.inc('timeouts')
+            return [('timeout', session)]
+
+        session.liveness.push(face.landmarks('large'))
+        if session.liveness.check(self.recognizer.liveness_action(session.action)):
+            session.set_state(FaceSession.DONE, now)
+            self.counters['verified'] += 1
+            return [('verified', session)]
+        return [('action', session)]
+
+    def stats(self):
+        """Bộ đếm và số khuôn mặt trung bình mỗi lần encode"""
+        stats = dict(self.counters)
+        stats['faces_per_batch'] = self.counters['encoded'] / self.counters['batches'] if self.counters['batches'] else 0.0
+        return stats
@@ -0,0 +1,270 @@
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+DROP_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+
+def _attach_frames(shm, frame_shape, small_shape, slots):
+    """Gắn vào vùng nhớ chung: frames[slot] là frame gốc, smalls[slot] là frame RGB đã thu nhỏ.
+
+    shm có thể là tên vùng nhớ (trong worker) hoặc đối tượng SharedMemory; phải giữ
+    tham chiếu tới shm trả về chừng nào còn dùng các mảng.
+    """
+    if isinstance(shm, str):
+        shm = shared_memory.SharedMemory(name=shm)
+    frame_bytes = slots * int(np.prod(frame_shape))
+    frames = np.ndarray((slots,) + tuple(frame_shape), dtype=np.uint8, buffer=shm.buf)
+    smalls = np.ndarray((slots,) + tuple(small_shape), dtype=np.uint8, buffer=shm.buf, offset=frame_bytes)
+    return shm, frames, smalls
+
+
+def _put(target, item, drop_policy, on_drop):
+    """Đưa item vào hàng đợi giới hạn theo chính sách bỏ frame"""
+    if drop_policy == 'block':
+        target.put(item)
+        return
+
+    while True:
+        try:
+            target.put_nowait(item)
+            return
+        except queue.Full:
+            if drop_policy == 'drop_newest':
+                on_drop(item)
+                return
+
+        try:
+            on_drop(target.get_nowait())
+        except queue.Empty:
+            pass
+
+
+def _detect_worker(shm_name, frame_shape, small_shape, slots, detect_queue, encode_queue, result_queue,
+                   drop_policy):
+    """Process tiền xử lý + phát hiện khuôn mặt"""
+    from face_utils import detect_face_locations, prepare_image
+
+    shm, frames, smalls = _attach_frames(shm_name, frame_shape, small_shape, slots)
+    try:
+        while True:
+            item = detect_queue.get()
+            if item is None:
+                break
+
+            slot, seq, submitted_at = item
+            try:
+                rgb_small_frame = prepare_image(frames[slot])
+                smalls[slot] = rgb_small_frame
+                face_locations = detect_face_locations(rgb_small_frame)
+            except Exception as e:
+                print(f"Lỗi phát hiện khuôn mặt (pipeline): {str(e)}")
+                face_locations = []
+
+            if not face_locations:
+                # Không có mặt thì bỏ qua bước encode
+                result_queue.put(('result', slot, seq, submitted_at, [], []))
+                continue
+
+            _put(encode_queue, (slot, seq, submitted_at, face_locations), drop_policy,
+                 lambda dropped: result_queue.put(('drop', dropped[0], dropped[1])))
+    finally:
+        del frames, smalls
+        shm.close()
+
+
+def _encode_worker(shm_name, frame_shape, small_shape, slots, encode_queue, result_queue):
+    """Process tính encoding cho các khuôn mặt đã phát hiện"""
+    from face_utils import encode_face_locations
+
+    shm, frames, smalls = _attach_frames(shm_name, frame_shape, small_shape, slots)
+    try:
+        while True:
+            item = encode_queue.get()
+            if item is None:
+                break
+
+            slot, seq, submitted_at, face_locations = item
+            try:
+                face_encodings = encode_face_locations(smalls[slot], face_locations)
+            except Exception as e:
+                print(f"Lỗi encode khuôn mặt (pipeline): {str(e)}")
+                face_encodings = []
+            result_queue.put(('result', slot, seq, submitted_at, face_locations, face_encodings))
+    finally:
+        del frames, smalls
+        shm.close()
+
+
+class FramePipeline:
+    """Pipeline nhiều process: capture -> tiền xử lý + phát hiện -> encode -> so khớp.
+
+    Các stage nối bằng hàng đợi giới hạn; frame nằm trong shared memory nên chỉ
+    chỉ số slot được gửi qua process. Stage so khớp chạy trong process chính:
+    on_result(frame, face_locations, face_encodings) được gọi từ thread thu kết quả,
+    frame là view của slot và chỉ hợp lệ trong lúc gọi.
+    """
+
+    def __init__(self, frame_shape, on_result, resize_scale, detect_workers=2, encode_workers=2,
+                 queue_size=4, drop_policy='drop_oldest', mirror=True, start_method='spawn'):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Chính sách bỏ frame không hợp lệ: {drop_policy}")
+
+        self.frame_shape = tuple(frame_shape)
+        height, width = self.frame_shape[:2]
+        self.small_shape = (int(round(height * resize_scale)), int(round(width * resize_scale)), 3)
+        self.on_result = on_result
+        self.drop_policy = drop_policy
+        self.mirror = mirror
+
+        self.slots = detect_workers + encode_workers + 2 * queue_size + 2
+        size = self.slots * (int(np.prod(self.frame_shape)) + int(np.prod(self.small_shape)))
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        _, self.frames, _ = _attach_frames(self.shm, self.frame_shape, self.small_shape, self.slots)
+        self.free_slots = queue.Queue()
+        for slot in range(self.slots):
+            self.free_slots.put(slot)
+
+        ctx = multiprocessing.get_context(start_method)
+        self.detect_queue = ctx.Queue(maxsize=queue_size)
+        self.encode_queue = ctx.Queue(maxsize=queue_size)
+        self.result_queue = ctx.Queue()
+        shm_args = (self.shm.name, self.frame_shape, self.small_shape, self.slots)
+        self.detect_processes = [
+            ctx.Process(target=_detect_worker, daemon=True,
+                        args=shm_args + (self.detect_queue, self.encode_queue, self.result_queue, drop_policy))
+            for _ in range(detect_workers)
+        ]
+        self.encode_processes = [
+            ctx.Process(target=_encode_worker, daemon=True,
+                        args=shm_args + (self.encode_queue, self.result_queue))
+            for _ in range(encode_workers)
+        ]
+
+        self.running = False
+        self.collector = None
+        self.capture_thread = None
+        self.seq = 0
+        self.last_delivered = 0
+        self.counters = {'submitted': 0, 'dropped': 0, 'analysed': 0, 'stale': 0, 'gated': 0, 'paced': 0}
+        self.started_at = None
+
+    def start(self):
+        for process in self.detect_processes + self.encode_processes:
+            process.start()
+        self.running = True
+        self.started_at = time.time()
+        self.collector = threading.Thread(target=self._collect, name="pipeline-collector", daemon=True)
+        self.collector.start()
+        return self
+
+    def submit(self, frame):
+        """Ghi frame vào một slot trống và đưa vào stage phát hiện; trả về False nếu bị bỏ"""
+        try:
+            slot = self.free_slots.get_nowait()
+        except queue.Empty:
+            self.counters['dropped'] += 1
+            return False
+
+        if self.mirror:
+            cv2.flip(frame, 1, dst=self.frames[slot])
+        else:
+            np.copyto(self.frames[slot], frame)
+
+        self.seq += 1
+        self.counters['submitted'] += 1
+        _put(self.detect_queue, (slot, self.seq, time.time()), self.drop_policy, self._drop)
+        return True
+
+    def run_capture(self, stream, should_submit=None, interval=None):
+        """Thread capture: đưa từng frame mới của CameraStream vào pipeline.
+
+        should_submit(frame): bộ lọc tuỳ chọn (ví dụ cổng chuyển động) chạy trước khi ghi slot.
+        interval(): khoảng cách tối thiểu (ms) giữa hai frame được đưa vào, ví dụ theo bộ điều tốc;
+        None = đưa mọi frame.
+        """
+        def capture():
+            last_seq = 0
+            next_submit = 0.0
+            while self.running:
+                seq, frame = stream.wait_for_frame(last_seq, timeout=0.5)
+                if frame is None or seq == last_seq:
+                    continue
+                last_seq = seq
+                if frame.shape != self.frame_shape:
+                    continue
+                if interval is not None and time.time() < next_submit:
+                    self.counters['paced'] += 1
+                    continue
+                if should_submit is not None and not should_submit(frame):
+                    self.counters['gated'] += 1
+                    continue
+                self.submit(frame)
+                if interval is not None:
+                    next_submit = time.time() + interval() / 1000
+
+        self.capture_thread = threading.Thread(target=capture, name="pipeline-capture", daemon=True)
+        self.capture_thread.start()
+
+    def _drop(self, item):
+        self.counters['dropped'] += 1
+        self.free_slots.put(item[0])
+
+    def _collect(self):
+        while self.running:
+            try:
+                message = self.result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            if message[0] == 'drop':
+                self._drop(message[1:])
+                continue
+
+            _, slot, seq, submitted_at, face_locations, face_encodings = message
+            try:
+                # Nhiều worker có thể trả kết quả lệch thứ tự, bỏ kết quả cũ hơn frame đã giao
+                if seq < self.last_delivered:
+                    self.counters['stale'] += 1
+                    continue
+                self.last_delivered = seq
+                self.counters['analysed'] += 1
+                self.on_result(self.frames[slot], face_locations, face_encodings)
+            except Exception as e:
+                print(f"Lỗi xử lý kết quả pipeline: {str(e)}")
+            finally:
+                self.free_slots.put(slot)
+
+    def stats(self):
+        """Bộ đếm và số frame phân tích mỗi giây"""
+        stats = dict(self.counters)
+        elapsed = time.time() - self.started_at if self.started_at else 0
+        stats['fps'] = self.counters['analysed'] / elapsed if elapsed > 0 else 0.0
+        return stats
+
+    def stop(self):
+        self.running = False
+        for _ in self.detect_processes:
+            _put(self.detect_queue, None, 'drop_oldest', lambda item: None)
+        for process in self.detect_processes:
+            process.join(timeout=2)
+        for _ in self.encode_processes:
+            _put(self.encode_queue, None, 'drop_oldest', lambda item: None)
+        for process in self.encode_processes + self.detect_processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+
+        current = threading.current_thread()
+        for thread in (self.collector, self.capture_thread):
+            if thread is not None and thread is not current:
+                thread.join(timeout=1)
+
+        self.frames = None
+        self.shm.close()
+        self.shm.unlink()
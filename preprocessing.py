@@ -0,0 +1,96 @@
+import cv2
+import numpy as np
+
+SHARPEN_KERNEL = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], dtype=np.float32)
+ENHANCE_REGIONS = ('frame', 'face')
+
+
+class FramePreprocessor:
+    """Tiền xử lý frame cho nhận diện: thu nhỏ trước, rồi mới tăng tương phản (CLAHE) và làm nét.
+
+    CLAHE và kernel làm nét được tạo một lần; buffer trung gian được cấp phát một lần cho mỗi
+    kích thước frame và dùng lại ở các frame sau, nên mảng trả về từ prepare() bị ghi đè ở
+    lần gọi kế tiếp (copy nếu cần giữ lại).
+
+    enhance_region='face': không tăng cường cả frame, chỉ tăng cường vùng mặt trước khi encode.
+    """
+
+    def __init__(self, resize_scale, clahe=True, sharpen=True, clip_limit=2.0, tile_grid_size=(8, 8),
+                 enhance_region='frame'):
+        if enhance_region not in ENHANCE_REGIONS:
+            raise ValueError(f"Vùng tăng cường không hợp lệ: {enhance_region}")
+
+        self.resize_scale = resize_scale
+        self.enhance_region = enhance_region
+        self.sharpen = sharpen
+        self.clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tuple(tile_grid_size)) if clahe else None
+        self._buffers = {}
+
+    @classmethod
+    def from_profile(cls, resize_scale, profile, enhance_region='frame'):
+        """Tạo từ một hồ sơ ánh sáng trong PREPROCESS_PROFILES"""
+        return cls(resize_scale, enhance_region=enhance_region, **profile)
+
+    def _buffers_for(self, height, width):
+        buffers = self._buffers.get((height, width))
+        if buffers is None:
+            # Chỉ vài kích thước được dùng thường xuyên (frame phân tích, frame dò ở chế độ chờ)
+            if len(self._buffers) >= 4:
+                self._buffers.clear()
+            buffers = {
+                name: np.empty((height, width, 3), dtype=np.uint8)
+                for name in ('small', 'rgb', 'lab', 'enhanced', 'sharpened')
+            }
+            buffers['l'] = np.empty((height, width), dtype=np.uint8)
+            self._buffers[(height, width)] = buffers
+        return buffers
+
+    def prepare(self, frame, scale=None, reuse=True):
+        """Thu nhỏ frame BGR, chuyển sang RGB và tăng cường (nếu enhance_region='frame').
+
+        reuse=False cấp phát mảng mới, dùng cho ảnh có kích thước thay đổi liên tục như vùng ROI.
+        """
+        scale = self.resize_scale if scale is None else scale
+        height, width = frame.shape[:2]
+        size = (int(round(width * scale)), int(round(height * scale)))
+        buffers = self._buffers_for(size[1], size[0]) if reuse else None
+
+        if scale != 1.0:
+            small = cv2.resize(frame, size, dst=buffers['small'] if reuse else None)
+        else:
+            small = frame
+        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=buffers['rgb'] if reuse else None)
+
+        if self.enhance_region == 'frame':
+            return self.enhance_rgb(rgb, buffers)
+        return rgb
+
+    def enhance_rgb(self, rgb, buffers=None):
+        """CLAHE trên kênh L và làm nét ảnh RGB, bỏ qua các bước bị tắt trong hồ sơ"""
+        buffers = buffers or {}
+        out = rgb
+        if self.clahe is not None:
+            lab = cv2.cvtColor(out, cv2.COLOR_RGB2LAB, dst=buffers.get('lab'))
+            l = cv2.extractChannel(lab, 0, dst=buffers.get('l'))
+            self.clahe.apply(l, dst=l)
+            cv2.insertChannel(l, lab, 0)
+            out = cv2.cvtColor(lab, cv2.COLOR_LAB2RGB, dst=buffers.get('enhanced'))
+        if self.sharpen:
+            out = cv2.filter2D(out, -1, SHARPEN_KERNEL, dst=buffers.get('sharpened'))
+        return out
+
+    def enhance(self, frame):
+        """Tăng cường frame BGR, giữ nguyên kích thước"""
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return cv2.cvtColor(self.enhance_rgb(rgb), cv2.COLOR_RGB2BGR)
+
+    def enhance_faces(self, rgb, face_locations, margin=0.2):
+        """Tăng cường tại chỗ vùng quanh từng khuôn mặt (chế độ enhance_region='face')"""
+        height, width = rgb.shape[:2]
+        for top, right, bottom, left in face_locations:
+            margin_y, margin_x = int((bottom - top) * margin), int((right - left) * margin)
+            y0, x0 = max(0, top - margin_y), max(0, left - margin_x)
+            y1, x1 = min(height, bottom + margin_y), min(width, right + margin_x)
+            if y1 > y0 and x1 > x0:
+                rgb[y0:y1, x0:x1] = self.enhance_rgb(np.ascontiguousarray(rgb[y0:y1, x0:x1]))
+        return rgb
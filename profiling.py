@@ -0,0 +1,210 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+
+from config import (PROFILE_DIR, PROFILE_DURATION, PROFILE_MODE, PROFILE_ON_START, PROFILE_SAMPLE_INTERVAL,
+                    PROFILE_SIGNAL)
+
+PROFILE_MODES = ('cprofile', 'sampling', 'both')
+
+
+class OnDemandProfiler:
+    """Profile các hàm được đánh dấu trong một khoảng thời gian, ứng dụng vẫn chạy bình thường.
+
+    Khi không có phiên profile, hàm được đánh dấu chỉ tốn thêm một lần kiểm tra cờ. Trong phiên:
+    - 'cprofile': mỗi thread một cProfile.Profile, gộp lại thành file .pstats (+ bảng .txt);
+    - 'sampling': thread lấy mẫu stack của các thread đang chạy hàm được đánh dấu, ghi file
+      .folded (định dạng của flamegraph.pl, speedscope). Lấy mẫu trong cùng process nên phụ thuộc GIL:
+      lời gọi C dài giữ GIL (ví dụ HOG của dlib) được thấy rõ hơn qua cProfile;
+    - 'both': cả hai.
+    Kết quả được ghi vào output_dir khi hết duration giây hoặc khi gọi stop().
+    """
+
+    def __init__(self, output_dir=PROFILE_DIR, mode=PROFILE_MODE, sample_interval=PROFILE_SAMPLE_INTERVAL):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"PROFILE_MODE phải là một trong {PROFILE_MODES}")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.active = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiles = {}
+        self._threads = set()
+        self._samples = Counter()
+        self._calls = Counter()
+        self._started_at = None
+        self._timer = None
+        self._sampler = None
+
+    def profiled(self, name):
+        """Decorator đánh dấu hàm được profile khi có phiên"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.active:
+                    return func(*args, **kwargs)
+                return self._call(name, func, args, kwargs)
+            return wrapper
+        return decorator
+
+    def _call(self, name, func, args, kwargs):
+        # Hàm được đánh dấu lồng nhau chỉ được tính ở lớp ngoài cùng
+        if getattr(self._local, 'depth', 0):
+            return func(*args, **kwargs)
+
+        thread_id = threading.get_ident()
+        profile = None
+        with self._lock:
+            self._calls[name] += 1
+            self._threads.add(thread_id)
+            if self.mode != 'sampling':
+                profile = self._profiles.get(thread_id)
+                if profile is None:
+                    profile = self._profiles[thread_id] = cProfile.Profile()
+
+        self._local.depth = 1
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # Python 3.12+: mỗi lúc chỉ bật được một cProfile, thread này chỉ được lấy mẫu
+                profile = None
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+            self._local.depth = 0
+            with self._lock:
+                self._threads.discard(thread_id)
+
+    def start(self, duration=PROFILE_DURATION):
+        """Bắt đầu phiên profile duration giây; False nếu đang có phiên"""
+        with self._lock:
+            if self.active:
+                return False
+            self._profiles = {}
+            self._samples = Counter()
+            self._calls = Counter()
+            self._started_at = time.time()
+            self.active = True
+
+        if self.mode != 'cprofile':
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+            self._sampler.start()
+        self._timer = threading.Timer(duration, self.stop)
+        self._timer.daemon = True
+        self._timer.start()
+        print(f"Bắt đầu profile ({self.mode}) trong {duration} giây")
+        return True
+
+    def _sample_loop(self):
+        while self.active:
+            frames = sys._current_frames()
+            with self._lock:
+                thread_ids = list(self._threads)
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self._samples[';'.join(reversed(stack))] += 1
+            del frames
+            time.sleep(self.sample_interval)
+
+    def stop(self):
+        """Kết thúc phiên và ghi kết quả, trả về danh sách file đã ghi"""
+        with self._lock:
+            if not self.active:
+                return []
+            self.active = False
+        if self._timer is not None and self._timer is not threading.current_thread():
+            self._timer.cancel()
+        if self._sampler is not None:
+            self._sampler.join(timeout=1)
+            self._sampler = None
+
+        # Chờ các lời gọi đang chạy kết thúc để profile không còn bật
+        deadline = time.time() + 5
+        while self._threads and time.time() < deadline:
+            time.sleep(0.01)
+
+        try:
+            return self._dump()
+        except Exception as e:
+            print(f"Lỗi ghi kết quả profile: {str(e)}")
+            return []
+
+    def _dump(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, time.strftime('profile_%Y%m%d_%H%M%S', time.localtime(self._started_at)))
+        elapsed = time.time() - self._started_at
+        calls = ", ".join(f"{name} x{count}" for name, count in self._calls.most_common())
+        paths = []
+
+        if self._profiles:
+            profiles = list(self._profiles.values())
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(f"{base}.pstats")
+
+            text = io.StringIO()
+            text.write(f"Thời gian: {elapsed:.1f} s, lời gọi: {calls}\n\n")
+            pstats.Stats(f"{base}.pstats", stream=text).sort_stats('cumulative').print_stats(40)
+            with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+                f.write(text.getvalue())
+            paths += [f"{base}.pstats", f"{base}.txt"]
+
+        if self._samples:
+            with open(f"{base}.folded", 'w', encoding='utf-8') as f:
+                for stack, count in self._samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            paths.append(f"{base}.folded")
+
+        print(f"Đã ghi profile ({elapsed:.1f} s, {calls or 'không có lời gọi'}): {', '.join(paths) or 'không có dữ liệu'}")
+        return paths
+
+    def toggle(self, *args):
+        """Bật phiên mới hoặc kết thúc sớm phiên đang chạy (dùng làm signal handler)"""
+        if self.active:
+            # Không ghi file trong signal handler, để thread khác làm
+            threading.Thread(target=self.stop, name="profiler-stop", daemon=True).start()
+        else:
+            self.start()
+
+    def install_signal(self, signal_name=PROFILE_SIGNAL):
+        """Bật/tắt profile khi nhận tín hiệu (ví dụ kill -USR1 <pid>); chỉ gọi được từ main thread"""
+        signum = getattr(signal, signal_name, None) if signal_name else None
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signum, self.toggle)
+        return True
+
+
+profiler = OnDemandProfiler()
+_installed = False
+
+
+def install_profiling():
+    """Đăng ký tín hiệu PROFILE_SIGNAL và bắt đầu phiên ngay nếu PROFILE_ON_START (chỉ lần đầu)"""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    if profiler.install_signal(PROFILE_SIGNAL):
+        print(f"Profile theo yêu cầu: kill -{PROFILE_SIGNAL[3:]} {os.getpid()}")
+    if PROFILE_ON_START:
+        profiler.start(PROFILE_DURATION)
@@ -0,0 +1,158 @@
+import time
+
+import numpy as np
+import pytest
+
+import checkin
+from checkin import CheckInEngine, StageStats
+from frame_governor import FrameRateGovernor
+from tracing import Tracer, load_traces
+
+FRAME = np.zeros((48, 64, 3), dtype=np.uint8)
+LOCATION = (10, 40, 40, 10)
+
+
+class FakeRecognizer:
+    """FaceRecognizer giả: kết quả giữ mặt và liveness được đặt trước cho từng frame"""
+
+    def __init__(self):
+        self.results = []
+        self.liveness = []
+        self.face_found = False
+        self.face_hold_start_time = None
+        self.probe_scale = None
+        self.governor_active = False
+        self.motion_gate = None
+        self.logged = []
+        self.liveness_resets = 0
+
+    def process_frame_with_verification(self, frame, analysis=None):
+        self.face_found, result = self.results.pop(0)
+        if self.face_found and self.face_hold_start_time is None:
+            self.face_hold_start_time = time.time()
+        return result
+
+    def verify_liveness(self, frame, face_location, action):
+        return self.liveness.pop(0)
+
+    def reset_liveness(self):
+        self.liveness_resets += 1
+
+    def reset_hold(self):
+        self.face_hold_start_time = None
+
+    def log_detection(self, frame, face_location, name, success, status="in"):
+        self.logged.append((face_location, name, status))
+
+
+class FakeModel:
+    def __init__(self, names):
+        self.face_recognizer = FakeRecognizer()
+        self.names = names
+        self.marked = []
+
+    def recognize_employee(self, face_encoding):
+        name = self.names.get(face_encoding)
+        return (7, name) if name else (None, None)
+
+    def recognize_employee_by_name(self, name):
+        return 7, name
+
+    def mark_attendance(self, emp_id, name):
+        self.marked.append((emp_id, name))
+        return True, 'IN'
+
+
+@pytest.fixture
+def engine(tmp_path):
+    model = FakeModel({'enc_a': 'nv_a'})
+    messages = []
+    engine = CheckInEngine(model, lambda message, color: messages.append(message))
+    engine.tracer = Tracer(str(tmp_path / 'traces.jsonl'), enabled=True)
+    engine.governor = None
+    engine.multi_face = None
+    engine.messages = messages
+    return engine
+
+
+def test_check_in_flow(engine):
+    recognizer = engine.face_recognizer
+    recognizer.results = [(True, None), (True, (LOCATION, 'enc_a', True))]
+    recognizer.liveness = [False, True]
+
+    assert engine.process_frame(FRAME)[1] is None
+    assert engine.messages[-1].startswith("Giữ mặt thêm")
+
+    engine.process_frame(FRAME)
+    assert engine.expected_name == 'nv_a'
+    assert engine.current_action in checkin.RANDOM_ACTIONS
+    assert engine.current_face_location == LOCATION
+    assert engine.messages[-1] == f"nv_a, {engine.current_action}"
+
+    assert engine.process_frame(FRAME)[1] is None
+    assert engine.current_action is not None
+
+    assert engine.process_frame(FRAME)[1] == (7, 'nv_a')
+    assert engine.current_action is None
+    assert recognizer.logged == [(LOCATION, 'nv_a', 'in')]
+
+    assert engine.record_attendance(7, 'nv_a') == (True, 'IN')
+    assert engine.model.marked == [(7, 'nv_a')]
+    assert engine.trace is None
+
+    records = load_traces(engine.tracer.path)
+    assert [record['outcome'] for record in records] == ['checkin']
+    assert records[0]['name'] == 'nv_a'
+    assert [span[0] for span in records[0]['spans']] == [
+        'first_detection', 'hold_complete', 'match', 'liveness_prompt', 'liveness_pass', 'db_commit'
+    ]
+
+
+def test_unknown_face_does_not_start_liveness(engine):
+    engine.face_recognizer.results = [(True, None), (True, (LOCATION, 'enc_x', True)), (False, None)]
+    for _ in range(3):
+        engine.process_frame(FRAME)
+
+    assert engine.current_action is None
+    records = load_traces(engine.tracer.path)
+    assert [record['outcome'] for record in records] == ['abandoned']
+    assert engine.model.marked == []
+
+
+def test_liveness_timeout_resets_verification(engine):
+    engine.face_recognizer.results = [(True, None), (True, (LOCATION, 'enc_a', True))]
+    engine.process_frame(FRAME)
+    engine.process_frame(FRAME)
+    engine.action_start_time -= checkin.ACTION_TIMEOUT + 1
+
+    assert engine.process_frame(FRAME)[1] is None
+    assert engine.current_action is None
+    assert engine.messages[-1] == "Hết thời gian xác thực!"
+    assert [record['outcome'] for record in load_traces(engine.tracer.path)] == ['timeout']
+
+
+def test_next_interval_follows_governor(engine):
+    assert engine.next_interval(100) == 100
+
+    engine.governor = FrameRateGovernor(500, 100, 0.25, no_detection_threshold=2)
+    engine.face_recognizer.face_found = True
+    assert engine.next_interval(100) == 100
+    assert engine.face_recognizer.governor_active
+    assert engine.face_recognizer.probe_scale is None
+
+    engine.face_recognizer.face_found = False
+    engine.next_interval(100)
+    assert engine.next_interval(100) == 500
+    assert not engine.face_recognizer.governor_active
+    assert engine.face_recognizer.probe_scale == 0.25
+
+
+def test_stage_stats_report():
+    stats = StageStats()
+    for _ in range(3):
+        with stats.measure('match'):
+            pass
+    report = stats.report()
+    assert report['match']['count'] == 3
+    assert report['match']['mean_ms'] >= 0.0
+    assert report['match']['per_sec'] > 0
@@ -0,0 +1,123 @@
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+pytest.importorskip('face_recognition')
+
+from models import embedding_model
+from models.embedding_model import EmbeddingModel
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE employees (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, '
+                 'image_path TEXT NOT NULL)')
+    yield conn
+    conn.close()
+
+
+def add_employee(conn, tmp_path, name, content=None):
+    path = tmp_path / f"{name}.jpg"
+    path.write_bytes(content or name.encode())
+    cursor = conn.execute("INSERT INTO employees (name, image_path) VALUES (?, ?)", (name, str(path)))
+    return cursor.lastrowid, str(path)
+
+
+def test_blob_round_trip(conn, tmp_path):
+    embeddings = EmbeddingModel(conn)
+    emp_a, path_a = add_employee(conn, tmp_path, 'nv_a')
+    emp_b, path_b = add_employee(conn, tmp_path, 'nv_b')
+    encoding_a = np.random.default_rng(0).normal(size=128)
+    encoding_b = np.random.default_rng(1).normal(size=128)
+    embeddings.save(emp_a, encoding_a, path_a)
+    embeddings.save(emp_b, encoding_b, path_b)
+
+    emp_ids, image_paths, encodings = embeddings.load_all()
+    assert emp_ids == [emp_a, emp_b]
+    assert image_paths == [path_a, path_b]
+    assert encodings.shape == (2, 128)
+    assert np.array_equal(encodings, np.stack([encoding_a, encoding_b]))
+
+
+def test_no_face_marker(conn, tmp_path):
+    embeddings = EmbeddingModel(conn)
+    emp_id, path = add_employee(conn, tmp_path, 'nv_a')
+    embeddings.save(emp_id, None, path)
+
+    assert embeddings.get_missing() == []
+    assert embeddings.is_current(emp_id, path)
+    emp_ids, _, encodings = embeddings.load_all()
+    assert emp_ids == []
+    assert encodings.shape == (0, 128)
+
+
+def test_get_missing_ignores_other_model_versions(conn, tmp_path, monkeypatch):
+    embeddings = EmbeddingModel(conn)
+    emp_a, path_a = add_employee(conn, tmp_path, 'nv_a')
+    emp_b, path_b = add_employee(conn, tmp_path, 'nv_b')
+    embeddings.save(emp_a, np.ones(128), path_a)
+    assert embeddings.get_missing() == [(emp_b, path_b)]
+
+    monkeypatch.setattr(embedding_model, 'EMBEDDING_MODEL_VERSION', 'other')
+    assert embeddings.get_missing() == [(emp_a, path_a), (emp_b, path_b)]
+    assert not embeddings.is_current(emp_a, path_a)
+
+
+def test_is_current_checks_stat_then_hash(conn, tmp_path):
+    embeddings = EmbeddingModel(conn)
+    emp_id, path = add_employee(conn, tmp_path, 'nv_a', b'abcd')
+    embeddings.save(emp_id, np.ones(128), path)
+    assert embeddings.is_current(emp_id, path)
+
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert embeddings.is_current(emp_id, path)
+    row = conn.execute("SELECT image_mtime FROM face_embeddings WHERE employee_id=?", (emp_id,)).fetchone()
+    assert row[0] == stat.st_mtime_ns + 10 ** 9
+
+    with open(path, 'wb') as f:
+        f.write(b'dcba')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10 ** 9))
+    assert not embeddings.is_current(emp_id, path)
+
+
+def test_backfill(conn, tmp_path, monkeypatch):
+    embeddings = EmbeddingModel(conn)
+    emp_a, path_a = add_employee(conn, tmp_path, 'nv_a')
+    emp_b, path_b = add_employee(conn, tmp_path, 'nv_b')
+    emp_c, path_c = add_employee(conn, tmp_path, 'nv_c')
+    emp_d, _ = add_employee(conn, tmp_path, 'nv_d')
+    os.remove(tmp_path / 'nv_d.jpg')
+
+    calls = []
+
+    def fake_encode(paths, workers=None):
+        calls.append(list(paths))
+        yield path_a, np.full(128, 0.1), None
+        yield path_b, None, None
+        yield path_c, None, 'không đọc được ảnh'
+
+    monkeypatch.setattr(embedding_model, 'encode_image_files', fake_encode)
+    assert embeddings.backfill() == 1
+    assert calls == [[path_a, path_b, path_c]]
+
+    emp_ids, _, encodings = embeddings.load_all()
+    assert emp_ids == [emp_a]
+    assert np.allclose(encodings[0], 0.1)
+    # Ảnh lỗi được thử lại, ảnh không có mặt thì không; ảnh đã mất thì bỏ qua
+    assert embeddings.get_missing() == [(emp_c, path_c), (emp_d, str(tmp_path / 'nv_d.jpg'))]
+
+
+def test_adds_stat_columns_to_old_table(conn):
+    conn.execute('''
+        CREATE TABLE face_embeddings (
+            employee_id INTEGER PRIMARY KEY, embedding BLOB NOT NULL, model_version TEXT NOT NULL,
+            num_jitters INTEGER NOT NULL, image_hash TEXT NOT NULL, updated_at TEXT NOT NULL
+        )
+    ''')
+    EmbeddingModel(conn)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(face_embeddings)")}
+    assert {'image_size', 'image_mtime'} <= columns
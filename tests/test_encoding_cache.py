@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+
+from encoding_cache import EncodingCache
+
+
+def write_image(path, content=b'jpeg-bytes'):
+    path.write_bytes(content)
+    return str(path)
+
+
+def make_cache(tmp_path, model='large', num_jitters=1):
+    return EncodingCache(str(tmp_path / 'cache' / 'encodings.npz'), model, num_jitters)
+
+
+def test_miss_then_hit_after_reload(tmp_path):
+    image = write_image(tmp_path / 'nv_a.jpg')
+    encoding = np.linspace(-0.5, 0.5, 128)
+
+    cache = make_cache(tmp_path)
+    assert cache.get(image) == (False, None)
+    cache.put(image, encoding)
+    cache.save()
+
+    cache = make_cache(tmp_path)
+    found, cached = cache.get(image)
+    assert found
+    assert np.allclose(cached, encoding)
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_no_face_is_cached(tmp_path):
+    image = write_image(tmp_path / 'empty.jpg')
+    cache = make_cache(tmp_path)
+    cache.get(image)
+    cache.put(image, None)
+    cache.save()
+
+    assert make_cache(tmp_path).get(image) == (True, None)
+
+
+def test_touched_file_with_same_content_is_a_hit(tmp_path):
+    image = write_image(tmp_path / 'nv_a.jpg')
+    cache = make_cache(tmp_path)
+    cache.get(image)
+    cache.put(image, np.ones(128))
+    cache.save()
+
+    stat = os.stat(image)
+    os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    cache = make_cache(tmp_path)
+    found, _ = cache.get(image)
+    assert found
+    assert cache.dirty
+
+
+def test_changed_content_is_a_miss(tmp_path):
+    image = write_image(tmp_path / 'nv_a.jpg')
+    cache = make_cache(tmp_path)
+    cache.get(image)
+    cache.put(image, np.ones(128))
+    cache.save()
+
+    # Cùng kích thước, khác nội dung và mtime
+    stat = os.stat(image)
+    write_image(tmp_path / 'nv_a.jpg', b'JPEG-BYTES')
+    os.utime(image, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert make_cache(tmp_path).get(image) == (False, None)
+
+    # Khác kích thước
+    write_image(tmp_path / 'nv_a.jpg', b'longer jpeg bytes')
+    assert make_cache(tmp_path).get(image) == (False, None)
+
+
+def test_model_or_jitters_change_drops_cache(tmp_path):
+    image = write_image(tmp_path / 'nv_a.jpg')
+    cache = make_cache(tmp_path)
+    cache.get(image)
+    cache.put(image, np.ones(128))
+    cache.save()
+
+    assert make_cache(tmp_path, model='small').get(image) == (False, None)
+    assert make_cache(tmp_path, num_jitters=2).get(image) == (False, None)
+    assert make_cache(tmp_path).get(image)[0]
+
+
+def test_prune_only_touches_its_directory(tmp_path):
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    images = [write_image(tmp_path / 'a' / 'x.jpg'), write_image(tmp_path / 'a' / 'y.jpg'),
+              write_image(tmp_path / 'b' / 'z.jpg')]
+    cache = make_cache(tmp_path)
+    for image in images:
+        cache.get(image)
+        cache.put(image, np.ones(128))
+
+    cache.prune(str(tmp_path / 'a'), images[:1])
+    assert sorted(cache.entries) == sorted(os.path.abspath(p) for p in (images[0], images[2]))
+
+
+def test_corrupt_cache_file_is_ignored(tmp_path):
+    cache_path = tmp_path / 'cache' / 'encodings.npz'
+    cache_path.parent.mkdir()
+    cache_path.write_bytes(b'not a zip')
+    cache = make_cache(tmp_path)
+    assert cache.entries == {}
+    assert cache.dirty
@@ -0,0 +1,82 @@
+import types
+
+import numpy as np
+import pytest
+
+pytest.importorskip('face_recognition')
+
+import face_analysis
+from face_analysis import FaceAnalysis
+
+
+@pytest.fixture
+def shape_calls(monkeypatch):
+    """Thay predictor bằng hàm trả về 4 góc của khuôn mặt, ghi lại ảnh và vị trí được dùng"""
+    calls = []
+
+    def fake_shapes(image, locations, model):
+        calls.append((image, locations, model))
+        shapes = []
+        for top, right, bottom, left in locations:
+            corners = [(left, top), (right, top), (right, bottom), (left, bottom)]
+            shapes.append(types.SimpleNamespace(parts=lambda c=corners: [types.SimpleNamespace(x=x, y=y) for x, y in c]))
+        return shapes
+
+    monkeypatch.setattr(face_analysis, 'face_landmark_shapes', fake_shapes)
+    return calls
+
+
+def test_landmarks_use_full_resolution_crop(shape_calls):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    small = np.zeros((240, 320, 3), dtype=np.uint8)
+    analysis = FaceAnalysis(small, (50, 150, 110, 90), 0.5, frame=frame)
+
+    landmarks = analysis.landmarks('large')
+
+    image, locations, model = shape_calls[0]
+    assert model == 'large'
+    # Khuôn mặt 120x120 trên frame gốc, mở rộng 30 pixel mỗi phía
+    assert image.shape == (180, 180, 3)
+    assert locations == [(30, 150, 150, 30)]
+    assert np.allclose(landmarks, [(180, 100), (300, 100), (300, 220), (180, 220)])
+
+
+def test_landmarks_without_frame_are_scaled_from_image(shape_calls):
+    small = np.zeros((240, 320, 3), dtype=np.uint8)
+    analysis = FaceAnalysis(small, (50, 150, 110, 90), 0.5)
+
+    landmarks = analysis.landmarks('large')
+
+    assert shape_calls[0][0] is small
+    assert np.allclose(landmarks, [(180, 100), (300, 100), (300, 220), (180, 220)])
+    analysis.landmarks('large')
+    assert len(shape_calls) == 1
+
+
+def test_crop_is_clipped_at_frame_border(shape_calls):
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    analysis = FaceAnalysis(np.zeros((240, 320, 3), np.uint8), (0, 40, 40, 0), 0.5, frame=frame)
+
+    landmarks = analysis.landmarks('large')
+
+    assert shape_calls[0][0].shape == (100, 100, 3)
+    assert np.allclose(landmarks, [(0, 0), (80, 0), (80, 80), (0, 80)])
+
+
+def test_crop_keeps_only_the_face_region(shape_calls):
+    image = np.random.default_rng(0).integers(0, 255, (240, 320, 3), dtype=np.uint8)
+    analysis = FaceAnalysis(image, (50, 150, 110, 90), 0.5, frame=np.zeros((480, 640, 3), np.uint8))
+    quality = analysis.quality
+
+    crop = analysis.crop(margin=0.5)
+    image[:] = 0
+
+    assert crop.image.shape == (120, 120, 3)
+    assert crop.location == (30, 90, 90, 30)
+    assert crop.scale == 0.5
+    assert crop.frame is None
+    assert crop.quality == quality
+    assert crop.image.any()
+    crop.landmarks('small')
+    assert shape_calls[-1][0] is crop.image
+    assert shape_calls[-1][1] == [(30, 90, 90, 30)]
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('face_recognition')
+
+from face_utils import FaceRecognizer
+from motion_gate import MotionGate
+
+FACE = (40, 120, 120, 40)
+
+
+@pytest.fixture
+def recognizer(monkeypatch):
+    recognizer = FaceRecognizer()
+    recognizer.motion_gate = MotionGate(max_skip_frames=100)
+    recognizer.tracker = None
+    recognizer.detections = [FACE]
+    monkeypatch.setattr(recognizer, 'detect_faces', lambda rgb_small_frame: list(recognizer.detections))
+    monkeypatch.setattr(recognizer, 'check_face_quality', lambda *args: True)
+    return recognizer
+
+
+def static_frame():
+    return np.full((480, 640, 3), 90, dtype=np.uint8)
+
+
+def test_static_empty_scene_is_gated(recognizer):
+    recognizer.detections = []
+    recognizer.process_frame_with_verification(static_frame())
+    recognizer.process_frame_with_verification(static_frame())
+    assert recognizer.motion_gate.counters['skips'] == 1
+    assert not recognizer.face_found
+
+
+def test_stationary_face_after_probe_hit_is_analysed(recognizer):
+    # Chế độ chờ: lần dò thấy một người đứng yên
+    recognizer.probe_scale = 0.25
+    recognizer.process_frame_with_verification(static_frame())
+    assert recognizer.face_found
+
+    # Bộ điều tốc chuyển sang hoạt động: frame tĩnh tiếp theo vẫn phải được phát hiện đầy đủ
+    recognizer.probe_scale = None
+    for _ in range(3):
+        recognizer.process_frame_with_verification(static_frame())
+        assert recognizer.face_found
+    assert recognizer.face_hold_start_time is not None
+    assert recognizer.motion_gate.counters['skips'] == 0
+
+
+def test_governor_active_keeps_gate_open(recognizer):
+    recognizer.detections = []
+    recognizer.process_frame_with_verification(static_frame())
+    recognizer.governor_active = True
+    recognizer.process_frame_with_verification(static_frame())
+    assert recognizer.motion_gate.counters['skips'] == 0
+    assert recognizer.motion_gate.counters['forced'] == 1
+
+    recognizer.governor_active = False
+    recognizer.process_frame_with_verification(static_frame())
+    assert recognizer.motion_gate.counters['skips'] == 1
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from face_tracker import FaceTracker, box_iou
+
+
+def scene(top, left, size=40, shape=(160, 200)):
+    """Ảnh RGB nhiễu cố định với một 'khuôn mặt' có hoa văn riêng tại (top, left)"""
+    image = np.random.default_rng(0).integers(0, 40, shape + (3,), dtype=np.uint8)
+    yy, xx = np.mgrid[0:size, 0:size]
+    pattern = ((np.sin(yy / 3.0) + np.cos(xx / 5.0) + 2) * 50).astype(np.uint8)
+    image[top:top + size, left:left + size] = pattern[..., None]
+    return image
+
+
+def test_box_iou():
+    assert box_iou((0, 10, 10, 0), (0, 10, 10, 0)) == 1.0
+    assert box_iou((0, 10, 10, 0), (20, 30, 30, 20)) == 0.0
+    assert box_iou((0, 10, 10, 0), (0, 15, 10, 5)) == pytest.approx(50 / 150)
+
+
+def test_follows_moving_face():
+    tracker = FaceTracker(min_score=0.6, redetect_frames=0)
+    tracker.start(scene(40, 50), (40, 90, 80, 50))
+    assert tracker.active
+
+    for step in range(1, 4):
+        location = tracker.update(scene(40 + 3 * step, 50 + 4 * step))
+        assert location == (40 + 3 * step, 90 + 4 * step, 80 + 3 * step, 50 + 4 * step)
+    assert tracker.age == 3
+
+
+def test_loses_face_and_resets():
+    tracker = FaceTracker(min_score=0.6)
+    tracker.start(scene(40, 50), (40, 90, 80, 50))
+    empty = np.random.default_rng(1).integers(0, 40, (160, 200, 3), dtype=np.uint8)
+    assert tracker.update(empty) is None
+    assert not tracker.active
+    assert tracker.update(scene(40, 50)) is None
+
+
+def test_needs_redetect_after_age():
+    tracker = FaceTracker(redetect_frames=2)
+    tracker.start(scene(40, 50), (40, 90, 80, 50))
+    tracker.update(scene(40, 50))
+    assert not tracker.needs_redetect
+    tracker.update(scene(40, 50))
+    assert tracker.needs_redetect
+
+    tracker.start(scene(40, 50), (40, 90, 80, 50))
+    assert tracker.age == 0
+    assert not tracker.needs_redetect
+
+
+def test_unknown_cv2_tracker():
+    with pytest.raises(ValueError):
+        FaceTracker(tracker_type='unknown').start(scene(40, 50), (40, 90, 80, 50))
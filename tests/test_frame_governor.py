@@ -0,0 +1,51 @@
+from config import MIN_FACE_SIZE, MIN_FACE_VISIBILITY
+from frame_governor import FrameRateGovernor, is_face_visible
+
+
+def make_governor():
+    return FrameRateGovernor(idle_interval=1000, active_interval=100, idle_scale=0.25, no_detection_threshold=3)
+
+
+def test_starts_idle():
+    governor = make_governor()
+    assert governor.state == FrameRateGovernor.IDLE
+    assert governor.interval == 1000
+    assert governor.probe_scale == 0.25
+
+
+def test_face_switches_to_active_immediately():
+    governor = make_governor()
+    assert governor.update(True) == 100
+    assert governor.state == FrameRateGovernor.ACTIVE
+    assert governor.probe_scale is None
+    assert governor.transitions == 1
+
+
+def test_returns_to_idle_after_threshold_misses():
+    governor = make_governor()
+    governor.update(True)
+    assert governor.update(False) == 100
+    assert governor.update(False) == 100
+    assert governor.update(False) == 1000
+    assert governor.state == FrameRateGovernor.IDLE
+    assert governor.transitions == 2
+
+
+def test_detection_resets_miss_count():
+    governor = make_governor()
+    governor.update(True)
+    governor.update(False)
+    governor.update(False)
+    governor.update(True)
+    governor.update(False)
+    governor.update(False)
+    assert governor.state == FrameRateGovernor.ACTIVE
+
+
+def test_small_faces_do_not_count_as_visible():
+    side = MIN_FACE_VISIBILITY * MIN_FACE_SIZE
+    # Cạnh tính theo frame gốc: cạnh trên frame thu nhỏ chia cho scale
+    assert is_face_visible((0, side * 0.5, side * 0.5, 0), scale=0.5)
+    assert not is_face_visible((0, side * 0.5 - 1, side * 0.5 - 1, 0), scale=0.5)
+    assert not is_face_visible((0, side * 2, side * 0.25, 0), scale=0.5)
+    assert is_face_visible((10, 10 + side * 0.25, 10 + side * 0.25, 10), scale=0.25)
@@ -0,0 +1,104 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from frame_sources import ImageDirectorySource, SyntheticSource, VideoFileSource, open_frame_source
+
+
+def solid(value, width=32, height=24):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+def read_all(source, limit=100):
+    """Đọc hết nguồn phát nhanh nhất có thể, trả về danh sách frame"""
+    frames, seq = [], 0
+    source.start()
+    while len(frames) < limit:
+        seq, frame = source.wait_for_frame(seq, timeout=0.1)
+        if source.finished:
+            break
+        frames.append(frame)
+    source.release()
+    return frames
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    for i, value in enumerate((10, 20, 30)):
+        cv2.imwrite(str(tmp_path / f"{i:02d}.png"), solid(value))
+    (tmp_path / 'notes.txt').write_text('không phải ảnh')
+    return tmp_path
+
+
+def test_image_directory_in_name_order(image_dir):
+    source = open_frame_source(str(image_dir), 64, 48, realtime=False)
+    assert isinstance(source, ImageDirectorySource)
+
+    frames = read_all(source)
+    assert [int(frame[0, 0, 0]) for frame in frames] == [10, 20, 30]
+    assert all(frame.shape == (48, 64, 3) for frame in frames)
+    assert source.finished
+
+
+def test_loop_rewinds_to_first_frame(image_dir):
+    source = open_frame_source(str(image_dir), 32, 24, realtime=False, loop=True)
+    frames = read_all(source, limit=7)
+    assert [int(frame[0, 0, 0]) for frame in frames] == [10, 20, 30, 10, 20, 30, 10]
+    assert not source.finished
+
+
+def test_empty_directory_is_not_opened(tmp_path):
+    assert not open_frame_source(str(tmp_path), realtime=False).isOpened()
+
+
+def test_video_file(tmp_path):
+    path = str(tmp_path / 'clip.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 15, (32, 24))
+    if not writer.isOpened():
+        pytest.skip('OpenCV không ghi được video MJPG')
+    for value in (40, 120, 200):
+        writer.write(solid(value))
+    writer.release()
+
+    source = open_frame_source(path, 32, 24, realtime=False)
+    assert isinstance(source, VideoFileSource)
+    assert source.fps == pytest.approx(15)
+    frames = read_all(source)
+    # MJPG nén mất dữ liệu nên chỉ so gần đúng
+    assert [frame.mean() for frame in frames] == pytest.approx([40, 120, 200], abs=5)
+
+
+def test_synthetic_source_is_reproducible(tmp_path):
+    face_path = str(tmp_path / 'face.png')
+    cv2.imwrite(face_path, solid(255, 20, 40))
+
+    source = open_frame_source(f"synthetic:{face_path}", 80, 60, realtime=False)
+    assert isinstance(source, SyntheticSource)
+    ok, frame = source.read()
+    assert ok and frame.shape == (60, 80, 3)
+    # Khuôn mặt chiếm 60% chiều cao frame, ở gần tâm
+    assert (frame[25:35, 35:45] == 255).all()
+
+    again = SyntheticSource(80, 60, face_image=face_path, realtime=False)
+    assert np.array_equal(again.read()[1], frame)
+
+
+def test_synthetic_duration_ends_source():
+    source = SyntheticSource(32, 24, fps=10, duration=0.5, realtime=False)
+    assert len(read_all(source)) == 5
+
+
+def test_realtime_source_reads_in_background(image_dir):
+    source = open_frame_source(str(image_dir), 32, 24, realtime=True, fps=1000)
+    source.start()
+    source._thread.join(timeout=1)
+    assert source.finished
+    assert source.wait_for_frame(0, timeout=0)[0] == 3
+    source.release()
+
+
+def test_unknown_source():
+    with pytest.raises(ValueError):
+        open_frame_source(os.path.join('khong', 'ton', 'tai.mp4'))
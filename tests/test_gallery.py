@@ -0,0 +1,167 @@
+import numpy as np
+import pytest
+
+from gallery import FaceGallery, IVFIndex
+
+
+def random_encodings(n, seed=0):
+    return np.random.default_rng(seed).normal(0, 0.09, (n, 128)).astype(np.float32)
+
+
+def brute_top2(encodings, query):
+    distances = np.linalg.norm(encodings.astype(np.float64) - query, axis=1)
+    order = np.argsort(distances)
+    second = float(distances[order[1]]) if len(order) > 1 else None
+    return int(order[0]), float(distances[order[0]]), second
+
+
+def assert_top2_equal(result, expected):
+    best_idx, best, second = result
+    assert best_idx == expected[0]
+    assert best == pytest.approx(expected[1], abs=1e-4)
+    if expected[2] is None:
+        assert second is None
+    else:
+        assert second == pytest.approx(expected[2], abs=1e-4)
+
+
+def assert_index_consistent(gallery):
+    """Mỗi hàng của gallery nằm đúng một lần trong danh sách đảo, _assign/_pos trỏ đúng vị trí"""
+    index = gallery.index
+    rows = np.concatenate([index._lists[c][:index._counts[c]] for c in range(len(index._lists))])
+    assert np.array_equal(np.sort(rows), np.arange(len(gallery)))
+    for row in range(len(gallery)):
+        assert index._lists[index._assign[row]][index._pos[row]] == row
+
+
+def test_empty_gallery():
+    gallery = FaceGallery()
+    assert gallery.top2(np.zeros(128)) == (None, None, None)
+    assert gallery.top2_many(np.zeros((2, 128))) == [(None, None, None)] * 2
+
+
+def test_single_encoding_has_no_second():
+    gallery = FaceGallery()
+    gallery.add('a', np.full(128, 0.1))
+    best_idx, best, second = gallery.top2(np.full(128, 0.1))
+    assert best_idx == 0
+    assert best == pytest.approx(0.0, abs=1e-3)
+    assert second is None
+
+
+def test_top2_matches_brute_force():
+    encodings = random_encodings(200)
+    gallery = FaceGallery(capacity=8)
+    gallery.add_many([f"nv{i}" for i in range(len(encodings))], encodings)
+    assert gallery.capacity >= len(encodings)
+
+    for query in random_encodings(20, seed=1):
+        assert_top2_equal(gallery.top2(query), brute_top2(encodings, query))
+
+
+def test_top2_many_matches_top2():
+    encodings = random_encodings(100)
+    gallery = FaceGallery()
+    gallery.add_many([f"nv{i}" for i in range(len(encodings))], encodings)
+    queries = random_encodings(10, seed=2)
+
+    for result, query in zip(gallery.top2_many(queries), queries):
+        assert_top2_equal(result, gallery.top2(query))
+
+
+def test_add_remove_and_replace():
+    encodings = random_encodings(50)
+    gallery = FaceGallery(capacity=4)
+    for i, encoding in enumerate(encodings):
+        gallery.add(f"nv{i % 25}", encoding)
+
+    assert gallery.remove('nv3') == 2
+    assert gallery.remove('nv3') == 0
+    assert len(gallery) == 48
+    assert 'nv3' not in gallery.names
+
+    kept = np.array([i for i in range(50) if i % 25 != 3])
+    expected = {f"nv{i % 25}" for i in kept}
+    assert set(gallery.names) == expected
+    for query in random_encodings(10, seed=3):
+        best_idx, best, second = gallery.top2(query)
+        _, expected_best, expected_second = brute_top2(encodings[kept], query)
+        assert best == pytest.approx(expected_best, abs=1e-4)
+        assert second == pytest.approx(expected_second, abs=1e-4)
+
+    # Thay encoding: xoá tên cũ rồi thêm lại
+    replacement = np.full(128, 0.5, dtype=np.float32)
+    gallery.remove('nv0')
+    gallery.add('nv0', replacement)
+    best_idx, best, _ = gallery.top2(replacement)
+    assert gallery.names[best_idx] == 'nv0'
+    assert best == pytest.approx(0.0, abs=1e-3)
+
+    gallery.clear()
+    assert len(gallery) == 0
+    assert gallery.top2(replacement) == (None, None, None)
+
+
+def test_add_many_rejects_mismatched_names():
+    with pytest.raises(ValueError):
+        FaceGallery().add_many(['a'], random_encodings(2))
+
+
+def test_ivf_stays_flat_below_min_train_size():
+    gallery = FaceGallery(index=IVFIndex(nlist=8, min_train_size=100))
+    gallery.add_many([f"nv{i}" for i in range(50)], random_encodings(50))
+    assert not gallery.index.is_trained
+
+
+def test_ivf_full_probe_matches_brute_force():
+    encodings = random_encodings(400)
+    gallery = FaceGallery(index=IVFIndex(nlist=16, nprobe=16, min_train_size=100))
+    gallery.add_many([f"nv{i}" for i in range(len(encodings))], encodings)
+    assert gallery.index.is_trained
+    assert_index_consistent(gallery)
+
+    queries = random_encodings(20, seed=4)
+    for query in queries:
+        assert_top2_equal(gallery.top2(query), brute_top2(encodings, query))
+    for result, query in zip(gallery.top2_many(queries), queries):
+        assert_top2_equal(result, brute_top2(encodings, query))
+
+
+def test_ivf_finds_exact_member_with_partial_probe():
+    encodings = random_encodings(400)
+    gallery = FaceGallery(index=IVFIndex(nlist=16, nprobe=2, min_train_size=100))
+    gallery.add_many([f"nv{i}" for i in range(len(encodings))], encodings)
+
+    for row in (0, 57, 399):
+        best_idx, best, _ = gallery.top2(encodings[row])
+        assert best_idx == row
+        assert best == pytest.approx(0.0, abs=1e-3)
+
+
+@pytest.mark.parametrize('retrain_factor', [2.0, 100.0])
+def test_ivf_incremental_add_and_remove(retrain_factor):
+    encodings = random_encodings(300)
+    index = IVFIndex(nlist=16, nprobe=16, min_train_size=50, retrain_factor=retrain_factor)
+    gallery = FaceGallery(capacity=4, index=index)
+    for i, encoding in enumerate(encodings):
+        gallery.add(f"nv{i % 200}", encoding)
+    assert gallery.index.is_trained
+    assert_index_consistent(gallery)
+
+    for i in range(0, 200, 3):
+        gallery.remove(f"nv{i}")
+    assert_index_consistent(gallery)
+
+    kept = np.array([i for i in range(300) if (i % 200) % 3 != 0])
+    assert len(gallery) == len(kept)
+    for query in random_encodings(10, seed=5):
+        best_idx, best, second = gallery.top2(query)
+        expected_idx, expected_best, expected_second = brute_top2(encodings[kept], query)
+        assert gallery.names[best_idx] == f"nv{kept[expected_idx] % 200}"
+        assert best == pytest.approx(expected_best, abs=1e-4)
+        assert second == pytest.approx(expected_second, abs=1e-4)
+
+    for name in set(gallery.names):
+        gallery.remove(name)
+    assert len(gallery) == 0
+    assert gallery.top2(encodings[0]) == (None, None, None)
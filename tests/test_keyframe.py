@@ -0,0 +1,74 @@
+import numpy as np
+
+from keyframe import KeyframeSelector, frontal_symmetry
+
+
+class FakeFace:
+    """Khuôn mặt giả chỉ có các chỉ số chất lượng mà KeyframeSelector cần"""
+
+    def __init__(self, name, sharpness):
+        self.name = name
+        self.quality = {'height': 100, 'width': 100, 'contrast': 64.0, 'sharpness': sharpness}
+        self.gray = np.full((10, 10), 128, dtype=np.uint8)
+        self.crops = 0
+
+    def crop(self):
+        self.crops += 1
+        return self
+
+
+def offer_all(selector, sharpness_values):
+    faces = [FakeFace(f"f{i}", value) for i, value in enumerate(sharpness_values)]
+    for face in faces:
+        selector.offer(face)
+    return faces
+
+
+def test_frontal_symmetry():
+    assert frontal_symmetry(np.full((4, 6), 90, dtype=np.uint8)) == 1.0
+    half = np.zeros((4, 6), dtype=np.uint8)
+    half[:, 3:] = 255
+    assert frontal_symmetry(half) == 0.0
+    assert frontal_symmetry(np.empty((0, 0), dtype=np.uint8)) == 0.0
+
+
+def test_keeps_top_k_by_score():
+    selector = KeyframeSelector(k=3)
+    faces = offer_all(selector, [10, 300, 50, 20, 200])
+
+    assert len(selector) == 3
+    assert selector.offered == 5
+    assert selector.best() is faces[1]
+    scores = selector.scores()
+    assert scores == sorted(scores, reverse=True)
+    assert scores == [selector.score(faces[i]) for i in (1, 4, 2)]
+
+
+def test_only_kept_faces_are_copied():
+    selector = KeyframeSelector(k=1)
+    faces = offer_all(selector, [100, 10])
+    assert faces[0].crops == 1
+    assert faces[1].crops == 0
+
+
+def test_pop_best_falls_back_to_runner_up():
+    selector = KeyframeSelector(k=3)
+    faces = offer_all(selector, [10, 300, 200])
+
+    selector.pop_best()
+    assert selector.best() is faces[2]
+    selector.pop_best()
+    assert selector.best() is faces[0]
+    selector.pop_best()
+    assert selector.best() is None
+    selector.pop_best()
+    assert len(selector) == 0
+
+
+def test_reset():
+    selector = KeyframeSelector(k=2)
+    offer_all(selector, [10, 20])
+    selector.reset()
+    assert len(selector) == 0
+    assert selector.offered == 0
+    assert selector.best() is None
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import config
+import kiosk
+
+
+@pytest.fixture
+def restore_config(monkeypatch):
+    """Khôi phục config và biến môi trường mà apply_overrides ghi đè"""
+    for key in list(kiosk.DERIVED) + ['BASE_DIR', 'MODEL', 'HOLD_FACE_TIME']:
+        monkeypatch.setattr(config, key, getattr(config, key))
+    monkeypatch.setenv(config.OVERRIDES_ENV, '')
+
+
+def test_parse_override():
+    assert kiosk.parse_override('HOLD_FACE_TIME=1.5') == ('HOLD_FACE_TIME', 1.5)
+    assert kiosk.parse_override('MODEL=small') == ('MODEL', 'small')
+    with pytest.raises(Exception):
+        kiosk.parse_override('NOT_A_SETTING=1')
+    with pytest.raises(Exception):
+        kiosk.parse_override('HOLD_FACE_TIME')
+
+
+def test_derived_settings_are_recomputed(restore_config, tmp_path):
+    log_dir = str(tmp_path / 'logs')
+    changed = kiosk.apply_overrides([('LOG_DIR', log_dir), ('MODEL', 'small')])
+
+    assert config.TRACE_FILE == os.path.join(log_dir, 'checkin_traces.jsonl')
+    assert config.METRICS_FILE == os.path.join(log_dir, 'metrics.prom')
+    assert config.PROFILE_DIR == os.path.join(log_dir, 'profiles')
+    assert config.EMBEDDING_MODEL_VERSION.endswith('/small')
+    assert os.path.isdir(log_dir)
+    assert set(changed) == {'LOG_DIR', 'MODEL', 'TRACE_FILE', 'METRICS_FILE', 'PROFILE_DIR',
+                            'EMBEDDING_MODEL_VERSION'}
+
+
+def test_explicit_override_wins_over_derived(restore_config, tmp_path):
+    trace_file = str(tmp_path / 'traces.jsonl')
+    kiosk.apply_overrides([('BASE_DIR', str(tmp_path)), ('TRACE_FILE', trace_file)])
+
+    assert config.TRACE_FILE == trace_file
+    assert config.DATABASE_PATH == os.path.join(str(tmp_path), 'database', 'attendance.db')
+    assert config.ENCODING_CACHE_PATH == os.path.join(str(tmp_path), 'cache', 'encodings.npz')
+    assert config.METRICS_FILE == os.path.join(str(tmp_path), 'logs', 'metrics.prom')
+
+
+def test_overrides_reach_spawned_processes(restore_config, tmp_path):
+    kiosk.apply_overrides([('HOLD_FACE_TIME', 0.5)])
+    kiosk.apply_overrides([('LOG_DIR', str(tmp_path))])
+
+    code = "import config; print(repr((config.HOLD_FACE_TIME, config.TRACE_FILE)))"
+    output = subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(config.__file__)),
+                            capture_output=True, text=True, check=True).stdout
+    assert output.strip() == repr((0.5, os.path.join(str(tmp_path), 'checkin_traces.jsonl')))
@@ -0,0 +1,68 @@
+import numpy as np
+
+from liveness import LEFT_EYE, NOSE_TIP, RIGHT_EYE, TemporalLiveness
+
+
+def landmarks(eye_height=0.6, yaw=0.0, pitch=0.0):
+    """Landmark 68 điểm tối giản: hai mắt cách nhau 30 px, đầu mũi lệch theo yaw/pitch (tỉ lệ khoảng cách hai mắt)"""
+    points = np.zeros((68, 2))
+    for indices, x0 in ((LEFT_EYE, 30.0), (RIGHT_EYE, 60.0)):
+        points[indices] = [(x0, 40), (x0 + 1, 40 - eye_height), (x0 + 2, 40 - eye_height),
+                           (x0 + 3, 40), (x0 + 2, 40 + eye_height), (x0 + 1, 40 + eye_height)]
+    points[NOSE_TIP] = (46.5 + yaw * 30, 60 + pitch * 30)
+    return points
+
+
+def push_all(liveness, frames):
+    for points in frames:
+        liveness.push(points)
+
+
+def test_needs_min_frames():
+    liveness = TemporalLiveness(min_frames=3)
+    push_all(liveness, [landmarks(), landmarks(eye_height=0.1)])
+    assert not liveness.check('blink')
+
+
+def test_blink_requires_open_then_closed():
+    liveness = TemporalLiveness(min_frames=3)
+    push_all(liveness, [landmarks(eye_height=0.1)] * 3)
+    assert not liveness.check('blink')
+
+    push_all(liveness, [landmarks(), landmarks(eye_height=0.1)])
+    assert liveness.check('blink')
+    assert liveness.frames_to_decision == 5
+
+
+def test_turns_are_relative_to_starting_pose():
+    liveness = TemporalLiveness(min_frames=3, turn_threshold=0.15)
+    push_all(liveness, [landmarks(yaw=0.3)] * 3 + [landmarks(yaw=0.1)])
+    assert liveness.check('left')
+    assert not liveness.check('right')
+
+    liveness.reset()
+    push_all(liveness, [landmarks()] * 3 + [landmarks(yaw=0.2)])
+    assert liveness.check('right')
+    assert not liveness.check('left')
+
+
+def test_nod():
+    liveness = TemporalLiveness(min_frames=3, nod_threshold=0.1)
+    push_all(liveness, [landmarks()] * 3)
+    assert not liveness.check('nod')
+    liveness.push(landmarks(pitch=0.2))
+    assert liveness.check('nod')
+
+
+def test_window_keeps_latest_frames():
+    liveness = TemporalLiveness(window=4, min_frames=3)
+    push_all(liveness, [landmarks(yaw=i / 10) for i in range(6)])
+    assert len(liveness) == 4
+    nose_x = liveness.history()[:, NOSE_TIP, 0]
+    assert np.allclose(nose_x, [46.5 + i * 3 for i in range(2, 6)])
+
+
+def test_unknown_action_fails():
+    liveness = TemporalLiveness(min_frames=1)
+    liveness.push(landmarks())
+    assert not liveness.check('smile')
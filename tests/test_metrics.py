@@ -0,0 +1,67 @@
+import time
+
+from metrics import Metrics
+
+
+def test_disabled_records_nothing():
+    metrics = Metrics(enabled=False)
+    with metrics.time('detect'):
+        pass
+    metrics.observe('detect', 0.1)
+    metrics.inc('matches')
+    assert metrics.render() == '\n'
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = Metrics(enabled=True, buckets=(0.1, 0.01), prefix='test')
+    for seconds in (0.005, 0.05, 0.05, 2.0):
+        metrics.observe('detect', seconds)
+
+    lines = metrics.render().splitlines()
+    assert lines[:2] == ['# HELP test_stage_seconds Thời gian xử lý của từng bước',
+                         '# TYPE test_stage_seconds histogram']
+    assert 'test_stage_seconds_bucket{stage="detect",le="0.01"} 1' in lines
+    assert 'test_stage_seconds_bucket{stage="detect",le="0.1"} 3' in lines
+    assert 'test_stage_seconds_bucket{stage="detect",le="+Inf"} 4' in lines
+    assert 'test_stage_seconds_sum{stage="detect"} 2.105000' in lines
+    assert 'test_stage_seconds_count{stage="detect"} 4' in lines
+
+
+def test_counters_with_labels():
+    metrics = Metrics(enabled=True, prefix='test')
+    metrics.inc('matches')
+    metrics.inc('matches', 2)
+    metrics.inc('rejections', reason='quality')
+    metrics.inc('rejections', reason='unknown')
+    metrics.inc('rejections', reason='quality')
+
+    lines = metrics.render().splitlines()
+    assert '# TYPE test_matches_total counter' in lines
+    assert 'test_matches_total 3' in lines
+    assert 'test_rejections_total{reason="quality"} 2' in lines
+    assert 'test_rejections_total{reason="unknown"} 1' in lines
+    assert sum(line.startswith('# TYPE test_rejections_total') for line in lines) == 1
+
+
+def test_timed_decorator_and_reset():
+    metrics = Metrics(enabled=True, prefix='test')
+
+    @metrics.timed('encode')
+    def encode():
+        time.sleep(0.01)
+        return 'ok'
+
+    assert encode() == 'ok'
+    assert 'test_stage_seconds_count{stage="encode"} 1' in metrics.render().splitlines()
+
+    metrics.reset()
+    assert metrics.render() == '\n'
+
+
+def test_write_replaces_file(tmp_path):
+    metrics = Metrics(enabled=True, prefix='test')
+    metrics.inc('checkins')
+    path = tmp_path / 'metrics' / 'face_attendance.prom'
+    metrics.write(str(path))
+    assert path.read_text(encoding='utf-8') == metrics.render()
+    assert not (tmp_path / 'metrics' / 'face_attendance.prom.tmp').exists()
@@ -0,0 +1,52 @@
+import numpy as np
+
+from motion_gate import MotionGate
+
+
+def frame(value=0):
+    return np.full((120, 160, 3), value, dtype=np.uint8)
+
+
+def test_static_scene_is_skipped():
+    gate = MotionGate(max_skip_frames=100)
+    assert gate.should_process(frame())
+    assert not any(gate.should_process(frame()) for _ in range(5))
+    assert gate.stats()['skips'] == 5
+
+
+def test_change_is_processed():
+    gate = MotionGate(max_skip_frames=100)
+    gate.should_process(frame())
+    moved = frame()
+    moved[20:80, 40:100] = 255
+    assert gate.should_process(moved)
+    # Frame đầu tiên (chưa có nền) cũng tính là có chuyển động
+    assert gate.counters['hits'] == 2
+
+
+def test_force_and_keepalive():
+    gate = MotionGate(max_skip_frames=2)
+    gate.should_process(frame())
+    assert gate.should_process(frame(), force=True)
+    assert not gate.should_process(frame())
+    assert not gate.should_process(frame())
+    assert gate.should_process(frame())
+    assert gate.counters['forced'] == 1
+    assert gate.counters['keepalive'] == 1
+
+
+def test_outcomes_are_exported_as_counters(monkeypatch):
+    import motion_gate
+    from metrics import Metrics
+
+    registry = Metrics(enabled=True, prefix='test')
+    monkeypatch.setattr(motion_gate, 'metrics', registry)
+    gate = MotionGate(max_skip_frames=100)
+    gate.should_process(frame())
+    gate.should_process(frame())
+    gate.should_process(frame(), force=True)
+
+    lines = registry.render().splitlines()
+    assert 'test_motion_gate_frames_total{outcome="hits"} 1' in lines
+    assert 'test_motion_gate_frames_total{outcome="skips"} 1' in lines
+    assert 'test_motion_gate_frames_total{outcome="forced"} 1' in lines
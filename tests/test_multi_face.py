@@ -0,0 +1,120 @@
+import numpy as np
+
+from multi_face import FaceSession, MultiFaceCheckIn
+
+
+class FakeFace:
+    def __init__(self, location):
+        self.location = location
+
+    def is_good_quality(self, min_size, min_contrast):
+        return True
+
+
+class FakeGallery:
+    def __init__(self, names):
+        self.names = names
+
+    def top2_many(self, encodings):
+        return [(self.names.index(e), 0.1, 0.9) if e in self.names else (None, 1.0, None) for e in encodings]
+
+
+class FakeRecognizer:
+    """Recognizer giả: vị trí khuôn mặt cho trước, 'encoding' là tên ứng với vị trí"""
+
+    def __init__(self, names_by_location):
+        self.names_by_location = names_by_location
+        self.locations = []
+        self.gallery = FakeGallery(sorted(set(names_by_location.values())))
+        self.known_names = self.gallery.names
+        self.face_found = False
+        self.governor_active = False
+        self.motion_gate = None
+        self.probe_scale = None
+        self.jitter_stats = {'fast': 0, 'rejitter': 0}
+        self.batches = []
+
+    def prepare_frame(self, frame):
+        return frame
+
+    def detect_faces(self, rgb_small_frame):
+        return list(self.locations)
+
+    def analyse_face(self, frame, location, rgb_small_frame):
+        return FakeFace(location)
+
+    def encode_batch(self, analyses):
+        self.batches.append(len(analyses))
+        return [self.names_by_location.get(analysis.location) for analysis in analyses]
+
+    def is_ambiguous_match(self, best_distance, second_distance):
+        return False
+
+    def accept_match(self, index, best_distance, second_distance):
+        return None if index is None else self.known_names[index]
+
+    @staticmethod
+    def liveness_action(action):
+        return 'blink'
+
+
+FRAME = np.zeros((240, 320, 3), dtype=np.uint8)
+A = (40, 100, 100, 40)
+B = (40, 260, 100, 200)
+
+
+def session_ids(checkin):
+    return {session.location: session.id for session in checkin.sessions.values()}
+
+
+def test_sessions_follow_faces_by_iou():
+    checkin = MultiFaceCheckIn(FakeRecognizer({}), min_iou=0.3)
+    checkin._associate([A, B], 0.0)
+    first = session_ids(checkin)
+
+    moved_a = (44, 104, 104, 44)
+    moved_b = (42, 262, 102, 202)
+    checkin._associate([moved_b, moved_a], 0.1)
+
+    assert session_ids(checkin) == {moved_a: first[A], moved_b: first[B]}
+
+
+def test_best_iou_wins_when_faces_overlap():
+    checkin = MultiFaceCheckIn(FakeRecognizer({}), min_iou=0.1)
+    checkin._associate([A], 0.0)
+    session_id = session_ids(checkin)[A]
+
+    near, far = (42, 102, 102, 42), (40, 130, 100, 70)
+    checkin._associate([far, near], 0.1)
+
+    ids = session_ids(checkin)
+    assert ids[near] == session_id
+    assert ids[far] != session_id
+
+
+def test_missed_sessions_expire_and_new_faces_are_limited():
+    checkin = MultiFaceCheckIn(FakeRecognizer({}), max_faces=2, max_missed=1)
+    checkin._associate([A], 0.0)
+    checkin._associate([], 0.1)
+    assert len(checkin.sessions) == 1
+    checkin._associate([], 0.2)
+    assert not checkin.sessions
+
+    checkin._associate([A, B, (150, 100, 210, 40)], 0.3)
+    assert len(checkin.sessions) == 2
+
+
+def test_faces_are_identified_in_one_batch():
+    recognizer = FakeRecognizer({A: 'an'})
+    recognizer.locations = [A, B]
+    checkin = MultiFaceCheckIn(recognizer, hold_time=0, actions=['Vui lòng nháy mắt'])
+
+    events = checkin.process(FRAME)
+
+    assert recognizer.batches == [2]
+    kinds = {session.location: kind for kind, session in events}
+    assert kinds == {A: 'action', B: 'unknown'}
+    states = {session.location: session.state for session in checkin.sessions.values()}
+    assert states == {A: FaceSession.LIVENESS, B: FaceSession.REJECTED}
+    assert checkin.stats()['faces_per_batch'] == 2.0
+    assert recognizer.face_found
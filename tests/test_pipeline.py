@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from pipeline import FramePipeline, _put
+
+
+def full_queue(*items):
+    target = queue.Queue(maxsize=len(items))
+    for item in items:
+        target.put(item)
+    return target
+
+
+def drain(target):
+    items = []
+    while not target.empty():
+        items.append(target.get_nowait())
+    return items
+
+
+def test_put_drop_oldest():
+    target = full_queue(1, 2)
+    dropped = []
+    _put(target, 3, 'drop_oldest', dropped.append)
+    assert dropped == [1]
+    assert drain(target) == [2, 3]
+
+
+def test_put_drop_newest():
+    target = full_queue(1, 2)
+    dropped = []
+    _put(target, 3, 'drop_newest', dropped.append)
+    assert dropped == [3]
+    assert drain(target) == [1, 2]
+
+
+def test_put_block_waits_for_space():
+    target = full_queue(1)
+    threading.Timer(0.05, target.get).start()
+    _put(target, 2, 'block', pytest.fail)
+    assert drain(target) == [2]
+
+
+def test_rejects_unknown_drop_policy():
+    with pytest.raises(ValueError):
+        FramePipeline((48, 64, 3), None, 0.25, drop_policy='random')
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_submit_mirrors_and_drops_oldest_when_full():
+    pipeline = FramePipeline((48, 64, 3), lambda *args: None, 0.25, detect_workers=0, encode_workers=0,
+                             queue_size=2)
+    try:
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        frame[0, -1] = 7
+        for _ in range(3):
+            assert pipeline.submit(frame)
+        assert (pipeline.counters['submitted'], pipeline.counters['dropped']) == (3, 1)
+
+        slot, seq, _ = pipeline.detect_queue.get(timeout=1)
+        assert seq == 2
+        assert pipeline.frames[slot][0, 0, 0] == 7
+        # Slot của frame bị bỏ được trả lại
+        assert pipeline.free_slots.qsize() == pipeline.slots - 2
+    finally:
+        pipeline.stop()
+
+
+def test_collect_skips_stale_results():
+    delivered = []
+    pipeline = FramePipeline((48, 64, 3), lambda frame, locations, encodings: delivered.append(locations), 0.25,
+                             detect_workers=0, encode_workers=0, queue_size=2).start()
+    try:
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        pipeline.submit(frame)
+        pipeline.submit(frame)
+        first = pipeline.detect_queue.get(timeout=1)
+        second = pipeline.detect_queue.get(timeout=1)
+
+        # Worker thứ hai trả kết quả trước
+        pipeline.result_queue.put(('result', second[0], second[1], second[2], [(1, 2, 3, 4)], []))
+        pipeline.result_queue.put(('result', first[0], first[1], first[2], [(5, 6, 7, 8)], []))
+        assert wait_until(lambda: pipeline.counters['stale'] == 1)
+        assert delivered == [[(1, 2, 3, 4)]]
+        assert pipeline.counters['analysed'] == 1
+        assert wait_until(lambda: pipeline.free_slots.qsize() == pipeline.slots)
+    finally:
+        pipeline.stop()
+
+
+class FakeStream:
+    """Mỗi lần chờ trả về một frame mới sau 10 ms"""
+
+    def __init__(self):
+        self.seq = 0
+
+    def wait_for_frame(self, last_seq, timeout=0.5):
+        time.sleep(0.01)
+        self.seq += 1
+        return self.seq, np.zeros((48, 64, 3), dtype=np.uint8)
+
+
+def capture_for(seconds, should_submit=None, interval=None):
+    pipeline = FramePipeline.__new__(FramePipeline)
+    pipeline.running = True
+    pipeline.frame_shape = (48, 64, 3)
+    pipeline.counters = {'gated': 0, 'paced': 0}
+    submitted = []
+    pipeline.submit = submitted.append
+    pipeline.run_capture(FakeStream(), should_submit, interval)
+    time.sleep(seconds)
+    pipeline.running = False
+    pipeline.capture_thread.join(timeout=1)
+    return len(submitted), pipeline.counters
+
+
+def test_capture_paces_by_interval():
+    unpaced, _ = capture_for(0.5)
+    paced, counters = capture_for(0.5, interval=lambda: 100)
+    assert 2 <= paced <= 8
+    assert paced < unpaced
+    assert counters['paced'] > 0
+
+
+def test_capture_gate():
+    submitted, counters = capture_for(0.2, should_submit=lambda frame: False)
+    assert submitted == 0
+    assert counters['gated'] > 0
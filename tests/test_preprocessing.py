@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+import pytest
+
+from preprocessing import SHARPEN_KERNEL, FramePreprocessor
+
+
+def bgr_frame(height=120, width=160, seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+def reference(frame, scale, clip_limit=2.0, sharpen=True):
+    """Thu nhỏ, sang RGB, CLAHE trên kênh L rồi làm nét, từng bước với mảng mới"""
+    small = cv2.resize(frame, (int(round(frame.shape[1] * scale)), int(round(frame.shape[0] * scale))))
+    lab = cv2.cvtColor(cv2.cvtColor(small, cv2.COLOR_BGR2RGB), cv2.COLOR_RGB2LAB)
+    lab[..., 0] = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(8, 8)).apply(np.ascontiguousarray(lab[..., 0]))
+    out = cv2.cvtColor(lab, cv2.COLOR_LAB2RGB)
+    return cv2.filter2D(out, -1, SHARPEN_KERNEL) if sharpen else out
+
+
+def test_prepare_matches_reference():
+    frame = bgr_frame()
+    prepared = FramePreprocessor(0.5).prepare(frame)
+    assert prepared.shape == (60, 80, 3)
+    assert np.array_equal(prepared, reference(frame, 0.5))
+
+
+def test_profile_without_enhancement_is_plain_rgb():
+    frame = bgr_frame()
+    preprocessor = FramePreprocessor.from_profile(0.5, {'clahe': False, 'sharpen': False})
+    expected = cv2.cvtColor(cv2.resize(frame, (80, 60)), cv2.COLOR_BGR2RGB)
+    assert np.array_equal(preprocessor.prepare(frame), expected)
+
+
+def test_buffers_are_reused_unless_asked_not_to():
+    preprocessor = FramePreprocessor(0.5)
+    first = preprocessor.prepare(bgr_frame(seed=1))
+    second = preprocessor.prepare(bgr_frame(seed=2))
+    assert first is second
+    assert np.array_equal(second, reference(bgr_frame(seed=2), 0.5))
+
+    kept = preprocessor.prepare(bgr_frame(seed=3), reuse=False)
+    preprocessor.prepare(bgr_frame(seed=4))
+    assert np.array_equal(kept, reference(bgr_frame(seed=3), 0.5))
+
+
+def test_scale_override_and_buffer_limit():
+    preprocessor = FramePreprocessor(0.5)
+    assert preprocessor.prepare(bgr_frame(), scale=0.25).shape == (30, 40, 3)
+    assert preprocessor.prepare(bgr_frame(), scale=1.0).shape == (120, 160, 3)
+    for width in range(100, 160, 10):
+        preprocessor.prepare(bgr_frame(width=width))
+    assert len(preprocessor._buffers) <= 4
+
+
+def test_face_region_enhances_only_faces():
+    frame = bgr_frame()
+    preprocessor = FramePreprocessor(0.5, enhance_region='face')
+    rgb = preprocessor.prepare(frame, reuse=False)
+    assert np.array_equal(rgb, cv2.cvtColor(cv2.resize(frame, (80, 60)), cv2.COLOR_BGR2RGB))
+
+    original = rgb.copy()
+    preprocessor.enhance_faces(rgb, [(20, 50, 40, 30)], margin=0)
+    assert np.array_equal(rgb[20:40, 30:50], preprocessor.enhance_rgb(np.ascontiguousarray(original[20:40, 30:50])))
+    outside = np.ones(rgb.shape[:2], dtype=bool)
+    outside[20:40, 30:50] = False
+    assert np.array_equal(rgb[outside], original[outside])
+
+
+def test_rejects_unknown_region():
+    with pytest.raises(ValueError):
+        FramePreprocessor(0.5, enhance_region='background')
@@ -0,0 +1,73 @@
+import pytest
+
+import config
+from tracing import NULL_TRACE, Tracer, load_traces, phase_durations
+
+
+def test_disabled_tracer_returns_null_trace(tmp_path):
+    path = tmp_path / 'traces.jsonl'
+    tracer = Tracer(str(path), enabled=False)
+    trace = tracer.begin()
+    assert trace is NULL_TRACE
+    with trace.span('match'):
+        trace.event('hold_complete')
+    tracer.finish(trace, 'checkin')
+    assert not path.exists()
+
+
+def test_finish_appends_one_line_per_trace(tmp_path):
+    path = tmp_path / 'logs' / 'traces.jsonl'
+    tracer = Tracer(str(path), enabled=True)
+
+    trace = tracer.begin(start=100.0)
+    trace.event('hold_complete', at=102.0)
+    trace.name = 'nv_a'
+    tracer.finish(trace, 'checkin')
+    tracer.finish(tracer.begin(start=200.0), 'abandoned')
+
+    records = load_traces(str(path))
+    assert [record['outcome'] for record in records] == ['checkin', 'abandoned']
+    assert records[0]['name'] == 'nv_a'
+    assert records[0]['total_ms'] == pytest.approx(2000.0)
+    assert records[0]['spans'] == [['first_detection', 0.0, 0.0], ['hold_complete', 2000.0, 0.0]]
+
+    assert [record['ts'] for record in load_traces(str(path), outcome='abandoned')] == [200.0]
+    assert len(load_traces(str(path), last=1)) == 1
+
+
+def test_load_skips_partial_lines(tmp_path):
+    path = tmp_path / 'traces.jsonl'
+    path.write_text('{"id": "a", "outcome": "checkin", "spans": []}\n\n{"id": "b", "outc', encoding='utf-8')
+    assert [record['id'] for record in load_traces(str(path))] == ['a']
+
+
+def test_phase_durations_use_last_attempt():
+    record = {'spans': [
+        ['first_detection', 0.0, 0.0],
+        ['hold_complete', 2000.0, 0.0],
+        ['match', 2000.0, 50.0],
+        ['match', 2500.0, 40.0],
+        ['liveness_prompt', 2600.0, 0.0],
+        ['liveness_pass', 4000.0, 0.0],
+        ['db_commit', 4000.0, 5.0],
+    ]}
+    phases = phase_durations(record)
+    assert phases == pytest.approx({
+        'hold_complete': 2000.0,
+        'match': 540.0,
+        'liveness_prompt': 60.0,
+        'liveness_pass': 1400.0,
+        'db_commit': 5.0,
+    })
+
+
+def test_defaults_follow_config(monkeypatch, tmp_path):
+    path = str(tmp_path / 'traces.jsonl')
+    monkeypatch.setattr(config, 'TRACE_FILE', path)
+    monkeypatch.setattr(config, 'TRACE_ENABLED', True)
+    tracer = Tracer()
+    assert tracer.path == path
+    assert tracer.enabled
+
+    monkeypatch.setattr(config, 'TRACE_ENABLED', False)
+    assert Tracer().begin() is NULL_TRACE
@@ -0,0 +1,225 @@
+"""Trace từng lượt chấm công (từ lúc thấy khuôn mặt đến khi ghi database) và phân tích file trace.
+
+Chạy: python tracing.py [logs/checkin_traces.jsonl] [--outcome checkin] [--last 500]
+
+Mỗi dòng của file trace là một lượt (JSON):
+{"id": ..., "ts": thời điểm bắt đầu, "outcome": ..., "name": ..., "total_ms": ...,
+ "spans": [[tên, bắt đầu (ms từ ts), thời lượng (ms)], ...]}
+"""
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import numpy as np
+
+import config
+
+# Các mốc theo thứ tự của một lượt chấm công; giai đoạn = khoảng giữa hai mốc liên tiếp có mặt
+MILESTONES = ('first_detection', 'hold_complete', 'match', 'liveness_prompt', 'liveness_pass',
+              'db_commit', 'log_write')
+
+PHASE_LABELS = {
+    'hold_complete': 'giữ mặt',
+    'match': 'encode + so khớp',
+    'liveness_prompt': 'chờ yêu cầu hành động',
+    'liveness_pass': 'người dùng làm hành động',
+    'db_commit': 'ghi database',
+    'log_write': 'ghi ảnh log',
+}
+
+
+class CheckInTrace:
+    """Các span của một lượt chấm công, thời gian tính theo ms từ lúc bắt đầu"""
+
+    def __init__(self, trace_id, start=None):
+        self.id = trace_id
+        self.start = start if start is not None else time.time()
+        self.name = None
+        self.spans = []
+
+    def event(self, name, at=None):
+        """Mốc tức thời (thời lượng 0)"""
+        at = at if at is not None else time.time()
+        self.spans.append((name, (at - self.start) * 1000, 0.0))
+
+    def span(self, name):
+        """Context manager ghi một span có thời lượng"""
+        return _Span(self, name)
+
+    def has(self, name):
+        return any(span[0] == name for span in self.spans)
+
+    def to_record(self, outcome):
+        end = max((offset + duration for _, offset, duration in self.spans), default=0.0)
+        return {
+            'id': self.id,
+            'ts': round(self.start, 3),
+            'outcome': outcome,
+            'name': self.name,
+            'total_ms': round(end, 1),
+            'spans': [[name, round(offset, 1), round(duration, 1)] for name, offset, duration in self.spans],
+        }
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'started')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        trace = self.trace
+        trace.spans.append((self.name, (self.started - trace.start) * 1000, (time.time() - self.started) * 1000))
+        return False
+
+
+class _NullTrace:
+    """Trace rỗng khi tắt tracing: mọi lời gọi không làm gì"""
+
+    id = None
+    name = None
+
+    def event(self, name, at=None):
+        pass
+
+    def span(self, name):
+        return _NULL_SPAN
+
+    def has(self, name):
+        return False
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+NULL_TRACE = _NullTrace()
+
+
+class Tracer:
+    """Tạo trace cho từng lượt chấm công và ghi nối tiếp vào file JSONL (mỗi lượt một dòng)"""
+
+    def __init__(self, path=None, enabled=None):
+        # Đọc config lúc tạo để nhận cấu hình đã ghi đè (kiosk.apply_overrides)
+        self.path = path if path is not None else config.TRACE_FILE
+        self.enabled = enabled if enabled is not None else config.TRACE_ENABLED
+        self._lock = threading.Lock()
+
+    def begin(self, start=None):
+        if not self.enabled:
+            return NULL_TRACE
+        trace = CheckInTrace(uuid.uuid4().hex[:12], start)
+        trace.event('first_detection', trace.start)
+        return trace
+
+    def finish(self, trace, outcome):
+        """Ghi trace với kết quả: 'checkin', 'failed', 'timeout', 'unknown' hoặc 'abandoned'"""
+        if trace is None or trace is NULL_TRACE:
+            return
+        line = json.dumps(trace.to_record(outcome), ensure_ascii=False, separators=(',', ':'))
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+        except OSError as e:
+            print(f"Lỗi ghi trace: {str(e)}")
+
+
+def load_traces(path, outcome=None, last=0):
+    traces = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Dòng cuối có thể dở dang nếu process bị tắt giữa chừng
+                continue
+            if outcome is None or record.get('outcome') == outcome:
+                traces.append(record)
+    return traces[-last:] if last else traces
+
+
+def phase_durations(record):
+    """{giai đoạn: ms} từ mốc trước đến mốc này; dùng lần xuất hiện cuối của mỗi mốc (lần thử thành công)"""
+    ends = {}
+    for name, offset, duration in record['spans']:
+        ends[name] = offset + duration
+    phases = {}
+    previous = None
+    for milestone in MILESTONES:
+        if milestone not in ends:
+            continue
+        if previous is not None:
+            phases[milestone] = max(ends[milestone] - ends[previous], 0.0)
+        previous = milestone
+    return phases
+
+
+def analyze(traces, outcome='checkin'):
+    """In phân bố độ trễ và thời gian theo từng giai đoạn của các lượt có kết quả outcome"""
+    outcomes = Counter(record['outcome'] for record in traces)
+    print(f"{len(traces)} lượt: " + ", ".join(f"{name} {count}" for name, count in outcomes.most_common()))
+
+    completed = [record for record in traces if record['outcome'] == outcome]
+    if not completed:
+        return
+
+    totals = np.array([record['total_ms'] for record in completed])
+    print()
+    print(f"Từ lúc thấy khuôn mặt đến khi kết thúc ({outcome}, {len(completed)} lượt):")
+    print(f"  p50 {np.percentile(totals, 50):.0f} ms | p95 {np.percentile(totals, 95):.0f} ms | "
+          f"p99 {np.percentile(totals, 99):.0f} ms | max {totals.max():.0f} ms")
+
+    phases = defaultdict(list)
+    for record in completed:
+        for phase, duration in phase_durations(record).items():
+            phases[phase].append(duration)
+
+    total_time = totals.sum()
+    print()
+    print(f"{'giai đoạn':>26} | {'p50 (ms)':>9} {'p95':>8} {'p99':>8} | tỉ lệ thời gian")
+    for milestone in MILESTONES[1:]:
+        values = np.array(phases.get(milestone, []))
+        if not len(values):
+            continue
+        share = values.sum() / total_time if total_time else 0.0
+        print(f"{PHASE_LABELS[milestone]:>26} | {np.percentile(values, 50):>9.0f} {np.percentile(values, 95):>8.0f} "
+              f"{np.percentile(values, 99):>8.0f} | {share:6.1%}")
+
+    retries = [sum(1 for span in record['spans'] if span[0] == 'match') for record in completed]
+    if max(retries) > 1:
+        print(f"\nLượt phải so khớp lại: {sum(1 for count in retries if count > 1)}/{len(completed)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', nargs='?', default=config.TRACE_FILE, help='file trace JSONL')
+    parser.add_argument('--outcome', default=None, help="chỉ phân tích các lượt có kết quả này, ví dụ 'timeout'")
+    parser.add_argument('--last', type=int, default=0, help='chỉ phân tích N lượt gần nhất')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        parser.error(f"Không tìm thấy file trace: {args.path}")
+    analyze(load_traces(args.path, args.outcome, args.last), args.outcome or 'checkin')
+
+
+if __name__ == '__main__':
+    main()